@@ -2,6 +2,7 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy.schema import CreateSchema
 
 from alembic import context
 
@@ -31,18 +32,32 @@ from app.models.pagamentos import Pagamento
 # Define a metadata usada para geração automática
 target_metadata = Base.metadata
 
+# Multiloja: "alembic -x loja=<nome> upgrade head" migra o banco (ou o esquema)
+# da loja, resolvido por LOJA_DATABASE_URL/LOJA_ESQUEMA; sem -x, DATABASE_URL.
+# Todas as lojas de LOJAS: python scripts/migrar_lojas.py
+loja = context.get_x_argument(as_dictionary=True).get("loja")
+if loja:
+    from app.database import destino_da_loja
+    url_banco, esquema = destino_da_loja(loja.strip().lower())
+else:
+    url_banco, esquema = settings.DATABASE_URL, None
+
 
 def run_migrations_offline() -> None:
     """Executa as migrações no modo offline."""
-    url = settings.DATABASE_URL  # 👈 Substitui config.get_main_option(...)
+    url = url_banco  # 👈 Substitui config.get_main_option(...)
     context.configure(
         url=url,
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        version_table_schema=esquema,
     )
 
     with context.begin_transaction():
+        if esquema:
+            # O SQL gerado não passa pelo schema_translate_map
+            context.execute(f'SET search_path TO "{esquema}"')
         context.run_migrations()
 
 
@@ -51,13 +66,19 @@ def run_migrations_online() -> None:
     from sqlalchemy import create_engine
 
     connectable = create_engine(  # 👈 Usa o mesmo método que no app principal
-        settings.DATABASE_URL,
+        url_banco,
         poolclass=pool.NullPool,
     )
 
     with connectable.connect() as connection:
+        if esquema:
+            # Mesmo banco, um esquema por loja: as tabelas sem esquema vão
+            # para o da loja, como nos engines de app.database
+            connection.execute(CreateSchema(esquema, if_not_exists=True))
+            connection.commit()
+            connection = connection.execution_options(schema_translate_map={None: esquema})
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, version_table_schema=esquema
         )
 
         with context.begin_transaction():
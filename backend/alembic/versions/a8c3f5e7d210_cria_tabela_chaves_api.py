@@ -0,0 +1,44 @@
+"""cria_tabela_chaves_api
+
+Revision ID: a8c3f5e7d210
+Revises: f2b6d8e1a394
+Create Date: 2026-10-19 21:02:44.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3f5e7d210'
+down_revision: Union[str, None] = 'f2b6d8e1a394'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chaves_api',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=100), nullable=False),
+    sa.Column('prefixo', sa.String(length=16), nullable=False),
+    sa.Column('chave_hash', sa.String(length=64), nullable=False),
+    sa.Column('escopos', sa.String(length=200), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('ativo', sa.Boolean(), nullable=False),
+    sa.Column('data_criacao', sa.DateTime(), nullable=True),
+    sa.Column('revogada_em', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('chave_hash'),
+    sa.UniqueConstraint('prefixo')
+    )
+    op.create_index(op.f('ix_chaves_api_id'), 'chaves_api', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_chaves_api_id'), table_name='chaves_api')
+    op.drop_table('chaves_api')
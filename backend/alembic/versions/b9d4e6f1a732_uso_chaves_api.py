@@ -0,0 +1,31 @@
+"""uso_chaves_api
+
+Revision ID: b9d4e6f1a732
+Revises: a8c3f5e7d210
+Create Date: 2026-10-19 21:37:12.806154
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d4e6f1a732'
+down_revision: Union[str, None] = 'a8c3f5e7d210'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chaves_api', sa.Column('usos', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('chaves_api', sa.Column('ultimo_uso', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('chaves_api') as batch_op:
+        batch_op.drop_column('ultimo_uso')
+        batch_op.drop_column('usos')
@@ -0,0 +1,38 @@
+"""estoque_fragmentado
+
+Revision ID: c3f7a9d2e815
+Revises: b9d4e6f1a732
+Create Date: 2026-10-19 22:14:51.402377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f7a9d2e815'
+down_revision: Union[str, None] = 'b9d4e6f1a732'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('produtos', sa.Column('fragmentos_estoque', sa.Integer(), server_default='0', nullable=False))
+    op.create_table(
+        'estoque_fragmentos',
+        sa.Column('produto_id', sa.Integer(), nullable=False),
+        sa.Column('fragmento', sa.Integer(), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['produto_id'], ['produtos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('produto_id', 'fragmento'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('estoque_fragmentos')
+    with op.batch_alter_table('produtos') as batch_op:
+        batch_op.drop_column('fragmentos_estoque')
@@ -0,0 +1,56 @@
+"""compacta_e_arquiva_logs_de_auditoria
+
+Revision ID: c4e8a1f0b2d9
+Revises: 16c705735e2e
+Create Date: 2026-10-19 10:12:41.503227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f0b2d9'
+down_revision: Union[str, None] = '16c705735e2e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('logs', sa.Column('dados_compactados', sa.LargeBinary(), nullable=True))
+    op.create_index('ix_logs_tabela_registro', 'logs', ['tabela_afetada', 'registro_id', 'data_hora'], unique=False)
+    op.create_index('ix_logs_usuario_data', 'logs', ['usuario_id', 'data_hora'], unique=False)
+    op.create_index('ix_logs_data_hora', 'logs', ['data_hora'], unique=False)
+
+    op.create_table('logs_arquivo',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('acao', sa.String(length=50), nullable=False),
+    sa.Column('tabela_afetada', sa.String(length=50), nullable=True),
+    sa.Column('registro_id', sa.Integer(), nullable=True),
+    sa.Column('dados_antigos', sa.JSON(), nullable=True),
+    sa.Column('dados_novos', sa.JSON(), nullable=True),
+    sa.Column('dados_compactados', sa.LargeBinary(), nullable=True),
+    sa.Column('data_hora', sa.DateTime(), nullable=True),
+    sa.Column('ip', sa.String(length=50), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_logs_arquivo_tabela_registro', 'logs_arquivo', ['tabela_afetada', 'registro_id', 'data_hora'], unique=False)
+    op.create_index('ix_logs_arquivo_usuario_data', 'logs_arquivo', ['usuario_id', 'data_hora'], unique=False)
+    op.create_index('ix_logs_arquivo_data_hora', 'logs_arquivo', ['data_hora'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_logs_arquivo_data_hora', table_name='logs_arquivo')
+    op.drop_index('ix_logs_arquivo_usuario_data', table_name='logs_arquivo')
+    op.drop_index('ix_logs_arquivo_tabela_registro', table_name='logs_arquivo')
+    op.drop_table('logs_arquivo')
+
+    op.drop_index('ix_logs_data_hora', table_name='logs')
+    op.drop_index('ix_logs_usuario_data', table_name='logs')
+    op.drop_index('ix_logs_tabela_registro', table_name='logs')
+    op.drop_column('logs', 'dados_compactados')
@@ -0,0 +1,30 @@
+"""movimentacao_usuario_opcional
+
+Revision ID: d71b3e9a5c20
+Revises: c4e8a1f0b2d9
+Create Date: 2026-10-19 19:04:12.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd71b3e9a5c20'
+down_revision: Union[str, None] = 'c4e8a1f0b2d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('movimentacoes') as batch_op:
+        batch_op.alter_column('usuario_id', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('movimentacoes') as batch_op:
+        batch_op.alter_column('usuario_id', existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,33 @@
+"""versao_concorrencia_otimista
+
+Revision ID: d8a2f5c7e104
+Revises: c3f7a9d2e815
+Create Date: 2026-10-19 23:02:37.519604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a2f5c7e104'
+down_revision: Union[str, None] = 'c3f7a9d2e815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELAS = ('produtos', 'clientes', 'pagamentos')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for tabela in TABELAS:
+        op.add_column(tabela, sa.Column('versao', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for tabela in TABELAS:
+        with op.batch_alter_table(tabela) as batch_op:
+            batch_op.drop_column('versao')
@@ -0,0 +1,28 @@
+"""token_versao_usuario
+
+Revision ID: e5a9c2d4f713
+Revises: d71b3e9a5c20
+Create Date: 2026-10-19 19:48:31.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9c2d4f713'
+down_revision: Union[str, None] = 'd71b3e9a5c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('usuarios', sa.Column('token_versao', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('usuarios', 'token_versao')
@@ -0,0 +1,47 @@
+"""cria_tabela_refresh_tokens
+
+Revision ID: f2b6d8e1a394
+Revises: e5a9c2d4f713
+Create Date: 2026-10-19 20:21:07.392815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d8e1a394'
+down_revision: Union[str, None] = 'e5a9c2d4f713'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('refresh_tokens',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('familia', sa.String(length=32), nullable=False),
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('titular_id', sa.Integer(), nullable=False),
+    sa.Column('versao', sa.Integer(), nullable=False),
+    sa.Column('data_criacao', sa.DateTime(), nullable=True),
+    sa.Column('expira_em', sa.DateTime(), nullable=False),
+    sa.Column('usado_em', sa.DateTime(), nullable=True),
+    sa.Column('revogado_em', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token_hash')
+    )
+    op.create_index(op.f('ix_refresh_tokens_id'), 'refresh_tokens', ['id'], unique=False)
+    op.create_index(op.f('ix_refresh_tokens_familia'), 'refresh_tokens', ['familia'], unique=False)
+    op.create_index('ix_refresh_tokens_titular', 'refresh_tokens', ['tipo', 'titular_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_tokens_titular', table_name='refresh_tokens')
+    op.drop_index(op.f('ix_refresh_tokens_familia'), table_name='refresh_tokens')
+    op.drop_index(op.f('ix_refresh_tokens_id'), table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
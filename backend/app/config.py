@@ -4,8 +4,6 @@ import os
 from dotenv import load_dotenv
 
 load_dotenv()
-print("Banco de dados:", os.getenv("DATABASE_URL"))
-print("SECRET_KEY:", os.getenv("SECRET_KEY"))
 
 # load_dotenv(".env.admin") "segunda opção caso o código quebre
 class Settings(BaseSettings):
@@ -14,13 +12,135 @@ class Settings(BaseSettings):
     """
     # Configurações do banco de dados
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./synchrogest.db")
-    
+
+    # Multiloja: várias lojas no mesmo processo, cada uma com o próprio banco.
+    # A loja vem do cabeçalho X-Loja ou do primeiro rótulo do host
+    # (biscoito-pet-house.onrender.com) e precisa estar em LOJAS (separadas
+    # por vírgula); LOJA_PADRAO atende hosts sem loja (ex.: localhost).
+    # LOJA_DATABASE_URL recebe {loja}: um arquivo SQLite por loja, ou o mesmo
+    # PostgreSQL com um esquema por loja em LOJA_ESQUEMA (ex.: "loja_{loja}").
+    # Engines criados sob demanda, no máximo LOJA_MAX_ENGINES abertos, cada um
+    # com até LOJA_POOL_TAMANHO + LOJA_POOL_EXCEDENTE conexões
+    MULTILOJA_ATIVO: bool = os.getenv("MULTILOJA_ATIVO", "false").lower() == "true"
+    LOJAS: str = os.getenv("LOJAS", "")
+    LOJA_PADRAO: str = os.getenv("LOJA_PADRAO", "")
+    LOJA_DATABASE_URL: str = os.getenv("LOJA_DATABASE_URL", "sqlite:///./lojas/{loja}.db")
+    LOJA_ESQUEMA: str = os.getenv("LOJA_ESQUEMA", "")
+    LOJA_MAX_ENGINES: int = int(os.getenv("LOJA_MAX_ENGINES", "100"))
+    LOJA_POOL_TAMANHO: int = int(os.getenv("LOJA_POOL_TAMANHO", "2"))
+    LOJA_POOL_EXCEDENTE: int = int(os.getenv("LOJA_POOL_EXCEDENTE", "3"))
+
     # Configurações de segurança
     SECRET_KEY: str = os.getenv("SECRET_KEY", "temporarysecretkey123456789abcdefghijklmnopqrstuvwxyz")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
-    
-    
+    # Refresh tokens (rotativos, um uso cada) para renovar o acesso sem senha
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+    # Configurações de importação em massa de produtos
+    IMPORTACAO_TAMANHO_LOTE: int = int(os.getenv("IMPORTACAO_TAMANHO_LOTE", "2000"))
+    IMPORTACAO_MAX_ERROS: int = int(os.getenv("IMPORTACAO_MAX_ERROS", "1000"))
+
+    # Número máximo de produtos por consulta em lote (?ids= e /lookup)
+    PRODUTOS_LOTE_MAXIMO: int = int(os.getenv("PRODUTOS_LOTE_MAXIMO", "500"))
+
+    # Índice em memória de SKUs para o ponto de venda
+    INDICE_SKU_ATIVO: bool = os.getenv("INDICE_SKU_ATIVO", "true").lower() == "true"
+    INDICE_SKU_INTERVALO_VERIFICACAO: int = int(os.getenv("INDICE_SKU_INTERVALO_VERIFICACAO", "30"))
+
+    # Revogação dos tokens de acesso: intervalo (segundos) para ver as
+    # revogações feitas por outros processos
+    REVOGACAO_INTERVALO_VERIFICACAO: int = int(os.getenv("REVOGACAO_INTERVALO_VERIFICACAO", "5"))
+
+    # Limite de taxa (token bucket) no login e no checkout: "capacidade/segundos"
+    # por IP (ou chave de API), por conta e por rota; LIMITE_TAXA_BANCO aponta
+    # um arquivo SQLite para compartilhar os baldes entre workers
+    LIMITE_TAXA_ATIVO: bool = os.getenv("LIMITE_TAXA_ATIVO", "true").lower() == "true"
+    LIMITE_TAXA_LOGIN_IP: str = os.getenv("LIMITE_TAXA_LOGIN_IP", "20/60")
+    LIMITE_TAXA_LOGIN_CONTA: str = os.getenv("LIMITE_TAXA_LOGIN_CONTA", "5/60")
+    LIMITE_TAXA_LOGIN_ROTA: str = os.getenv("LIMITE_TAXA_LOGIN_ROTA", "20/1")
+    LIMITE_TAXA_CHECKOUT_IP: str = os.getenv("LIMITE_TAXA_CHECKOUT_IP", "30/60")
+    LIMITE_TAXA_CHECKOUT_CONTA: str = os.getenv("LIMITE_TAXA_CHECKOUT_CONTA", "10/60")
+    LIMITE_TAXA_CHECKOUT_ROTA: str = os.getenv("LIMITE_TAXA_CHECKOUT_ROTA", "50/1")
+    LIMITE_TAXA_MAX_CHAVES: int = int(os.getenv("LIMITE_TAXA_MAX_CHAVES", "100000"))
+    LIMITE_TAXA_BANCO: str = os.getenv("LIMITE_TAXA_BANCO", "")
+
+    # Coalescência de leituras idênticas simultâneas (listagem de produtos):
+    # tempo máximo (segundos) que uma requisição espera a consulta de outra
+    COALESCENCIA_ATIVA: bool = os.getenv("COALESCENCIA_ATIVA", "true").lower() == "true"
+    COALESCENCIA_TIMEOUT: float = float(os.getenv("COALESCENCIA_TIMEOUT", "2.0"))
+
+    # Escrita adiada (ultimo_login, usos das chaves de API): tempo máximo, em
+    # segundos, que as atualizações ficam em memória antes de ir para o banco
+    ESCRITA_ADIADA_INTERVALO: float = float(os.getenv("ESCRITA_ADIADA_INTERVALO", "5"))
+
+    # Estoque fragmentado (produtos muito vendidos): número máximo de
+    # fragmentos por produto, intervalo (segundos) da consolidação em
+    # produtos.quantidade e do rebalanceamento, e fração da cota igual abaixo
+    # da qual um fragmento dispara o rebalanceamento
+    ESTOQUE_FRAGMENTOS_MAXIMO: int = int(os.getenv("ESTOQUE_FRAGMENTOS_MAXIMO", "64"))
+    ESTOQUE_FRAGMENTOS_INTERVALO: float = float(os.getenv("ESTOQUE_FRAGMENTOS_INTERVALO", "2"))
+    ESTOQUE_FRAGMENTOS_LIMIAR: float = float(os.getenv("ESTOQUE_FRAGMENTOS_LIMIAR", "0.25"))
+
+    # Concorrência otimista na edição de produtos, clientes e pagamentos:
+    # exigir If-Match (ETag da leitura) nos PUT; sem ele a resposta é 428
+    CONCORRENCIA_EXIGIR_IF_MATCH: bool = os.getenv("CONCORRENCIA_EXIGIR_IF_MATCH", "false").lower() == "true"
+
+    # Chaves de API (PDV, integrações): intervalo (segundos) para ver as
+    # chaves criadas ou revogadas por outros processos
+    CHAVES_API_INTERVALO_VERIFICACAO: int = int(os.getenv("CHAVES_API_INTERVALO_VERIFICACAO", "30"))
+
+    # Autocomplete por prefixo (limite de chaves controla a memória usada;
+    # intervalo em segundos para ver alterações de outros processos)
+    AUTOCOMPLETE_ATIVO: bool = os.getenv("AUTOCOMPLETE_ATIVO", "true").lower() == "true"
+    AUTOCOMPLETE_MAX_CHAVES: int = int(os.getenv("AUTOCOMPLETE_MAX_CHAVES", "2000000"))
+    AUTOCOMPLETE_LIMITE_PADRAO: int = int(os.getenv("AUTOCOMPLETE_LIMITE_PADRAO", "10"))
+    AUTOCOMPLETE_LIMITE_MAXIMO: int = int(os.getenv("AUTOCOMPLETE_LIMITE_MAXIMO", "50"))
+    AUTOCOMPLETE_INTERVALO_VERIFICACAO: int = int(os.getenv("AUTOCOMPLETE_INTERVALO_VERIFICACAO", "30"))
+
+    # Auditoria assíncrona (tabela logs)
+    AUDITORIA_ATIVA: bool = os.getenv("AUDITORIA_ATIVA", "true").lower() == "true"
+    AUDITORIA_FILA_MAXIMA: int = int(os.getenv("AUDITORIA_FILA_MAXIMA", "10000"))
+    AUDITORIA_TAMANHO_LOTE: int = int(os.getenv("AUDITORIA_TAMANHO_LOTE", "500"))
+    AUDITORIA_INTERVALO_FLUSH: float = float(os.getenv("AUDITORIA_INTERVALO_FLUSH", "1.0"))
+    # "descartar", "bloquear" ou "sincrono"
+    AUDITORIA_POLITICA_FILA_CHEIA: str = os.getenv("AUDITORIA_POLITICA_FILA_CHEIA", "descartar")
+    AUDITORIA_TIMEOUT_BLOQUEIO: float = float(os.getenv("AUDITORIA_TIMEOUT_BLOQUEIO", "0.5"))
+    # Entradas maiores que este tamanho (bytes de JSON) são gravadas compactadas
+    AUDITORIA_LIMITE_COMPACTACAO: int = int(os.getenv("AUDITORIA_LIMITE_COMPACTACAO", "512"))
+    # Retenção: meses completos mantidos em logs antes de ir para logs_arquivo,
+    # meses até a exclusão definitiva (0 = nunca excluir) e tamanho dos lotes
+    AUDITORIA_MESES_ATIVOS: int = int(os.getenv("AUDITORIA_MESES_ATIVOS", "3"))
+    AUDITORIA_RETENCAO_MESES: int = int(os.getenv("AUDITORIA_RETENCAO_MESES", "24"))
+    AUDITORIA_LOTE_RETENCAO: int = int(os.getenv("AUDITORIA_LOTE_RETENCAO", "1000"))
+
+    # Logs estruturados (JSON): nível global, níveis por módulo
+    # ("app.services.auth=DEBUG,sqlalchemy.engine=WARNING") e fração das
+    # chamadas de debug_amostrado() emitidas quando o nível DEBUG está ativo
+    LOG_NIVEL: str = os.getenv("LOG_NIVEL", "INFO")
+    LOG_NIVEIS: str = os.getenv("LOG_NIVEIS", "")
+    LOG_AMOSTRAGEM_DEBUG: float = float(os.getenv("LOG_AMOSTRAGEM_DEBUG", "0.01"))
+
+    # Modo de depuração (ex.: cabeçalho Server-Timing nas respostas)
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    # Comandos SQL idênticos repetidos este número de vezes numa requisição
+    # geram um aviso de possível N+1 no log
+    CONSULTAS_LIMITE_REPETICAO: int = int(os.getenv("CONSULTAS_LIMITE_REPETICAO", "10"))
+
+    # Registro de consultas lentas (buffer circular + log), com EXPLAIN opcional
+    # executado em segundo plano
+    CONSULTAS_LENTAS_LIMITE_MS: float = float(os.getenv("CONSULTAS_LENTAS_LIMITE_MS", "200"))
+    CONSULTAS_LENTAS_MAXIMO: int = int(os.getenv("CONSULTAS_LENTAS_MAXIMO", "200"))
+    CONSULTAS_LENTAS_EXPLAIN: bool = os.getenv("CONSULTAS_LENTAS_EXPLAIN", "false").lower() == "true"
+
+    # Perfilamento sob demanda (X-Perfilar: 1 por administradores): intervalo
+    # entre amostras das pilhas e número de perfis mantidos em memória
+    PERFIL_INTERVALO_MS: float = float(os.getenv("PERFIL_INTERVALO_MS", "2"))
+    PERFIL_MAXIMO: int = int(os.getenv("PERFIL_MAXIMO", "50"))
+
+    # Métricas por rota no formato do Prometheus (GET /metrics)
+    METRICAS_ATIVAS: bool = os.getenv("METRICAS_ATIVAS", "true").lower() == "true"
+
     # Configurações da aplicação
     APP_NAME: str = "SynchroGest"
     APP_VERSION: str = "0.1.0"
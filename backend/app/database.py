@@ -1,21 +1,192 @@
-from sqlalchemy import create_engine
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateSchema
 from app.config import settings
-print("🚀 DATABASE_URL carregada:", settings.DATABASE_URL)
+from app.utils.contexto import loja_atual
+
+logger = logging.getLogger(__name__)
 
+# Migrações do Alembic (backend/alembic)
+DIRETORIO_MIGRACOES = Path(__file__).resolve().parent.parent / "alembic"
 
-# Criar engine do SQLAlchemy
+# Criar engine do SQLAlchemy (banco padrão; sem multiloja, o único)
 engine = create_engine(
     settings.DATABASE_URL, connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
 )
 
-# Criar sessão local
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 # Criar base para os modelos
 Base = declarative_base()
 
+
+def manter_versao(versao: Optional[int]) -> int:
+    """
+    Gerador de version_id_col que mantém a versão (1 na inserção): só as
+    edições de cadastro a incrementam (app.services.concorrencia), mas todo
+    UPDATE do ORM confere a versão lida
+    """
+    return 1 if versao is None else versao
+
+
+def destino_da_loja(loja: str) -> Tuple[str, Optional[str]]:
+    """
+    URL do banco e esquema (ou None) de uma loja, a partir de LOJA_DATABASE_URL
+    e LOJA_ESQUEMA; usado pelo roteador e pelo alembic/env.py (-x loja=...)
+    """
+    url = settings.LOJA_DATABASE_URL.format(loja=loja)
+    esquema = settings.LOJA_ESQUEMA.format(loja=loja.replace("-", "_")) if settings.LOJA_ESQUEMA else None
+    return url, esquema
+
+
+def _preparar_banco_da_loja(conexao, loja: str, esquema: Optional[str]):
+    """
+    Banco novo: cria as tabelas e o marca na última migração (alembic stamp
+    head). Banco existente fora da última migração: só avisa; as migrações
+    rodam em scripts/migrar_lojas.py, não na requisição
+    """
+    from app import models  # Registra as tabelas em Base.metadata (import circular no topo)
+
+    contexto = MigrationContext.configure(conexao, opts={"version_table_schema": esquema})
+    migracoes = ScriptDirectory(str(DIRETORIO_MIGRACOES))
+    revisao = contexto.get_current_revision()
+    if revisao is None and not inspect(conexao).get_table_names(schema=esquema):
+        Base.metadata.create_all(bind=conexao)
+        contexto.stamp(migracoes, "head")
+    elif revisao != migracoes.get_current_head():
+        logger.warning(
+            "Banco da loja fora da última migração; rode scripts/migrar_lojas.py",
+            extra={"loja": loja, "revisao": revisao},
+        )
+
+
+class RoteadorEngines:
+    """
+    Engines das lojas (modo multiloja), criados no primeiro uso de cada loja e
+    mantidos num LRU de LOJA_MAX_ENGINES: o engine menos usado recentemente é
+    descartado (dispose) quando o limite é passado. Cada loja tem o próprio
+    pool, limitado a LOJA_POOL_TAMANHO + LOJA_POOL_EXCEDENTE conexões.
+    """
+
+    def __init__(self):
+        self._engines: "OrderedDict[str, Engine]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ao_criar: List[Callable[[Engine], None]] = []
+        self._ao_descartar: List[Callable[[str], None]] = []
+
+    def ao_criar(self, funcao: Callable[[Engine], None]):
+        """
+        Registra uma função chamada com cada engine criado (e já com o padrão)
+        """
+        self._ao_criar.append(funcao)
+        funcao(engine)
+
+    def ao_descartar(self, funcao: Callable[[str], None]):
+        """
+        Registra uma função chamada com o nome da loja cujo engine saiu do LRU
+        (ex.: para liberar os caches da loja)
+        """
+        self._ao_descartar.append(funcao)
+
+    def engine(self, loja: Optional[str]) -> Engine:
+        if loja is None:
+            return engine
+        with self._lock:
+            existente = self._engines.get(loja)
+            if existente is not None:
+                self._engines.move_to_end(loja)
+                return existente
+
+        # Criado fora da trava: a primeira requisição de uma loja não segura as outras
+        novo = self._criar(loja)
+        descartados = []
+        with self._lock:
+            existente = self._engines.get(loja)
+            if existente is not None:
+                descartados.append((loja, novo))
+                novo = existente
+            else:
+                self._engines[loja] = novo
+                while len(self._engines) > settings.LOJA_MAX_ENGINES:
+                    descartados.append(self._engines.popitem(last=False))
+        for nome, antigo in descartados:
+            # Conexões em uso continuam válidas até serem devolvidas
+            antigo.dispose()
+            if antigo is not novo and nome != loja:
+                for funcao in self._ao_descartar:
+                    funcao(nome)
+        return novo
+
+    def _criar(self, loja: str) -> Engine:
+        url, esquema = destino_da_loja(loja)
+        opcoes = {"pool_size": settings.LOJA_POOL_TAMANHO, "max_overflow": settings.LOJA_POOL_EXCEDENTE}
+        if url.startswith("sqlite"):
+            opcoes["connect_args"] = {"check_same_thread": False}
+            caminho = url.split(":///", 1)[-1]
+            if os.path.dirname(caminho):
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        if esquema:
+            # Mesmo banco, um esquema por loja (PostgreSQL)
+            opcoes["execution_options"] = {"schema_translate_map": {None: esquema}}
+
+        novo = create_engine(url, **opcoes)
+        with novo.begin() as conexao:
+            if esquema:
+                conexao.execute(CreateSchema(esquema, if_not_exists=True))
+            _preparar_banco_da_loja(conexao, loja, esquema)
+        for funcao in self._ao_criar:
+            funcao(novo)
+        return novo
+
+    def lojas(self) -> List[str]:
+        with self._lock:
+            return list(self._engines)
+
+
+roteador = RoteadorEngines()
+
+
+def engine_da_loja(loja: Optional[str]) -> Engine:
+    """
+    Engine do banco da loja (o padrão quando o multiloja está desligado)
+    """
+    return roteador.engine(loja) if settings.MULTILOJA_ATIVO else engine
+
+
+def engine_atual() -> Engine:
+    """
+    Engine da loja da requisição atual
+    """
+    return engine_da_loja(loja_atual.get())
+
+
+class SessaoRoteada(Session):
+    """
+    Sessão ligada ao banco da loja da requisição em que foi criada
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.info["loja"] = loja_atual.get()
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if settings.MULTILOJA_ATIVO:
+            return roteador.engine(self.info["loja"])
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+# Criar sessão local
+SessionLocal = sessionmaker(class_=SessaoRoteada, autocommit=False, autoflush=False, bind=engine)
+
 # Função para obter a sessão do banco de dados
 def get_db():
     """
@@ -1,24 +1,83 @@
 
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.orm.exc import StaleDataError
 from app.routers import auth, usuarios, categorias, produtos, movimentacoes
 from app.routers import clientes, compra_clientes, pagamentos  # 🔹 importa também pagamentos
 from app.routers.auth_cliente import router as auth_cliente_router
 from app.routers.cliente_publico import router as cliente_publico_router
+from app.routers import autocomplete, auditoria, monitoramento, chaves_api
 
 # IMPORTANTE: criação automática de tabelas
-from app.database import Base, engine
+from app.database import Base, engine, roteador
+from app.config import settings
+from app.services.indice_sku import indice_sku
+from app.services.revogacao import revogacao
+from app.services.escrita_adiada import escrita_adiada
+from app.services.estoque_fragmentado import balanceador_estoque
+from app.services.chaves_api import exigir_escopo, indice_chaves_api
+from app.services.autocomplete import iniciar_indices as iniciar_autocomplete, parar_indices as parar_autocomplete
+from app.services.auditoria import escritor as escritor_auditoria
+from app.services.consultas_lentas import consultas_lentas
+from app.services.perfilamento import PerfilamentoMiddleware
+from app.services.limite_taxa import LimiteTaxaMiddleware
+from app.services.lojas import LojasMiddleware, lojas_configuradas
+from app.utils.contexto import ContextoRequisicaoMiddleware
+from app.utils.logs import configurar_logs
+from app.utils import metricas
+from app.utils.consultas import ConsultasMiddleware, instrumentar_engine
+
+# 🔹 Logs estruturados (JSON, gravados em segundo plano)
+configurar_logs()
+logger = logging.getLogger("app")
 
 # 🔹 Criação automática das tabelas
 Base.metadata.create_all(bind=engine)
 
+
+# 🔹 Inicialização e encerramento dos serviços em segundo plano
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Iniciando a aplicação", extra={"banco": engine.url.render_as_string(hide_password=True)})
+    if settings.MULTILOJA_ATIVO:
+        logger.info("Multiloja ativo", extra={"lojas": sorted(lojas_configuradas())})
+    escrita_adiada.iniciar()
+    revogacao.iniciar()
+    indice_chaves_api.iniciar()
+    # Índices do processo inteiro: no multiloja as buscas vão ao banco da loja
+    if settings.INDICE_SKU_ATIVO and not settings.MULTILOJA_ATIVO:
+        indice_sku.iniciar()
+    if settings.AUTOCOMPLETE_ATIVO and not settings.MULTILOJA_ATIVO:
+        iniciar_autocomplete()
+    if settings.AUDITORIA_ATIVA:
+        escritor_auditoria.iniciar()
+    balanceador_estoque.iniciar()
+    yield
+    balanceador_estoque.parar()
+    indice_sku.parar()
+    parar_autocomplete()
+    revogacao.parar()
+    indice_chaves_api.parar()
+    escritor_auditoria.parar()
+    escrita_adiada.parar()
+
+
 # 🔹 Inicialização da aplicação
 app = FastAPI(
     title="SynchroGest API",
     description="API para o sistema de gestão SynchroGest",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# 🔹 Limite de taxa no login e no checkout (429 + Retry-After); registrado antes
+# do CORS para ficar dentro dele e as respostas 429 terem os cabeçalhos CORS
+if settings.LIMITE_TAXA_ATIVO:
+    app.add_middleware(LimiteTaxaMiddleware)
+
 # 🔹 Configuração de CORS (deve vir ANTES dos routers)
 origins = [
     "http://localhost:3000",
@@ -38,29 +97,80 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],     # versão dos registros, reenviada em If-Match
 )
 
-# Incluir routers
+# 🔹 Contexto da requisição (IP etc.) para auditoria e logs
+app.add_middleware(ContextoRequisicaoMiddleware)
+
+# 🔹 Contagem de consultas SQL por requisição (N+1, Server-Timing em DEBUG)
+# (no engine padrão e em cada engine de loja criado pelo roteador)
+roteador.ao_criar(instrumentar_engine)
+roteador.ao_criar(consultas_lentas.instrumentar)
+app.add_middleware(ConsultasMiddleware)
+
+# 🔹 Métricas de latência por rota (middleware mais externo, mede tudo)
+if settings.METRICAS_ATIVAS:
+    app.add_middleware(metricas.MetricasMiddleware)
+
+# 🔹 Perfilamento sob demanda (X-Perfilar: 1 de administradores, janelas de amostragem)
+app.add_middleware(PerfilamentoMiddleware)
+
+# 🔹 Multiloja: loja da requisição (X-Loja ou host) e banco roteado por loja;
+# mais externo de todos, pois os demais middlewares já usam a loja
+if settings.MULTILOJA_ATIVO:
+    app.add_middleware(LojasMiddleware)
+
+# 🔹 Escrita que perdeu para uma edição concorrente do mesmo registro (versão
+# alterada, ver app.services.concorrencia): 409 em vez de erro 500
+@app.exception_handler(StaleDataError)
+async def conflito_de_versao(request, exc):
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "O registro foi alterado por outra requisição. Tente novamente."},
+    )
+
+# Incluir routers (exigir_escopo: routers aceitos também com chave de API, X-API-Key)
 app.include_router(auth.router, prefix="/api/auth", tags=["Autenticação"])
 app.include_router(usuarios.router, prefix="/api/usuarios", tags=["Usuários"])
-app.include_router(categorias.router, prefix="/api/categorias", tags=["Categorias"])
-app.include_router(produtos.router, prefix="/api/produtos", tags=["Produtos"])
-app.include_router(movimentacoes.router, prefix="/api/movimentacoes", tags=["Movimentações"])
+app.include_router(categorias.router, prefix="/api/categorias", tags=["Categorias"],
+                   dependencies=[Depends(exigir_escopo("catalogo"))])
+app.include_router(produtos.router, prefix="/api/produtos", tags=["Produtos"],
+                   dependencies=[Depends(exigir_escopo("catalogo"))])
+app.include_router(movimentacoes.router, prefix="/api/movimentacoes", tags=["Movimentações"],
+                   dependencies=[Depends(exigir_escopo("movimentacoes"))])
 
 # # Rotas cliente
 app.include_router(auth_cliente_router, prefix="/api/auth/clientes", tags=["AuthCliente"])
 app.include_router(clientes.router, prefix="/api/clientes", tags=["Clientes"])
-app.include_router(compra_clientes.router, prefix="/api/compras", tags=["Compras"])
+app.include_router(compra_clientes.router, prefix="/api/compras", tags=["Compras"],
+                   dependencies=[Depends(exigir_escopo("checkout"))])
 app.include_router(cliente_publico_router, prefix="/api/public/clientes", tags=["CadastroCliente"])
 
 # 🔹 Rotas de pagamentos
 app.include_router(pagamentos.router, prefix="/api/pagamentos", tags=["Pagamentos"])
 
+# 🔹 Autocomplete das caixas de busca
+app.include_router(autocomplete.router, prefix="/api/autocomplete", tags=["Autocomplete"])
+
+# 🔹 Consulta e retenção da auditoria
+app.include_router(auditoria.router, prefix="/api/auditoria", tags=["Auditoria"])
+
+# 🔹 Chaves de API (terminais de PDV e integrações)
+app.include_router(chaves_api.router, prefix="/api/chaves-api", tags=["Chaves de API"])
+
+# 🔹 Monitoramento (consultas lentas, perfis de requisições)
+app.include_router(monitoramento.router, prefix="/api/monitoramento", tags=["Monitoramento"])
+
 # 🔹 Rotas de teste e status
 @app.get("/api/test")
 def test_api():
     return {"message": "✅ API funcionando corretamente!"}
 
+@app.get("/metrics", include_in_schema=False)
+def exportar_metricas():
+    return PlainTextResponse(metricas.registro.exportar(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def read_root():
     return {"message": "Bem-vindo à API do SynchroGest!"}
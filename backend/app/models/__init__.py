@@ -6,7 +6,10 @@ from app.models.compra_clientes import CompraCliente
 from app.models.compra_itens import CompraItem
 from app.models.clientes import Cliente
 from app.models.pagamentos import Pagamento
-from app.models.log import Log
+from app.models.log import Log, LogArquivo
+from app.models.refresh_token import RefreshToken
+from app.models.chave_api import ChaveApi
+from app.models.estoque_fragmento import EstoqueFragmento
 
 # Exportar todos os modelos para facilitar importações
 __all__ = [
@@ -18,5 +21,9 @@ __all__ = [
     "CompraItens",
     "Clientes",
     "Pagamentos",
-    "Log"
+    "Log",
+    "LogArquivo",
+    "RefreshToken",
+    "ChaveApi",
+    "EstoqueFragmento"
 ]
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database import Base
+
+
+class ChaveApi(Base):
+    __tablename__ = "chaves_api"
+
+    id = Column(Integer, primary_key=True, index=True)
+    nome = Column(String(100), nullable=False)  # ex.: "Caixa 03 - Loja Centro"
+    # Parte pública da chave, para identificá-la em listagens e métricas
+    prefixo = Column(String(16), nullable=False, unique=True)
+    # HMAC-SHA256 da chave completa; o valor em si só é mostrado na criação
+    chave_hash = Column(String(64), nullable=False, unique=True)
+    # Routers liberados, separados por vírgula (ver app.services.chaves_api.ESCOPOS)
+    escopos = Column(String(200), nullable=False)
+    # Usuário em nome de quem a chave age (permissões e autoria na auditoria)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    ativo = Column(Boolean, default=True, nullable=False)
+    data_criacao = Column(DateTime, default=datetime.utcnow)
+    revogada_em = Column(DateTime, nullable=True)
+    # Uso, gravado em lote pela escrita adiada (até ESCRITA_ADIADA_INTERVALO de atraso)
+    usos = Column(Integer, default=0, server_default="0", nullable=False)
+    ultimo_uso = Column(DateTime, nullable=True)
+
+    usuario = relationship("Usuario")
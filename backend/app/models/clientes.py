@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from app.database import Base
+from app.database import Base, manter_versao
 
 
 class Cliente(Base):
@@ -18,6 +18,10 @@ class Cliente(Base):
     pais = Column(String(100), nullable=True)
     data_criacao = Column(DateTime, default=datetime.utcnow)
     data_atualizacao = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Versão do cadastro (ETag; ver app.services.concorrencia)
+    versao = Column(Integer, server_default="1", nullable=False)
+
+    __mapper_args__ = {"version_id_col": versao, "version_id_generator": manter_versao}
 
     # Relacionamento
     compras = relationship("CompraCliente", back_populates="cliente")
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from app.database import Base
+
+
+class EstoqueFragmento(Base):
+    """
+    Parte do estoque de um produto com estoque fragmentado
+    (ver app.services.estoque_fragmentado)
+    """
+    __tablename__ = "estoque_fragmentos"
+
+    produto_id = Column(Integer, ForeignKey("produtos.id", ondelete="CASCADE"), primary_key=True)
+    fragmento = Column(Integer, primary_key=True)  # 0 .. Produto.fragmentos_estoque - 1
+    quantidade = Column(Integer, default=0, nullable=False)
@@ -1,20 +1,54 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
 
 class Log(Base):
     __tablename__ = "logs"
-    
+
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
     acao = Column(String(50), nullable=False)
     tabela_afetada = Column(String(50), nullable=True)
     registro_id = Column(Integer, nullable=True)
-    dados_antigos = Column(JSON, nullable=True)
-    dados_novos = Column(JSON, nullable=True)
+    # none_as_null: None é gravado como NULL do SQL, e não como o JSON 'null'
+    # Em atualizações, guardam apenas os campos alterados
+    dados_antigos = Column(JSON(none_as_null=True), nullable=True)
+    dados_novos = Column(JSON(none_as_null=True), nullable=True)
+    # Entradas grandes: {"antigos": ..., "novos": ...} em JSON compactado com zlib
+    dados_compactados = Column(LargeBinary, nullable=True)
     data_hora = Column(DateTime, default=datetime.utcnow)
     ip = Column(String(50), nullable=True)
-    
+
     # Relacionamentos
     usuario = relationship("Usuario")
+
+    __table_args__ = (
+        Index("ix_logs_tabela_registro", "tabela_afetada", "registro_id", "data_hora"),
+        Index("ix_logs_usuario_data", "usuario_id", "data_hora"),
+        Index("ix_logs_data_hora", "data_hora"),
+    )
+
+
+class LogArquivo(Base):
+    """
+    Logs de meses anteriores, movidos da tabela logs pela política de retenção
+    """
+    __tablename__ = "logs_arquivo"
+
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, nullable=True)
+    acao = Column(String(50), nullable=False)
+    tabela_afetada = Column(String(50), nullable=True)
+    registro_id = Column(Integer, nullable=True)
+    dados_antigos = Column(JSON(none_as_null=True), nullable=True)
+    dados_novos = Column(JSON(none_as_null=True), nullable=True)
+    dados_compactados = Column(LargeBinary, nullable=True)
+    data_hora = Column(DateTime)
+    ip = Column(String(50), nullable=True)
+
+    __table_args__ = (
+        Index("ix_logs_arquivo_tabela_registro", "tabela_afetada", "registro_id", "data_hora"),
+        Index("ix_logs_arquivo_usuario_data", "usuario_id", "data_hora"),
+        Index("ix_logs_arquivo_data_hora", "data_hora"),
+    )
@@ -9,7 +9,7 @@ class Movimentacao(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False)
-    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)  # nulo nas vendas feitas por clientes
     # tipo = Column(Enum("entrada", "saida", name="tipo_enum"), nullable=False)
     tipo = Column(String(20), nullable=False)
     quantidade = Column(Integer, nullable=False)
@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Enum
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from app.database import Base
+from app.database import Base, manter_versao
 
 class Pagamento(Base):
     __tablename__ = "pagamentos"
@@ -14,6 +14,10 @@ class Pagamento(Base):
     status = Column(String(20), default="pendente")
     valor = Column(Float, nullable=False)
     data_criacao = Column(DateTime, default=datetime.utcnow)
+    # Versão do registro (ETag; ver app.services.concorrencia)
+    versao = Column(Integer, server_default="1", nullable=False)
+
+    __mapper_args__ = {"version_id_col": versao, "version_id_generator": manter_versao}
 
     compra = relationship("CompraCliente", back_populates="pagamento")
     cliente = relationship("Cliente", back_populates="pagamentos")
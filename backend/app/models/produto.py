@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, Text, Numeric, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from app.database import Base
+from app.database import Base, manter_versao
 
 class Produto(Base):
     __tablename__ = "produtos"
@@ -17,9 +17,16 @@ class Produto(Base):
     quantidade = Column(Integer, default=0)
     quantidade_minima = Column(Integer, default=0)
     quantidade_maxima = Column(Integer, nullable=True)
+    # Estoque dividido em N linhas de estoque_fragmentos (0 = só a coluna
+    # quantidade); com N > 0, quantidade é a soma consolidada periodicamente
+    fragmentos_estoque = Column(Integer, default=0, server_default="0", nullable=False)
     imagem_url = Column(String(255), nullable=True)
     data_criacao = Column(DateTime, default=datetime.utcnow)
     data_atualizacao = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Versão do cadastro (ETag; ver app.services.concorrencia)
+    versao = Column(Integer, server_default="1", nullable=False)
+
+    __mapper_args__ = {"version_id_col": versao, "version_id_generator": manter_versao}
     
     # Relacionamentos
     categoria = relationship("Categoria", back_populates="produtos")
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # HMAC-SHA256 do token; o valor em si só existe no cliente
+    token_hash = Column(String(64), nullable=False, unique=True)
+    # Tokens da mesma cadeia de rotações (revogados juntos em caso de reuso)
+    familia = Column(String(32), nullable=False, index=True)
+    tipo = Column(String(20), nullable=False)  # "usuario" ou "cliente"
+    titular_id = Column(Integer, nullable=False)
+    # token_versao do usuário na emissão (ver app.services.revogacao)
+    versao = Column(Integer, nullable=False, default=0)
+    data_criacao = Column(DateTime, default=datetime.utcnow)
+    expira_em = Column(DateTime, nullable=False)
+    usado_em = Column(DateTime, nullable=True)
+    revogado_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_titular", "tipo", "titular_id"),
+    )
@@ -17,6 +17,8 @@ class Usuario(Base):
     ativo = Column(Boolean, default=True)
     data_criacao = Column(DateTime, default=datetime.utcnow)
     ultimo_login = Column(DateTime, nullable=True)
+    # Incrementado ao alterar nível, estado ou senha; revoga os tokens já emitidos
+    token_versao = Column(Integer, default=0, server_default="0", nullable=False)
 
     # @property
     # def is_admin(self):
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+
+from app.database import get_db
+from app.models.usuario import Usuario
+from app.schemas.log import LogAuditoria, AuditoriaStatus, RetencaoResultado
+from app.services.auth import check_admin_user
+from app.services import auditoria
+
+router = APIRouter()
+
+@router.get("/", response_model=List[LogAuditoria])
+async def listar_logs(
+    tabela: Optional[str] = None,
+    registro_id: Optional[int] = None,
+    usuario_id: Optional[int] = None,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    arquivo: bool = Query(False, description="Consultar os meses já arquivados (logs_arquivo)"),
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    current_user: Usuario = Depends(check_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Consulta o histórico de auditoria por tabela e registro, por usuário e/ou
+    por período [inicio, fim), do mais recente para o mais antigo
+    (apenas administradores)
+    """
+    return auditoria.consultar(
+        db,
+        tabela=tabela,
+        registro_id=registro_id,
+        usuario_id=usuario_id,
+        inicio=inicio,
+        fim=fim,
+        arquivo=arquivo,
+        skip=skip,
+        limit=limit,
+    )
+
+@router.get("/status", response_model=AuditoriaStatus)
+async def status_auditoria(
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Situação da fila de gravação da auditoria (apenas administradores)
+    """
+    return auditoria.escritor.status()
+
+@router.post("/retencao", response_model=RetencaoResultado)
+def aplicar_retencao(
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Arquiva os meses antigos e exclui os logs fora do prazo de retenção
+    (apenas administradores)
+    """
+    return auditoria.aplicar_retencao()
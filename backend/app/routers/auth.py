@@ -5,8 +5,10 @@ from datetime import datetime, timedelta
 
 from app.database import get_db
 from app.models.usuario import Usuario
-from app.schemas.usuario import Token, Usuario as UsuarioSchema
-from app.services.auth import authenticate_user, get_current_user
+from app.schemas.usuario import RefreshTokenRequest, Token, Usuario as UsuarioSchema
+from app.services import refresh_tokens
+from app.services.auth import authenticate_user, claims_usuario, get_current_user
+from app.services.escrita_adiada import escrita_adiada
 from app.utils.security import create_access_token
 from app.config import settings
 
@@ -29,25 +31,51 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Atualizar último login
-    user.ultimo_login = datetime.utcnow()
-    db.commit()
+    # Atualizar último login (gravado em lote, sem commit nesta requisição)
+    escrita_adiada.definir(Usuario, user.id, "ultimo_login", datetime.utcnow())
     
     # Criar token de acesso
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
+        data=claims_usuario(user), expires_delta=access_token_expires
     )
+    refresh_token = refresh_tokens.emitir(db, "usuario", user.id, user.token_versao or 0)
+    refresh_tokens.registrar_login("usuario")
+
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.post("/refresh", response_model=Token)
+def renovar_token(dados: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Emite um novo token de acesso (e um novo refresh token) sem verificar a senha.
+    Vale para usuários e clientes; cada refresh token só pode ser usado uma vez.
+    """
+    return refresh_tokens.renovar(db, dados.refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(dados: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Revoga o refresh token e todos os renovados a partir dele
+    """
+    refresh_tokens.revogar(db, dados.refresh_token)
+    return None
 
 @router.get("/me", response_model=UsuarioSchema)
-async def read_users_me(current_user: Usuario = Depends(get_current_user)):
+def read_users_me(current_user: Usuario = Depends(get_current_user), db: Session = Depends(get_db)):
     """
     Endpoint para obter informações do usuário autenticado
     """
-    return current_user
+    # O token só traz as claims de autorização; o cadastro vem do banco
+    usuario = db.get(Usuario, current_user.id)
+    if usuario is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credenciais inválidas",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return usuario
 
 
 @router.post("/verify-admin")
@@ -7,6 +7,7 @@ from app.models.clientes import Cliente
 from app.schemas.usuario import Token
 from app.utils.security import create_access_token
 from app.services.auth_cliente import authenticate_cliente
+from app.services import refresh_tokens
 
 
 router = APIRouter()
@@ -19,4 +20,6 @@ def login_cliente(form_data: OAuth2PasswordRequestForm = Depends(), db: Session
         raise HTTPException(status_code=401, detail="Email ou senha inválidos")
 
     token = create_access_token(data={"sub": str(cliente.id), "tipo": "cliente"})
-    return {"access_token": token, "token_type": "bearer"}
+    refresh_token = refresh_tokens.emitir(db, "cliente", cliente.id)
+    refresh_tokens.registrar_login("cliente")
+    return {"access_token": token, "token_type": "bearer", "refresh_token": refresh_token}
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+
+from app.database import get_db
+from app.models.usuario import Usuario
+from app.schemas.autocomplete import Sugestao, AutocompleteStatus
+from app.services.auth import get_current_user, check_admin_user
+from app.services.autocomplete import sugerir, indices
+
+router = APIRouter()
+
+@router.get("/produtos", response_model=List[Sugestao])
+async def autocomplete_produtos(
+    q: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """
+    Sugestões de produtos cujo nome (ou palavra do nome) ou SKU começa com q.
+    A busca ignora acentos e maiúsculas.
+    """
+    return sugerir(db, "produtos", q, limit)
+
+@router.get("/clientes", response_model=List[Sugestao])
+async def autocomplete_clientes(
+    q: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Sugestões de clientes cujo nome (ou palavra do nome) ou email começa com q.
+    A busca ignora acentos e maiúsculas.
+    """
+    return sugerir(db, "clientes", q, limit)
+
+@router.get("/status", response_model=Dict[str, AutocompleteStatus])
+async def status_autocomplete(
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Tamanho e disponibilidade dos índices de autocomplete (apenas administradores)
+    """
+    return {entidade: indice.status() for entidade, indice in indices.items()}
@@ -1,25 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
 from app.models.categoria import Categoria
+from app.models.produto import Produto
 from app.models.usuario import Usuario
 from app.schemas.categoria import CategoriaCreate, CategoriaUpdate, Categoria as CategoriaSchema
 from app.services.auth import get_current_user
+from app.utils.projecoes import resolver_campos, colunas, resposta_parcial
 
 router = APIRouter()
 
+# Projeções nomeadas para ?view= (ex.: dropdown de categorias)
+PROJECOES_CATEGORIA = {
+    "picker": ("id", "nome"),
+}
+
 @router.get("/", response_model=List[CategoriaSchema])
 async def listar_categorias(
     skip: int = 0, 
     limit: int = 100, 
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Lista todas as categorias
+    Lista todas as categorias.
+    Use fields=id,nome ou view=picker para retornar apenas algumas colunas.
     """
+    campos = resolver_campos(CategoriaSchema, Categoria, fields, view, PROJECOES_CATEGORIA)
+    if campos:
+        categorias = db.query(*colunas(Categoria, campos)).offset(skip).limit(limit).all()
+        return resposta_parcial(CategoriaSchema, campos, categorias)
+
     categorias = db.query(Categoria).offset(skip).limit(limit).all()
     return categorias
 
@@ -124,8 +139,8 @@ async def excluir_categoria(
             detail="Categoria não encontrada"
         )
     
-    # Verificar se existem produtos associados a esta categoria
-    if categoria.produtos:
+    # Verificar se existem produtos associados a esta categoria (sem carregar todos)
+    if db.query(Produto.id).filter(Produto.categoria_id == categoria_id).first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Não é possível excluir categoria com produtos associados"
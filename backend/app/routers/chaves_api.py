@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List
+
+from app.database import get_db
+from app.models.chave_api import ChaveApi
+from app.models.usuario import Usuario
+from app.schemas.chave_api import ChaveApiCreate, ChaveApi as ChaveApiSchema, ChaveApiCriada
+from app.services.auth import check_admin_user
+from app.services.chaves_api import gerar_chave, indice_chaves_api
+from app.utils.contexto import loja_atual
+from app.utils.security import hash_segredo
+
+router = APIRouter()
+
+
+def _para_schema(chave: ChaveApi) -> dict:
+    return {
+        "id": chave.id,
+        "nome": chave.nome,
+        "prefixo": chave.prefixo,
+        "escopos": chave.escopos.split(","),
+        "usuario_id": chave.usuario_id,
+        "ativo": chave.ativo,
+        "data_criacao": chave.data_criacao,
+        "revogada_em": chave.revogada_em,
+        "usos": chave.usos or 0,
+        "ultimo_uso": chave.ultimo_uso,
+    }
+
+@router.get("/", response_model=List[ChaveApiSchema])
+def listar_chaves_api(
+    current_user: Usuario = Depends(check_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Lista as chaves de API e o uso de cada uma (apenas administradores)
+    """
+    return [_para_schema(chave) for chave in db.query(ChaveApi).order_by(ChaveApi.id).all()]
+
+@router.post("/", response_model=ChaveApiCriada, status_code=status.HTTP_201_CREATED)
+def criar_chave_api(
+    dados: ChaveApiCreate,
+    current_user: Usuario = Depends(check_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Cria uma chave de API para um terminal ou integração (apenas administradores).
+    A chave só é mostrada nesta resposta.
+    """
+    usuario_id = dados.usuario_id or current_user.id
+    usuario = db.get(Usuario, usuario_id)
+    if usuario is None or not usuario.ativo:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usuário da chave não encontrado ou inativo"
+        )
+
+    valor, prefixo = gerar_chave()
+    chave = ChaveApi(
+        nome=dados.nome,
+        prefixo=prefixo,
+        chave_hash=hash_segredo(valor),
+        escopos=",".join(sorted(set(dados.escopos))),
+        usuario_id=usuario_id,
+    )
+    db.add(chave)
+    db.commit()
+    db.refresh(chave)
+    indice_chaves_api.carregar(loja_atual.get())
+
+    return {**_para_schema(chave), "chave": valor}
+
+@router.delete("/{chave_id}", status_code=status.HTTP_204_NO_CONTENT)
+def revogar_chave_api(
+    chave_id: int,
+    current_user: Usuario = Depends(check_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Revoga uma chave de API (apenas administradores)
+    """
+    chave = db.get(ChaveApi, chave_id)
+    if chave is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chave de API não encontrada"
+        )
+    if chave.ativo:
+        chave.ativo = False
+        chave.revogada_em = datetime.utcnow()
+        db.commit()
+        indice_chaves_api.carregar(loja_atual.get())
+    return None
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -7,12 +7,19 @@ from app.models.clientes import Cliente as ClienteModel
 from app.schemas.clientes import ClienteCreate, ClienteUpdate, ClienteResponse as ClienteSchema
 from app.models.usuario import Usuario
 from app.services.auth import get_current_user
+from app.services.concorrencia import definir_etag, verificar_if_match, gravar_edicao
+from app.utils.projecoes import resolver_campos, colunas, resposta_parcial
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 router = APIRouter()
 
+# Projeções nomeadas para ?view=
+PROJECOES_CLIENTE = {
+    "picker": ("id", "nome", "email"),
+}
+
 # ----------------------------
 # LISTAR CLIENTES
 # ----------------------------
@@ -21,13 +28,17 @@ async def listar_clientes(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Lista todos os clientes com opção de filtro por nome ou email
+    Lista todos os clientes com opção de filtro por nome ou email.
+    Use fields=id,nome,... ou view=picker para retornar apenas algumas colunas.
     """
-    query = db.query(ClienteModel)
+    campos = resolver_campos(ClienteSchema, ClienteModel, fields, view, PROJECOES_CLIENTE)
+    query = db.query(*colunas(ClienteModel, campos)) if campos else db.query(ClienteModel)
 
     if search:
         search_term = f"%{search}%"
@@ -36,6 +47,8 @@ async def listar_clientes(
         )
 
     clientes = query.offset(skip).limit(limit).all()
+    if campos:
+        return resposta_parcial(ClienteSchema, campos, clientes)
     return clientes
 
 # ----------------------------
@@ -72,12 +85,14 @@ async def criar_cliente(
 @router.get("/{cliente_id}", response_model=ClienteSchema)
 async def obter_cliente(
     cliente_id: int,
+    response: Response,
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     cliente = db.query(ClienteModel).filter(ClienteModel.id == cliente_id).first()
     if not cliente:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado.")
+    definir_etag(response, cliente)
     return cliente
 
 # ----------------------------
@@ -87,12 +102,16 @@ async def obter_cliente(
 async def atualizar_cliente(
     cliente_id: int,
     cliente_update: ClienteUpdate,
+    request: Request,
+    response: Response,
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     cliente = db.query(ClienteModel).filter(ClienteModel.id == cliente_id).first()
     if not cliente:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado.")
+    # Edição sobre uma versão antiga (If-Match) é recusada com 412
+    verificar_if_match(request, cliente)
 
     # Verificar se o novo email já está sendo usado
     if cliente_update.email and cliente_update.email != cliente.email:
@@ -108,9 +127,11 @@ async def atualizar_cliente(
     for key, value in update_data.items():
         setattr(cliente, key, value)
 
+    gravar_edicao(db, cliente)
+    definir_etag(response, cliente)
+    resposta = ClienteSchema.model_validate(cliente)
     db.commit()
-    db.refresh(cliente)
-    return cliente
+    return resposta
 
 # ----------------------------
 # DELETAR CLIENTE
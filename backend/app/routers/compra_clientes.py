@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime
 
 from app.database import get_db
@@ -10,6 +10,7 @@ from app.models.produto import Produto
 from app.models.movimentacao import Movimentacao
 from app.schemas.compra_clientes import CompraClienteCreate, CompraClienteResponse
 from app.services.auth_cliente import get_current_cliente
+from app.services import estoque_fragmentado
 
 router = APIRouter(tags=["Compras"])
 
@@ -36,6 +37,10 @@ def finalizar_compra(
     db.add(nova_compra)
     db.flush()  # gera o ID da compra antes de adicionar itens
 
+    # Carregar todos os produtos da compra em uma única consulta
+    ids_produtos = {item.produto_id for item in compra.itens}
+    produtos = {p.id: p for p in db.query(Produto).filter(Produto.id.in_(ids_produtos))}
+
     # Para cada item comprado, criar o registro e gerar movimentação de saída
     for item in compra.itens:
         # Salvar item da compra
@@ -49,21 +54,28 @@ def finalizar_compra(
         db.add(novo_item)
 
         # Atualizar estoque do produto
-        produto = db.query(Produto).filter(Produto.id == item.produto_id).first()
+        produto = produtos.get(item.produto_id)
         if not produto:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Produto com ID {item.produto_id} não encontrado"
             )
 
-        if produto.quantidade < item.quantidade:
+        if produto.fragmentos_estoque:
+            # Estoque fragmentado: baixa num fragmento, sem bloquear a linha do produto
+            if not estoque_fragmentado.retirar(db, produto, item.quantidade):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Estoque insuficiente para o produto '{produto.nome}'. "
+                           f"Disponível: {estoque_fragmentado.quantidade_total(db, produto.id)}"
+                )
+        elif not estoque_fragmentado.retirar_do_produto(db, produto, item.quantidade):
+            # Baixa atômica na linha do produto: o saldo lido antes pode ter sido vendido
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Estoque insuficiente para o produto '{produto.nome}'. Disponível: {produto.quantidade}"
             )
 
-        produto.quantidade -= item.quantidade
-
         # Criar movimentação de saída
         movimentacao = Movimentacao(
             produto_id=item.produto_id,
@@ -86,7 +98,7 @@ def listar_compras(db: Session = Depends(get_db)):
     """
     Lista todas as compras registradas.
     """
-    compras = db.query(CompraCliente).all()
+    compras = db.query(CompraCliente).options(selectinload(CompraCliente.itens)).all()
     return compras
 
 
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from typing import List, Literal
+
+from app.models.usuario import Usuario
+from app.schemas.monitoramento import (
+    ConsultaLenta, PerfilResumo, PerfilTop, AmostragemPerfis, AmostragemStatus
+)
+from app.services.auth import check_admin_user
+from app.services.consultas_lentas import consultas_lentas
+from app.services.perfilamento import perfilador
+
+router = APIRouter()
+
+@router.get("/consultas-lentas", response_model=List[ConsultaLenta])
+async def listar_consultas_lentas(
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Consultas mais lentas que CONSULTAS_LENTAS_LIMITE_MS, da mais recente para
+    a mais antiga (apenas administradores)
+    """
+    return consultas_lentas.listar()
+
+@router.delete("/consultas-lentas", status_code=status.HTTP_204_NO_CONTENT)
+async def limpar_consultas_lentas(
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Esvazia o buffer de consultas lentas (apenas administradores)
+    """
+    consultas_lentas.limpar()
+    return None
+
+@router.get("/perfis", response_model=List[PerfilResumo])
+async def listar_perfis(
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Perfis de requisições guardados em memória, do mais recente para o mais
+    antigo (apenas administradores)
+    """
+    return perfilador.listar()
+
+@router.get("/perfis/{perfil_id}", response_model=PerfilTop)
+async def obter_perfil(
+    perfil_id: str,
+    formato: Literal["top", "folded"] = "top",
+    limite: int = Query(30, ge=1, le=500),
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Perfil de uma requisição: tabela das funções com mais amostras (top) ou
+    pilhas no formato folded, aceito por flamegraph.pl e speedscope
+    (apenas administradores)
+    """
+    perfil = perfilador.obter(perfil_id)
+    if perfil is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Perfil não encontrado"
+        )
+    if formato == "folded":
+        return PlainTextResponse(perfil.folded())
+    return {**perfil.resumo(), "funcoes": perfil.top(limite)}
+
+@router.get("/perfis-amostragem", response_model=AmostragemStatus)
+async def status_amostragem(
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Situação da janela de amostragem aleatória (apenas administradores)
+    """
+    return perfilador.amostragem_status()
+
+@router.post("/perfis-amostragem", response_model=AmostragemStatus)
+async def iniciar_amostragem(
+    amostragem: AmostragemPerfis,
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Perfila uma porcentagem aleatória das requisições durante a janela
+    informada (apenas administradores)
+    """
+    perfilador.iniciar_amostragem(amostragem.percentual, amostragem.duracao_segundos)
+    return perfilador.amostragem_status()
+
+@router.delete("/perfis-amostragem", response_model=AmostragemStatus)
+async def parar_amostragem(
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Encerra a janela de amostragem aleatória (apenas administradores)
+    """
+    perfilador.parar_amostragem()
+    return perfilador.amostragem_status()
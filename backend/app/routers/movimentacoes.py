@@ -10,6 +10,7 @@ from app.models.produto import Produto
 from app.models.usuario import Usuario
 from app.schemas.movimentacao import MovimentacaoCreate, MovimentacaoUpdate, Movimentacao as MovimentacaoSchema
 from app.services.auth import get_current_user
+from app.services import estoque_fragmentado
 
 router = APIRouter()
 
@@ -75,7 +76,7 @@ async def criar_movimentacao(
         )
     
     # Verificar estoque disponível para saídas
-    if movimentacao.tipo == "saida" and produto.quantidade < movimentacao.quantidade:
+    if not produto.fragmentos_estoque and movimentacao.tipo == "saida" and produto.quantidade < movimentacao.quantidade:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Estoque insuficiente. Disponível: {produto.quantidade}"
@@ -88,15 +89,27 @@ async def criar_movimentacao(
         tipo=movimentacao.tipo,
         quantidade=movimentacao.quantidade,
         data=datetime.utcnow(),
-        observacoes=movimentacao.observacoes,
-        projeto_id=movimentacao.projeto_id
+        observacoes=movimentacao.observacoes
     )
     
     # Atualizar estoque do produto
-    if movimentacao.tipo == "entrada":
-        produto.quantidade += movimentacao.quantidade
-    else:  # saida
-        produto.quantidade -= movimentacao.quantidade
+    if produto.fragmentos_estoque:
+        # Estoque fragmentado: altera um fragmento, sem bloquear a linha do produto
+        if movimentacao.tipo == "entrada":
+            estoque_fragmentado.adicionar(db, produto, movimentacao.quantidade)
+        elif not estoque_fragmentado.retirar(db, produto, movimentacao.quantidade):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Estoque insuficiente. Disponível: {estoque_fragmentado.quantidade_total(db, produto.id)}"
+            )
+    elif movimentacao.tipo == "entrada":
+        # Soma no banco (quantidade = quantidade + n): não perde baixas simultâneas
+        produto.quantidade = Produto.quantidade + movimentacao.quantidade
+    elif not estoque_fragmentado.retirar_do_produto(db, produto, movimentacao.quantidade):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Estoque insuficiente. Disponível: {produto.quantidade}"
+        )
     
     db.add(db_movimentacao)
     db.commit()
@@ -174,9 +187,20 @@ async def excluir_movimentacao(
     # Reverter o estoque
     produto = db.query(Produto).filter(Produto.id == movimentacao.produto_id).first()
     if movimentacao.tipo == "entrada":
-        produto.quantidade -= movimentacao.quantidade
+        # Estornar uma entrada é uma baixa: recusada se o saldo já foi vendido
+        if produto.fragmentos_estoque:
+            estornada = estoque_fragmentado.retirar(db, produto, movimentacao.quantidade)
+        else:
+            estornada = estoque_fragmentado.retirar_do_produto(db, produto, movimentacao.quantidade)
+        if not estornada:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Estoque insuficiente para estornar a entrada"
+            )
+    elif produto.fragmentos_estoque:
+        estoque_fragmentado.adicionar(db, produto, movimentacao.quantidade)
     else:  # saida
-        produto.quantidade += movimentacao.quantidade
+        produto.quantidade = Produto.quantidade + movimentacao.quantidade
     
     db.delete(movimentacao)
     db.commit()
@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.pagamentos import Pagamento
 from app.schemas.pagamentos import PagamentoCreate, PagamentoResponse
+from app.services.concorrencia import definir_etag, verificar_if_match, gravar_edicao
 from typing import List
 
 router = APIRouter(
-    prefix="/api/pagamentos",
     tags=["pagamentos"]
 )
 
@@ -29,22 +29,29 @@ def listar_pagamentos(db: Session = Depends(get_db)):
     return db.query(Pagamento).all()
 
 @router.get("/{pagamento_id}", response_model=PagamentoResponse)
-def obter_pagamento(pagamento_id: int, db: Session = Depends(get_db)):
+def obter_pagamento(pagamento_id: int, response: Response, db: Session = Depends(get_db)):
     pagamento = db.query(Pagamento).filter(Pagamento.id == pagamento_id).first()
     if not pagamento:
         raise HTTPException(status_code=404, detail="Pagamento não encontrado")
+    definir_etag(response, pagamento)
     return pagamento
 
 @router.put("/{pagamento_id}", response_model=PagamentoResponse)
-def atualizar_pagamento(pagamento_id: int, dados: PagamentoCreate, db: Session = Depends(get_db)):
+def atualizar_pagamento(
+    pagamento_id: int, dados: PagamentoCreate, request: Request, response: Response, db: Session = Depends(get_db)
+):
     pagamento = db.query(Pagamento).filter(Pagamento.id == pagamento_id).first()
     if not pagamento:
         raise HTTPException(status_code=404, detail="Pagamento não encontrado")
+    # Edição sobre uma versão antiga (If-Match) é recusada com 412
+    verificar_if_match(request, pagamento)
     for key, value in dados.dict(exclude_unset=True).items():
         setattr(pagamento, key, value)
+    gravar_edicao(db, pagamento)
+    definir_etag(response, pagamento)
+    resposta = PagamentoResponse.model_validate(pagamento)
     db.commit()
-    db.refresh(pagamento)
-    return pagamento
+    return resposta
 
 @router.delete("/{pagamento_id}")
 def deletar_pagamento(pagamento_id: int, db: Session = Depends(get_db)):
@@ -1,50 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from sqlalchemy import desc
 
 from app.database import get_db
+from app.config import settings
 from app.models.produto import Produto
 from app.models.categoria import Categoria
 from app.models.usuario import Usuario
 # from app.schemas.produto import ProdutoCreate, ProdutoUpdate, Produto as ProdutoSchema
-from app.schemas.produto import ProdutoCreate, ProdutoUpdate, Produto as ProdutoSchema, ProdutoStats
-from app.services.auth import get_current_user
+from app.schemas.produto import ProdutoCreate, ProdutoUpdate, Produto as ProdutoSchema, ProdutoStats, ImportacaoResultado
+from app.schemas.produto import ProdutoAtualizacaoMassa, ProdutoAtualizacaoMassaResultado
+from app.schemas.produto import ProdutoLookup, ProdutoLookupResultado, ProdutoResumoSku, IndiceSkuStatus
+from app.schemas.produto import EstoqueFragmentado, EstoqueFragmentadoConfig
+from app.services.auth import get_current_user, check_admin_user
+from app.services.importacao_produtos import ArquivoInvalido, FormatoNaoSuportado, ler_linhas, importar_produtos
+from app.services.atualizacao_produtos import atualizar_por_itens, atualizar_por_filtro
+from app.services.busca_produtos import parse_ids, buscar_em_lote
+from app.services.indice_sku import indice_sku, buscar_por_sku
+from app.services.auditoria import registrar as registrar_auditoria
+from app.services.coalescencia import Coalescedor
+from app.services import estoque_fragmentado
+from app.services.concorrencia import definir_etag, verificar_if_match, gravar_edicao
+from app.utils.projecoes import resolver_campos, colunas, resposta_parcial, serializar
 
 router = APIRouter()
 
+# Projeções nomeadas para ?view= (ex.: seletor de produtos da tela de movimentações)
+PROJECOES_PRODUTO = {
+    "picker": ("id", "nome", "codigo_sku"),
+    "resumo": ("id", "nome", "codigo_sku", "categoria_id", "unidade_medida", "preco_venda", "quantidade"),
+}
+
+# Listagens idênticas e simultâneas (catálogo da loja virtual) fazem uma só consulta
+coalescencia_produtos = Coalescedor("produtos", tabelas=(Produto.__tablename__,))
+
 @router.get("/", response_model=List[ProdutoSchema])
 async def listar_produtos(
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
     categoria_id: Optional[int] = None,
     search: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
+    ids: Optional[str] = None,
     # current_user: Usuario = Depends(get_current_user), *(removido para deixar Público)
     db: Session = Depends(get_db)
 ):
     """
-    Lista todos os produtos com opções de filtro
+    Lista todos os produtos com opções de filtro.
+    Use fields=id,nome,... ou view=picker|resumo para retornar apenas algumas colunas.
+    Com ids=1,2,3 retorna os produtos na ordem pedida (sem paginação); os IDs não
+    encontrados são informados no cabeçalho X-Ids-Nao-Encontrados.
     """
-    query = db.query(Produto)
-    
-    # Aplicar filtros se fornecidos
-    if categoria_id:
-        query = query.filter(Produto.categoria_id == categoria_id)
-    
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Produto.nome.ilike(search_term)) | 
-            (Produto.codigo_sku.ilike(search_term)) |
-            (Produto.descricao.ilike(search_term))
-        )
-    
-    # Ordenar por nome
-    query = query.order_by(Produto.nome)
-    
-    # Aplicar paginação
-    produtos = query.offset(skip).limit(limit).all()
-    return produtos
+    campos = resolver_campos(ProdutoSchema, Produto, fields, view, PROJECOES_PRODUTO)
+
+    if ids is not None:
+        query = db.query(*colunas(Produto, campos)) if campos else db.query(Produto)
+        produtos, nao_encontrados, _ = buscar_em_lote(query, parse_ids(ids))
+        if campos:
+            response = resposta_parcial(ProdutoSchema, campos, produtos)
+        response.headers["X-Ids-Nao-Encontrados"] = ",".join(str(i) for i in nao_encontrados)
+        return response if campos else produtos
+
+    def consultar() -> bytes:
+        query = db.query(*colunas(Produto, campos)) if campos else db.query(Produto)
+
+        # Aplicar filtros se fornecidos
+        if categoria_id:
+            query = query.filter(Produto.categoria_id == categoria_id)
+
+        if search:
+            search_term = f"%{search}%"
+            query = query.filter(
+                (Produto.nome.ilike(search_term)) | 
+                (Produto.codigo_sku.ilike(search_term)) |
+                (Produto.descricao.ilike(search_term))
+            )
+
+        # Ordenar por nome
+        query = query.order_by(Produto.nome)
+
+        # Aplicar paginação
+        produtos = query.offset(skip).limit(limit).all()
+        return serializar(ProdutoSchema, campos, produtos)
+
+    # Chave normalizada (filtros vazios valem como ausentes; campos já resolvidos)
+    chave = (skip, limit, categoria_id or None, search or None, campos)
+    conteudo = await coalescencia_produtos.executar(chave, consultar)
+    return Response(content=conteudo, media_type="application/json")
 
 @router.post("/", response_model=ProdutoSchema, status_code=status.HTTP_201_CREATED)
 async def criar_produto(
@@ -92,6 +137,78 @@ async def criar_produto(
     
     return db_produto
 
+@router.post("/importar", response_model=ImportacaoResultado)
+def importar_arquivo_produtos(
+    arquivo: UploadFile = File(...),
+    atualizar_existentes: bool = True,
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Importa produtos em massa a partir de um arquivo CSV ou XLSX.
+    Produtos com SKU já cadastrado são atualizados só nas colunas presentes
+    no arquivo (ou rejeitados se atualizar_existentes=false). Retorna um
+    relatório de erros por linha.
+    """
+    try:
+        linhas = ler_linhas(arquivo.file, arquivo.filename)
+        resultado = importar_produtos(db, linhas, atualizar_existentes=atualizar_existentes)
+    except FormatoNaoSuportado as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(e)
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Arquivo CSV deve estar codificado em UTF-8"
+        )
+    except ArquivoInvalido as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    registrar_auditoria(
+        "importar", Produto.__tablename__, usuario_id=current_user.id,
+        dados_novos={"arquivo": arquivo.filename, **{k: v for k, v in resultado.items() if k != "erros"}},
+    )
+    return resultado
+
+@router.post("/lookup", response_model=ProdutoLookupResultado)
+async def buscar_produtos_em_lote(
+    dados: ProdutoLookup,
+    db: Session = Depends(get_db)
+):
+    """
+    Busca vários produtos por IDs e/ou SKUs em uma única consulta.
+    Os produtos são retornados na ordem pedida (IDs primeiro, depois SKUs).
+    """
+    produtos, ids, skus = buscar_em_lote(db.query(Produto), dados.ids, dados.skus)
+    return {"produtos": produtos, "nao_encontrados": {"ids": ids, "skus": skus}}
+
+@router.post("/atualizar-em-massa", response_model=ProdutoAtualizacaoMassaResultado)
+async def atualizar_produtos_em_massa(
+    dados: ProdutoAtualizacaoMassa,
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Atualiza vários produtos em uma única transação.
+    Aceita uma lista explícita de produtos (por id ou SKU) com os campos a
+    alterar, ou um filtro com ajustes de preço percentuais/absolutos.
+    """
+    if dados.itens is not None:
+        resultado = atualizar_por_itens(db, dados.itens)
+    else:
+        resultado = atualizar_por_filtro(db, dados.filtro, dados.ajustes, dados.campos)
+
+    registrar_auditoria(
+        "atualizar_em_massa", Produto.__tablename__, usuario_id=current_user.id,
+        dados_novos={"requisicao": dados.model_dump(mode="json", exclude_unset=True), **resultado},
+    )
+    return resultado
+
 @router.get("/baixo-estoque", response_model=List[ProdutoSchema])
 async def listar_produtos_baixo_estoque(
     current_user: Usuario = Depends(get_current_user),
@@ -103,14 +220,43 @@ async def listar_produtos_baixo_estoque(
     produtos = db.query(Produto).filter(Produto.quantidade < Produto.quantidade_minima).all()
     return produtos
 
+@router.get("/sku/{codigo}", response_model=ProdutoResumoSku)
+async def obter_produto_por_sku(
+    codigo: str,
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtém o resumo de um produto pelo código SKU (leitura do ponto de venda).
+    Usa o índice em memória; se ele ainda não estiver pronto, consulta o banco.
+    """
+    produto = buscar_por_sku(db, codigo)
+    if produto is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Produto não encontrado"
+        )
+    return produto
+
+@router.get("/sku-indice/status", response_model=IndiceSkuStatus)
+async def status_indice_sku(
+    current_user: Usuario = Depends(check_admin_user)
+):
+    """
+    Informa se o índice de SKUs está disponível, quantos produtos contém e a
+    memória estimada que ocupa (apenas administradores)
+    """
+    return indice_sku.status()
+
 @router.get("/{produto_id}", response_model=ProdutoSchema)
 async def obter_produto(
     produto_id: int, 
+    response: Response,
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Obtém um produto pelo ID
+    Obtém um produto pelo ID (com a versão no cabeçalho ETag)
     """
     produto = db.query(Produto).filter(Produto.id == produto_id).first()
     if produto is None:
@@ -118,18 +264,78 @@ async def obter_produto(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Produto não encontrado"
         )
+    definir_etag(response, produto)
+
+    if produto.fragmentos_estoque:
+        # Saldo exato (produtos.quantidade é consolidada periodicamente)
+        resposta = ProdutoSchema.model_validate(produto)
+        resposta.quantidade = estoque_fragmentado.quantidade_total(db, produto.id)
+        return resposta
     
     return produto
 
+@router.get("/{produto_id}/fragmentos", response_model=EstoqueFragmentado)
+async def obter_fragmentos_estoque(
+    produto_id: int,
+    current_user: Usuario = Depends(check_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Mostra o saldo de cada fragmento do estoque do produto (apenas administradores)
+    """
+    produto = db.get(Produto, produto_id)
+    if produto is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produto não encontrado")
+    quantidades = estoque_fragmentado.quantidades(db, produto.id) if produto.fragmentos_estoque else []
+    return EstoqueFragmentado(
+        produto_id=produto.id,
+        fragmentos=produto.fragmentos_estoque,
+        quantidade=sum(quantidades) if produto.fragmentos_estoque else produto.quantidade or 0,
+        quantidades=quantidades,
+    )
+
+@router.put("/{produto_id}/fragmentos", response_model=EstoqueFragmentado)
+async def configurar_fragmentos_estoque(
+    produto_id: int,
+    config: EstoqueFragmentadoConfig,
+    current_user: Usuario = Depends(check_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Divide o estoque do produto em fragmentos, para baixas concorrentes sem
+    disputa pela linha do produto (apenas administradores; 0 desativa)
+    """
+    if config.fragmentos > settings.ESTOQUE_FRAGMENTOS_MAXIMO:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O número de fragmentos deve ser no máximo {settings.ESTOQUE_FRAGMENTOS_MAXIMO}"
+        )
+    # Bloqueia o produto: baixas sem fragmentos em andamento (UPDATE na linha do
+    # produto, estoque_fragmentado.retirar_do_produto) terminam antes da divisão
+    produto = db.query(Produto).filter(Produto.id == produto_id).with_for_update().first()
+    if produto is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produto não encontrado")
+    estoque_fragmentado.configurar(db, produto, config.fragmentos)
+    quantidades = estoque_fragmentado.quantidades(db, produto.id)
+    return EstoqueFragmentado(
+        produto_id=produto.id,
+        fragmentos=produto.fragmentos_estoque,
+        quantidade=produto.quantidade or 0,
+        quantidades=quantidades,
+    )
+
 @router.put("/{produto_id}", response_model=ProdutoSchema)
 async def atualizar_produto(
     produto_id: int, 
     produto_update: ProdutoUpdate, 
+    request: Request,
+    response: Response,
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Atualiza um produto pelo ID
+    Atualiza um produto pelo ID. Com If-Match (ETag do GET), a edição é
+    recusada com 412 se o produto foi alterado depois da leitura.
     """
     produto = db.query(Produto).filter(Produto.id == produto_id).first()
     if produto is None:
@@ -137,6 +343,7 @@ async def atualizar_produto(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Produto não encontrado"
         )
+    verificar_if_match(request, produto)
     
     # Verificar se a categoria existe (se for atualizada)
     if produto_update.categoria_id is not None:
@@ -160,10 +367,13 @@ async def atualizar_produto(
     for key, value in produto_update.dict(exclude_unset=True).items():
         setattr(produto, key, value)
     
+    # UPDATE condicionado à versão lida; a resposta sai dos valores em memória
+    gravar_edicao(db, produto)
+    definir_etag(response, produto)
+    resposta = ProdutoSchema.model_validate(produto)
     db.commit()
-    db.refresh(produto)
     
-    return produto
+    return resposta
 
 @router.delete("/{produto_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def excluir_produto(
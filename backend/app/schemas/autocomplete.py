@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class Sugestao(BaseModel):
+    id: int
+    nome: str
+    detalhe: Optional[str] = None  # SKU do produto ou email do cliente
+
+
+class AutocompleteStatus(BaseModel):
+    disponivel: bool
+    registros: int
+    chaves: int
+    limite_chaves: int
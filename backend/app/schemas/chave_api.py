@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import datetime
+
+EscopoChaveApi = Literal["movimentacoes", "checkout", "catalogo"]
+
+
+class ChaveApiCreate(BaseModel):
+    nome: str = Field(..., min_length=1, max_length=100)
+    escopos: List[EscopoChaveApi] = Field(..., min_length=1)
+    # Usuário em nome de quem a chave age; padrão: o administrador que a cria
+    usuario_id: Optional[int] = None
+
+
+class ChaveApi(BaseModel):
+    id: int
+    nome: str
+    prefixo: str
+    escopos: List[str]
+    usuario_id: int
+    ativo: bool
+    data_criacao: Optional[datetime] = None
+    revogada_em: Optional[datetime] = None
+    # Gravados em lote; podem estar até ESCRITA_ADIADA_INTERVALO segundos atrasados
+    usos: int = 0
+    ultimo_uso: Optional[datetime] = None
+
+
+class ChaveApiCriada(ChaveApi):
+    # Mostrada só nesta resposta; no banco fica apenas o hash
+    chave: str
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+
+class LogAuditoria(BaseModel):
+    id: int
+    usuario_id: Optional[int] = None
+    acao: str
+    tabela_afetada: Optional[str] = None
+    registro_id: Optional[int] = None
+    # Em atualizações, apenas os campos alterados
+    dados_antigos: Optional[Dict[str, Any]] = None
+    dados_novos: Optional[Dict[str, Any]] = None
+    data_hora: datetime
+    ip: Optional[str] = None
+
+
+class AuditoriaStatus(BaseModel):
+    ativo: bool
+    pendentes: int
+    enfileirados: int
+    gravados: int
+    descartados: int
+    falhas: int
+
+
+class RetencaoResultado(BaseModel):
+    arquivados: int
+    excluidos: int
@@ -0,0 +1,44 @@
+from pydantic import BaseModel, Field
+from typing import Any, List, Optional
+from datetime import datetime
+
+
+class ConsultaLenta(BaseModel):
+    data_hora: datetime
+    sql: str
+    parametros: Any = None  # tipos dos parâmetros, nunca os valores
+    duracao_ms: float
+    rota: Optional[str] = None
+    request_id: Optional[str] = None
+    plano: Optional[List[str]] = None  # preenchido em segundo plano com CONSULTAS_LENTAS_EXPLAIN
+
+
+class PerfilResumo(BaseModel):
+    id: str
+    origem: str  # "admin" ou "amostragem"
+    data_hora: datetime
+    rota: Optional[str] = None
+    duracao_ms: float
+    amostras: int
+
+
+class PerfilFuncao(BaseModel):
+    funcao: str
+    propria: int  # amostras com a função no topo da pilha
+    total: int  # amostras com a função em qualquer ponto da pilha
+    percentual_total: float
+
+
+class PerfilTop(PerfilResumo):
+    funcoes: List[PerfilFuncao]
+
+
+class AmostragemPerfis(BaseModel):
+    percentual: float = Field(..., gt=0, le=100)
+    duracao_segundos: int = Field(..., gt=0, le=3600)
+
+
+class AmostragemStatus(BaseModel):
+    ativa: bool
+    percentual: float
+    segundos_restantes: int
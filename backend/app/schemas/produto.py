@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field, condecimal
-from typing import Optional, List
+from pydantic import BaseModel, Field, condecimal, model_validator
+from typing import Optional, List, Literal, Union
 from datetime import datetime
+from decimal import Decimal
 
 class ProdutoBase(BaseModel):
     nome: str
@@ -29,6 +30,17 @@ class ProdutoUpdate(BaseModel):
     quantidade_maxima: Optional[int] = None
     imagem_url: Optional[str] = None
 
+    @model_validator(mode="after")
+    def verificar_nulos(self):
+        # Campos obrigatórios do cadastro podem ser omitidos, mas não enviados como null
+        nulos = [
+            campo for campo in ("nome", "codigo_sku", "unidade_medida", "preco_custo", "preco_venda")
+            if campo in self.model_fields_set and getattr(self, campo) is None
+        ]
+        if nulos:
+            raise ValueError(f"Campos obrigatórios não podem ser nulos: {', '.join(nulos)}")
+        return self
+
 class Produto(ProdutoBase):
     id: int
     quantidade: Optional[int] = None  # <-- permitir nulo
@@ -47,3 +59,104 @@ class ProdutoStats(BaseModel):
     class Config:
         # orm_mode = True
         from_attributes = True
+
+
+class ImportacaoErro(BaseModel):
+    linha: int
+    codigo_sku: Optional[str] = None
+    erros: List[str]
+
+
+class ImportacaoResultado(BaseModel):
+    total_linhas: int
+    inseridos: int
+    atualizados: int
+    ignorados: int
+    erros: List[ImportacaoErro]
+    erros_truncados: bool = False
+
+
+class ProdutoAtualizacaoItem(BaseModel):
+    id: Optional[int] = None
+    codigo_sku: Optional[str] = None
+    campos: ProdutoUpdate
+
+    @model_validator(mode="after")
+    def verificar_identificador(self):
+        if (self.id is None) == (self.codigo_sku is None):
+            raise ValueError("Informe exatamente um entre id e codigo_sku")
+        return self
+
+
+class ProdutoFiltroMassa(BaseModel):
+    categoria_id: Optional[int] = None
+    ids: Optional[List[int]] = None
+
+
+class AjustePreco(BaseModel):
+    campo: Literal["preco_venda", "preco_custo"] = "preco_venda"
+    tipo: Literal["percentual", "absoluto"]
+    valor: Decimal
+
+
+class ProdutoAtualizacaoMassa(BaseModel):
+    # Modo 1: lista explícita de produtos (por id ou SKU) com os campos a alterar
+    itens: Optional[List[ProdutoAtualizacaoItem]] = None
+    # Modo 2: filtro + ajustes de preço e/ou campos com o mesmo valor para todos
+    filtro: Optional[ProdutoFiltroMassa] = None
+    ajustes: List[AjustePreco] = []
+    campos: Optional[ProdutoUpdate] = None
+
+    @model_validator(mode="after")
+    def verificar_modo(self):
+        if (self.itens is None) == (self.filtro is None):
+            raise ValueError("Informe 'itens' ou 'filtro', mas não ambos")
+        if self.filtro is not None and not self.ajustes and self.campos is None:
+            raise ValueError("Informe 'ajustes' e/ou 'campos' para atualizar os produtos do filtro")
+        return self
+
+
+class ProdutoAtualizacaoMassaResultado(BaseModel):
+    atualizados: int
+    nao_encontrados: List[Union[int, str]] = []
+
+
+class ProdutoLookup(BaseModel):
+    ids: List[int] = []
+    skus: List[str] = []
+
+
+class ProdutosNaoEncontrados(BaseModel):
+    ids: List[int] = []
+    skus: List[str] = []
+
+
+class ProdutoLookupResultado(BaseModel):
+    produtos: List[Produto]
+    nao_encontrados: ProdutosNaoEncontrados
+
+
+class ProdutoResumoSku(BaseModel):
+    id: int
+    codigo_sku: str
+    nome: str
+    preco_venda: Decimal
+    quantidade: int
+
+
+class IndiceSkuStatus(BaseModel):
+    disponivel: bool
+    total: int
+    memoria_bytes: int
+
+
+class EstoqueFragmentadoConfig(BaseModel):
+    # 0 desativa (o saldo volta para produtos.quantidade)
+    fragmentos: int = Field(..., ge=0)
+
+
+class EstoqueFragmentado(BaseModel):
+    produto_id: int
+    fragmentos: int
+    quantidade: int
+    quantidades: List[int] = []
@@ -33,6 +33,10 @@ class Usuario(UsuarioInDB):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     sub: Optional[int] = None
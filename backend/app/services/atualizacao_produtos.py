@@ -0,0 +1,179 @@
+"""
+Atualização em massa de produtos com comandos UPDATE baseados em conjuntos.
+
+Em vez de ler, alterar e gravar cada produto individualmente, as alterações são
+agrupadas em poucos UPDATEs executados em uma única transação.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.categoria import Categoria
+from app.models.produto import Produto
+from app.schemas.produto import AjustePreco, ProdutoAtualizacaoItem, ProdutoFiltroMassa, ProdutoUpdate
+from app.services.invalidacao import invalidar
+
+
+def _verificar_categorias(db: Session, categoria_ids: set):
+    """
+    Verifica com uma única consulta se todas as categorias informadas existem
+    """
+    if not categoria_ids:
+        return
+    existentes = set(db.execute(select(Categoria.id).where(Categoria.id.in_(categoria_ids))).scalars())
+    faltando = categoria_ids - existentes
+    if faltando:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Categoria(s) não encontrada(s): {sorted(faltando)}"
+        )
+
+
+# UPDATE em lote por chave primária (parâmetro _id) que também incrementa a
+# versão dos produtos: edições com If-Match anterior recebem 412
+# (app.services.concorrencia)
+produtos = Produto.__table__
+ATUALIZAR_POR_ID = update(produtos).where(produtos.c.id == bindparam("_id")).values(versao=produtos.c.versao + 1)
+
+
+def agrupar_por_campos(parametros: List[Dict]) -> List[List[Dict]]:
+    """
+    Separa as linhas de um UPDATE em lote pelo conjunto de campos alterados
+    (cada executemany exige os mesmos campos em todas as linhas)
+    """
+    grupos = defaultdict(list)
+    for linha in parametros:
+        grupos[frozenset(linha)].append(linha)
+    return list(grupos.values())
+
+
+def _sku_duplicado(erro: IntegrityError) -> bool:
+    """
+    Se a violação foi da unicidade do código SKU (SQLite: "UNIQUE constraint
+    failed: produtos.codigo_sku"; PostgreSQL: "duplicate key ... ix_produtos_codigo_sku")
+    """
+    mensagem = str(erro.orig).lower()
+    return "codigo_sku" in mensagem and ("unique" in mensagem or "duplicate" in mensagem)
+
+
+def _executar(db: Session, comando, parametros=None) -> int:
+    try:
+        if parametros is None:
+            resultado = db.execute(comando)
+        else:
+            for lote in agrupar_por_campos(parametros):
+                resultado = db.execute(comando, lote)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Produto com este código SKU já existe" if _sku_duplicado(e)
+            else "A alteração viola uma restrição do cadastro de produtos"
+        )
+    return resultado
+
+
+def atualizar_por_itens(db: Session, itens: List[ProdutoAtualizacaoItem]) -> dict:
+    """
+    Aplica uma lista explícita de alterações, identificando os produtos por id ou SKU.
+    Os produtos são resolvidos com uma consulta IN e as alterações gravadas com um
+    UPDATE em lote por chave primária (agrupado pelo conjunto de campos alterados).
+    """
+    ids = {item.id for item in itens if item.id is not None}
+    skus = {item.codigo_sku for item in itens if item.codigo_sku is not None}
+    encontrados = db.execute(
+        select(Produto.id, Produto.codigo_sku).where(or_(Produto.id.in_(ids), Produto.codigo_sku.in_(skus)))
+    ).all()
+    ids_existentes = {produto_id for produto_id, _ in encontrados}
+    id_por_sku = {sku: produto_id for produto_id, sku in encontrados}
+
+    _verificar_categorias(db, {
+        item.campos.categoria_id for item in itens if item.campos.categoria_id is not None
+    })
+
+    agora = datetime.utcnow()
+    parametros, nao_encontrados = [], []
+    for item in itens:
+        produto_id = item.id if item.id is not None else id_por_sku.get(item.codigo_sku)
+        if produto_id not in ids_existentes:
+            nao_encontrados.append(item.id if item.id is not None else item.codigo_sku)
+            continue
+        campos = item.campos.model_dump(exclude_unset=True)
+        if campos:
+            parametros.append({**campos, "_id": produto_id, "data_atualizacao": agora})
+
+    if parametros:
+        _executar(db, ATUALIZAR_POR_ID, parametros)
+        invalidar("produtos", {p["_id"] for p in parametros}, {campo for p in parametros for campo in p if campo != "_id"})
+
+    return {"atualizados": len({p["_id"] for p in parametros}), "nao_encontrados": nao_encontrados}
+
+
+def atualizar_por_filtro(
+    db: Session,
+    filtro: ProdutoFiltroMassa,
+    ajustes: List[AjustePreco],
+    campos: Optional[ProdutoUpdate] = None,
+) -> dict:
+    """
+    Aplica ajustes de preço (percentuais ou absolutos) e/ou valores fixos a todos
+    os produtos que atendem ao filtro, com um único UPDATE ... WHERE.
+    """
+    condicoes = []
+    if filtro.categoria_id is not None:
+        condicoes.append(Produto.categoria_id == filtro.categoria_id)
+    if filtro.ids:
+        condicoes.append(Produto.id.in_(filtro.ids))
+    if not condicoes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O filtro deve conter ao menos um critério"
+        )
+
+    valores = campos.model_dump(exclude_unset=True) if campos else {}
+    if "codigo_sku" in valores:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Não é possível definir o mesmo código SKU para vários produtos"
+        )
+    if valores.get("categoria_id") is not None:
+        _verificar_categorias(db, {valores["categoria_id"]})
+
+    for ajuste in ajustes:
+        # Ajustes sobre o mesmo campo são aplicados em sequência
+        base = valores.get(ajuste.campo, getattr(Produto, ajuste.campo))
+        if ajuste.tipo == "percentual":
+            expressao = func.round(base * (1 + ajuste.valor / 100), 2)
+        else:
+            expressao = func.round(base + ajuste.valor, 2)
+
+        if ajuste.valor < 0:
+            negativos = db.execute(
+                select(func.count(Produto.id)).where(*condicoes, expressao < 0)
+            ).scalar()
+            if negativos:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"O ajuste deixaria {negativos} produto(s) com {ajuste.campo} negativo"
+                )
+        valores[ajuste.campo] = expressao
+
+    valores["data_atualizacao"] = datetime.utcnow()
+    valores["versao"] = Produto.versao + 1
+    comando = (
+        update(Produto)
+        .where(*condicoes)
+        .values(valores)
+        .execution_options(synchronize_session=False)
+    )
+    resultado = _executar(db, comando)
+    if resultado.rowcount:
+        invalidar("produtos", colunas=valores)
+
+    return {"atualizados": resultado.rowcount, "nao_encontrados": []}
@@ -0,0 +1,436 @@
+"""
+Auditoria assíncrona das alterações em produtos, movimentações, usuários,
+clientes, compras e pagamentos, gravada na tabela logs.
+
+As imagens antes/depois são capturadas pelos eventos de sessão do ORM e só
+entram na fila após o commit (alterações desfeitas não são auditadas). Uma
+thread em segundo plano grava a fila em lotes, com INSERTs de várias linhas,
+para que as requisições não paguem um INSERT extra por alteração.
+
+A fila é limitada; quando está cheia, AUDITORIA_POLITICA_FILA_CHEIA decide:
+- "descartar": descarta o novo registro (e conta o descarte);
+- "bloquear": espera até AUDITORIA_TIMEOUT_BLOQUEIO segundos por espaço;
+- "sincrono": grava o registro imediatamente na própria requisição.
+
+Operações em massa (Core UPDATE/INSERT) não passam pelo ORM e devem chamar
+registrar() explicitamente.
+
+Armazenamento: atualizações guardam só os campos alterados; entradas cujo JSON
+passa de AUDITORIA_LIMITE_COMPACTACAO bytes vão compactadas (zlib) para
+dados_compactados. A retenção trabalha por mês: meses antigos são movidos para
+logs_arquivo e, depois de AUDITORIA_RETENCAO_MESES, excluídos, sempre em lotes
+pequenos para não segurar bloqueios longos.
+
+No modo multiloja cada registro vai para a tabela logs do banco da loja em que
+a alteração foi feita, e a retenção atua no banco da loja da requisição.
+"""
+import json
+import logging
+import queue
+import threading
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import engine_atual, engine_da_loja
+from app.models.clientes import Cliente
+from app.models.compra_clientes import CompraCliente
+from app.models.log import Log, LogArquivo
+from app.models.movimentacao import Movimentacao
+from app.models.pagamentos import Pagamento
+from app.models.produto import Produto
+from app.models.usuario import Usuario
+from app.utils.contexto import ip_cliente, loja_atual
+
+logger = logging.getLogger(__name__)
+
+MODELOS_AUDITADOS = (Produto, Movimentacao, Usuario, Cliente, CompraCliente, Pagamento)
+
+# Campos que nunca são copiados para o log
+CAMPOS_SENSIVEIS = {"senha_hash"}
+
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _imagem(obj) -> Dict[str, Any]:
+    """
+    Valores atuais das colunas do objeto
+    """
+    return {
+        coluna.key: _serializar(getattr(obj, coluna.key))
+        for coluna in inspect(obj).mapper.column_attrs
+        if coluna.key not in CAMPOS_SENSIVEIS
+    }
+
+
+def _imagem_anterior(obj) -> Dict[str, Any]:
+    """
+    Valores das colunas antes das alterações pendentes no flush atual
+    """
+    estado = inspect(obj)
+    imagem = {}
+    for coluna in estado.mapper.column_attrs:
+        if coluna.key in CAMPOS_SENSIVEIS:
+            continue
+        historico = estado.attrs[coluna.key].history
+        if historico.deleted:
+            imagem[coluna.key] = _serializar(historico.deleted[0])
+        elif historico.unchanged:
+            imagem[coluna.key] = _serializar(historico.unchanged[0])
+        else:
+            imagem[coluna.key] = None
+    return imagem
+
+
+def _diferenca(antigos: Dict[str, Any], novos: Dict[str, Any]) -> Tuple[dict, dict]:
+    """
+    Mantém apenas os campos cujo valor mudou
+    """
+    alterados = [campo for campo, valor in novos.items() if antigos.get(campo) != valor]
+    return (
+        {campo: antigos.get(campo) for campo in alterados},
+        {campo: novos[campo] for campo in alterados},
+    )
+
+
+def _compactar(registro: dict) -> dict:
+    """
+    Move os dados para dados_compactados quando o JSON passa do limite configurado
+    """
+    dados = {"antigos": registro["dados_antigos"], "novos": registro["dados_novos"]}
+    conteudo = json.dumps(dados, separators=(",", ":"), default=str).encode()
+    if len(conteudo) <= settings.AUDITORIA_LIMITE_COMPACTACAO:
+        return {**registro, "dados_compactados": None}
+    return {
+        **registro,
+        "dados_antigos": None,
+        "dados_novos": None,
+        "dados_compactados": zlib.compress(conteudo),
+    }
+
+
+def ler_dados(log) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Retorna (dados_antigos, dados_novos) de um log, descompactando se necessário
+    """
+    if log.dados_compactados is None:
+        return log.dados_antigos, log.dados_novos
+    dados = json.loads(zlib.decompress(log.dados_compactados))
+    return dados["antigos"], dados["novos"]
+
+
+class EscritorAuditoria:
+    def __init__(self):
+        self._fila: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self.ativo = False
+        self.contadores = {"enfileirados": 0, "gravados": 0, "descartados": 0, "falhas": 0}
+
+    # ----------------------------
+    # ENFILEIRAMENTO
+    # ----------------------------
+    def enfileirar(self, registros: List[dict], loja: Optional[str] = None):
+        if not self.ativo:
+            return
+        politica = settings.AUDITORIA_POLITICA_FILA_CHEIA
+        for registro in registros:
+            item = (loja, registro)
+            try:
+                if politica == "bloquear":
+                    self._fila.put(item, timeout=settings.AUDITORIA_TIMEOUT_BLOQUEIO)
+                else:
+                    self._fila.put_nowait(item)
+                self.contadores["enfileirados"] += 1
+            except queue.Full:
+                if politica == "sincrono":
+                    self._gravar([item])
+                else:
+                    self.contadores["descartados"] += 1
+
+    # ----------------------------
+    # GRAVAÇÃO EM LOTES
+    # ----------------------------
+    def _gravar(self, lote: List[Tuple[Optional[str], dict]]):
+        por_loja: Dict[Optional[str], List[dict]] = {}
+        for loja, registro in lote:
+            por_loja.setdefault(loja, []).append(registro)
+        for loja, registros in por_loja.items():
+            try:
+                with engine_da_loja(loja).begin() as conexao:
+                    conexao.execute(insert(Log), [_compactar(registro) for registro in registros])
+                self.contadores["gravados"] += len(registros)
+            except Exception:
+                self.contadores["falhas"] += len(registros)
+                logger.exception("Falha ao gravar %d registros de auditoria", len(registros), extra={"loja": loja})
+
+    def _coletar_lote(self, timeout: Optional[float]) -> List[Tuple[Optional[str], dict]]:
+        lote = []
+        try:
+            lote.append(self._fila.get(timeout=timeout) if timeout else self._fila.get_nowait())
+            while len(lote) < settings.AUDITORIA_TAMANHO_LOTE:
+                lote.append(self._fila.get_nowait())
+        except queue.Empty:
+            pass
+        return lote
+
+    def _executar(self):
+        while not self._parar.is_set():
+            lote = self._coletar_lote(settings.AUDITORIA_INTERVALO_FLUSH)
+            if lote:
+                self._gravar(lote)
+        self.esvaziar()
+
+    def esvaziar(self):
+        """
+        Grava tudo o que ainda está na fila
+        """
+        while True:
+            lote = self._coletar_lote(None)
+            if not lote:
+                return
+            self._gravar(lote)
+
+    # ----------------------------
+    # CICLO DE VIDA
+    # ----------------------------
+    def iniciar(self):
+        self._fila = queue.Queue(maxsize=settings.AUDITORIA_FILA_MAXIMA)
+        self._parar.clear()
+        self.ativo = True
+        self._thread = threading.Thread(target=self._executar, name="auditoria", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        """
+        Para de aceitar registros e grava o restante da fila antes de encerrar
+        """
+        if not self.ativo:
+            return
+        self.ativo = False
+        self._parar.set()
+        self._thread.join()
+
+    def status(self) -> dict:
+        return {
+            "ativo": self.ativo,
+            "pendentes": self._fila.qsize() if self._fila else 0,
+            **self.contadores,
+        }
+
+
+escritor = EscritorAuditoria()
+
+
+def registrar(
+    acao: str,
+    tabela: Optional[str] = None,
+    registro_id: Optional[int] = None,
+    dados_antigos: Optional[dict] = None,
+    dados_novos: Optional[dict] = None,
+    usuario_id: Optional[int] = None,
+):
+    """
+    Registra uma entrada de auditoria manualmente (ex.: operações em massa)
+    """
+    escritor.enfileirar([{
+        "usuario_id": usuario_id,
+        "acao": acao,
+        "tabela_afetada": tabela,
+        "registro_id": registro_id,
+        "dados_antigos": dados_antigos,
+        "dados_novos": dados_novos,
+        "data_hora": datetime.utcnow(),
+        "ip": ip_cliente.get(),
+    }], loja_atual.get())
+
+
+# ----------------------------
+# EVENTOS DE SESSÃO DO ORM
+# ----------------------------
+@event.listens_for(Session, "before_flush")
+def _capturar_imagens_anteriores(session, flush_context, instances):
+    """
+    Guarda as imagens anteriores antes do flush, quando colunas com onupdate
+    (ex.: data_atualizacao) ainda não foram alteradas
+    """
+    if not escritor.ativo:
+        return
+    for obj in chain(session.dirty, session.deleted):
+        if isinstance(obj, MODELOS_AUDITADOS):
+            session.info.setdefault("auditoria_anteriores", {})[id(obj)] = _imagem_anterior(obj)
+
+
+@event.listens_for(Session, "after_flush")
+def _capturar_alteracoes(session, flush_context):
+    if not escritor.ativo:
+        return
+
+    anteriores = session.info.pop("auditoria_anteriores", {})
+    pendentes = None
+    agora = datetime.utcnow()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, MODELOS_AUDITADOS):
+            continue
+        if obj in session.new:
+            acao, antigos, novos = "criar", None, _imagem(obj)
+        elif obj in session.deleted:
+            acao, antigos, novos = "excluir", anteriores.get(id(obj)) or _imagem_anterior(obj), None
+        elif session.is_modified(obj, include_collections=False):
+            acao = "atualizar"
+            antigos, novos = _diferenca(anteriores.get(id(obj)) or _imagem_anterior(obj), _imagem(obj))
+            if not novos:
+                continue
+        else:
+            continue
+
+        if pendentes is None:
+            pendentes = session.info.setdefault("auditoria_pendente", [])
+        pendentes.append({
+            "usuario_id": session.info.get("usuario_id"),
+            "acao": acao,
+            "tabela_afetada": obj.__tablename__,
+            "registro_id": obj.id,
+            "dados_antigos": antigos,
+            "dados_novos": novos,
+            "data_hora": agora,
+            "ip": ip_cliente.get(),
+        })
+
+
+@event.listens_for(Session, "after_commit")
+def _enfileirar_apos_commit(session):
+    pendentes = session.info.pop("auditoria_pendente", None)
+    if pendentes:
+        escritor.enfileirar(pendentes, session.info.get("loja"))
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendentes(session):
+    session.info.pop("auditoria_pendente", None)
+    session.info.pop("auditoria_anteriores", None)
+
+
+# ----------------------------
+# CONSULTA
+# ----------------------------
+def consultar(
+    db: Session,
+    tabela: Optional[str] = None,
+    registro_id: Optional[int] = None,
+    usuario_id: Optional[int] = None,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    arquivo: bool = False,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[dict]:
+    """
+    Consulta os logs (ou o arquivo) do mais recente para o mais antigo. Os
+    filtros por tabela/registro e por usuário usam os índices compostos que
+    terminam em data_hora.
+    """
+    model = LogArquivo if arquivo else Log
+    query = select(model)
+    if tabela is not None:
+        query = query.where(model.tabela_afetada == tabela)
+    if registro_id is not None:
+        query = query.where(model.registro_id == registro_id)
+    if usuario_id is not None:
+        query = query.where(model.usuario_id == usuario_id)
+    if inicio is not None:
+        query = query.where(model.data_hora >= inicio)
+    if fim is not None:
+        query = query.where(model.data_hora < fim)
+    query = query.order_by(model.data_hora.desc(), model.id.desc()).offset(skip).limit(limit)
+
+    resultado = []
+    for log in db.execute(query).scalars():
+        antigos, novos = ler_dados(log)
+        resultado.append({
+            "id": log.id,
+            "usuario_id": log.usuario_id,
+            "acao": log.acao,
+            "tabela_afetada": log.tabela_afetada,
+            "registro_id": log.registro_id,
+            "dados_antigos": antigos,
+            "dados_novos": novos,
+            "data_hora": log.data_hora,
+            "ip": log.ip,
+        })
+    return resultado
+
+
+# ----------------------------
+# RETENÇÃO
+# ----------------------------
+def _inicio_do_mes(meses_atras: int) -> datetime:
+    hoje = datetime.utcnow()
+    total = hoje.year * 12 + hoje.month - 1 - meses_atras
+    return datetime(total // 12, total % 12 + 1, 1)
+
+
+def _proximo_lote(conexao, model, corte: datetime) -> List[int]:
+    return conexao.execute(
+        select(model.id).where(model.data_hora < corte).order_by(model.id).limit(settings.AUDITORIA_LOTE_RETENCAO)
+    ).scalars().all()
+
+
+def arquivar_logs() -> int:
+    """
+    Move para logs_arquivo os logs anteriores aos AUDITORIA_MESES_ATIVOS meses
+    mais recentes, um lote (e uma transação) por vez
+    """
+    corte = _inicio_do_mes(settings.AUDITORIA_MESES_ATIVOS)
+    colunas = [coluna.key for coluna in LogArquivo.__table__.columns]
+    total = 0
+    while True:
+        with engine_atual().begin() as conexao:
+            ids = _proximo_lote(conexao, Log, corte)
+            if not ids:
+                return total
+            conexao.execute(
+                insert(LogArquivo).from_select(
+                    colunas, select(*(Log.__table__.c[coluna] for coluna in colunas)).where(Log.id.in_(ids))
+                )
+            )
+            conexao.execute(delete(Log).where(Log.id.in_(ids)))
+        total += len(ids)
+
+
+def excluir_logs_antigos() -> int:
+    """
+    Exclui em lotes os logs com mais de AUDITORIA_RETENCAO_MESES meses
+    """
+    if settings.AUDITORIA_RETENCAO_MESES <= 0:
+        return 0
+    corte = _inicio_do_mes(settings.AUDITORIA_RETENCAO_MESES)
+    total = 0
+    for model in (LogArquivo, Log):
+        while True:
+            with engine_atual().begin() as conexao:
+                ids = _proximo_lote(conexao, model, corte)
+                if not ids:
+                    break
+                conexao.execute(delete(model).where(model.id.in_(ids)))
+            total += len(ids)
+    return total
+
+
+def aplicar_retencao() -> dict:
+    """
+    Executa a política de retenção completa (arquivamento e exclusão)
+    """
+    return {"arquivados": arquivar_logs(), "excluidos": excluir_logs_antigos()}
@@ -1,17 +1,51 @@
-from fastapi import Depends, HTTPException, status
+import logging
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Union
 from app.schemas.usuario import Token
 from app.config import settings
 from app.database import get_db
 from app.models.usuario import Usuario
 from app.utils.security import verify_password
+from app.utils.logs import debug_amostrado
+from app.utils.contexto import loja_atual
+from app.services.revogacao import revogacao
+
+logger = logging.getLogger(__name__)
 
 # Configuração do OAuth2
 # oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+# auto_error=False: sem token, get_current_user ainda aceita a chave de API
+# validada pela dependência do router (app.services.chaves_api)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+
+class UsuarioToken:
+    """
+    Usuário autorizado pelas claims do token, sem consulta ao banco. Expõe os
+    campos usados na autorização; rotas que precisam do cadastro completo
+    devem carregá-lo pelo id.
+    """
+    __slots__ = ("id", "nivel_acesso", "ativo")
+
+    def __init__(self, id: int, nivel_acesso: str, ativo: bool):
+        self.id = id
+        self.nivel_acesso = nivel_acesso
+        self.ativo = ativo
+
+
+def claims_usuario(user: Usuario) -> dict:
+    """
+    Claims do token de acesso: identificação, nível, estado e versão de revogação
+    """
+    return {
+        "sub": str(user.id),
+        "nivel": user.nivel_acesso,
+        "ativo": bool(user.ativo),
+        "ver": user.token_versao or 0,
+    }
 
 
 def authenticate_user(db: Session, email: str, password: str) -> Optional[Usuario]:
@@ -25,44 +59,73 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[Usuari
         return None
     return user
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Usuario:
+def get_current_user(
+    request: Request,
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Union[Usuario, UsuarioToken]:
     """
-    Obtém o usuário atual a partir do token JWT
+    Obtém o usuário atual a partir do token JWT ou da chave de API. Tokens com
+    claims são autorizados sem consultar o banco (ver app.services.revogacao)
     """
+    # Chave de API já validada (escopo incluído) pela dependência do router
+    chave_api = getattr(request.state, "chave_api", None)
+    if chave_api is not None:
+        db.info["usuario_id"] = chave_api.usuario.id
+        return chave_api.usuario
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciais inválidas",
         headers={"WWW-Authenticate": "Bearer"},
     )
-
-    # >>> LOG PARA DEBUG <<<
-    print("🔐 TOKEN RECEBIDO no backend:", token)
+    if token is None:
+        raise credentials_exception
 
     try:
         # Decodificar o token JWT
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        print("🧩 PAYLOAD DECODIFICADO no backend:", payload)
         user_id_str: str = payload.get("sub") # O subject (sub) é uma string no token
         if user_id_str is None:
-            # >>> LOG PARA DEBUG <<<
-            print("❌ ERRO de JWTError:", e)
+            logger.debug("Token sem o campo sub")
             raise credentials_exception
     except JWTError as e:
+        logger.debug("Token inválido: %s", e)
+        raise credentials_exception
+
+    # Token emitido para outra loja (multiloja): o mesmo id é outro usuário lá
+    if payload.get("loja") != loja_atual.get():
+        logger.debug("Token de outra loja")
+        raise credentials_exception
+
+    # Tokens de clientes (auth_cliente) não autenticam usuários internos
+    if payload.get("tipo") == "cliente":
+        logger.debug("Token de cliente usado em rota de usuário")
         raise credentials_exception
 
     # Buscar o usuário no banco de dados (converter ID para int)
     try:
         user_id = int(user_id_str)
-    # except ValueError:
-    # >>> LOG PARA DEBUG <<<
-    except ValueError as e:
-        print("❌ ERRO ao converter sub para int:", e)
+    except ValueError:
         # Se o 'sub' não for um inteiro válido
+        logger.debug("Campo sub do token não é um ID válido")
         raise credentials_exception
-        
-    user = db.query(Usuario).filter(Usuario.id == user_id).first()
-    # >>> LOG PARA DEBUG <<<
-    print("👤 Usuário buscado no DB:", user)
+
+    versao = payload.get("ver")
+    if versao is not None and revogacao.disponivel:
+        # Autorização só pelas claims; a versão em memória cobre desativações e trocas de nível
+        if revogacao.revogado(user_id, versao):
+            logger.debug("Token revogado", extra={"usuario_id": user_id})
+            raise credentials_exception
+        user = UsuarioToken(user_id, payload.get("nivel"), payload.get("ativo", False))
+    else:
+        # Tokens sem versão (emitidos antes das claims) ou versões ainda não carregadas
+        user = db.query(Usuario).filter(Usuario.id == user_id).first()
+        if user is not None and versao is not None and versao < (user.token_versao or 0):
+            logger.debug("Token revogado", extra={"usuario_id": user_id})
+            raise credentials_exception
+    # Nunca registrar o token nem o payload; só o ID, e por amostragem
+    debug_amostrado(logger, "Usuário autenticado", usuario_id=user_id, encontrado=user is not None)
 
     if user is None:
         raise credentials_exception
@@ -72,6 +135,9 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             detail="Usuário inativo"
         )
 
+    # Identifica o autor das alterações feitas nesta sessão (auditoria)
+    db.info["usuario_id"] = user.id
+
     return user
 
 def get_current_active_user(current_user: Usuario = Depends(get_current_user)) -> Usuario:
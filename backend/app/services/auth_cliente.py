@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
@@ -9,9 +9,11 @@ from app.config import settings
 from app.database import get_db
 from app.models.clientes import Cliente
 from app.utils.security import verify_password
+from app.utils.contexto import loja_atual
 
 # Novo esquema OAuth2 para clientes
-oauth2_cliente = OAuth2PasswordBearer(tokenUrl="/api/auth/cliente/login")
+# auto_error=False: integrações de checkout usam chave de API (ver get_current_cliente)
+oauth2_cliente = OAuth2PasswordBearer(tokenUrl="/api/auth/cliente/login", auto_error=False)
 
 def authenticate_cliente(db: Session, email: str, password: str) -> Optional[Cliente]:
     cliente = db.query(Cliente).filter(Cliente.email == email).first()
@@ -21,18 +23,49 @@ def authenticate_cliente(db: Session, email: str, password: str) -> Optional[Cli
         return None
     return cliente
 
-def get_current_cliente(token: str = Depends(oauth2_cliente), db: Session = Depends(get_db)) -> Cliente:
+def _cliente_da_chave_api(request: Request, db: Session, usuario_id: int) -> Cliente:
+    """
+    Integrações com chave de API (escopo checkout) compram em nome de um
+    cliente, informado no cabeçalho X-Cliente-Id
+    """
+    try:
+        cliente_id = int(request.headers["X-Cliente-Id"])
+    except (KeyError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe o cliente da compra no cabeçalho X-Cliente-Id"
+        )
+    cliente = db.get(Cliente, cliente_id)
+    if cliente is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cliente não encontrado"
+        )
+    db.info["usuario_id"] = usuario_id
+    return cliente
+
+def get_current_cliente(
+    request: Request,
+    token: Optional[str] = Depends(oauth2_cliente),
+    db: Session = Depends(get_db)
+) -> Cliente:
+    chave_api = getattr(request.state, "chave_api", None)
+    if chave_api is not None:
+        return _cliente_da_chave_api(request, db, chave_api.usuario.id)
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciais inválidas",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if token is None:
+        raise credentials_exception
 
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         cliente_id_str: str = payload.get("sub")
         tipo = payload.get("tipo")
-        if cliente_id_str is None or tipo != "cliente":
+        if cliente_id_str is None or tipo != "cliente" or payload.get("loja") != loja_atual.get():
             raise credentials_exception
     except JWTError:
         raise credentials_exception
@@ -0,0 +1,323 @@
+"""
+Autocomplete por prefixo para nomes e SKUs de produtos e nomes/emails de clientes.
+
+Cada entidade tem um índice em memória formado por uma lista ordenada de chaves
+normalizadas (minúsculas e sem acentos) e um array paralelo de IDs; a busca é
+um bisect até o fim do prefixo. Cada registro gera uma chave para o texto
+completo, uma para cada palavra seguinte do nome (para achar "gato" em
+"Ração Premium Gato") e uma para o SKU/email.
+
+O índice é mantido pela sua thread, como o índice de SKUs:
+
+- os ouvintes de invalidação só enfileiram os IDs (a releitura não roda na
+  requisição que gravou) e só são chamados quando o nome ou o SKU/email pode
+  ter mudado: uma baixa de estoque não relê nada; operações em massa pedem
+  uma reconstrução completa;
+- uma verificação periódica da impressão digital da tabela detecta
+  alterações feitas por outros processos.
+
+Se o limite de chaves for atingido, ou enquanto o índice não estiver pronto,
+a busca vai ao banco.
+"""
+import logging
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import engine
+from app.models.clientes import Cliente
+from app.models.produto import Produto
+from app.services import invalidacao
+
+logger = logging.getLogger(__name__)
+
+# Acima disso uma rajada de invalidações vira reconstrução completa
+LIMITE_ATUALIZACAO_PARCIAL = 1000
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """
+    Remove acentos, converte para minúsculas e normaliza os espaços
+    """
+    if not texto:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+class IndicePrefixos:
+    def __init__(self, model, campo_nome: str, campo_detalhe: str):
+        self.model = model
+        self.tabela = model.__tablename__
+        self.campos = (campo_nome, campo_detalhe)
+        self.colunas = (model.id, getattr(model, campo_nome), getattr(model, campo_detalhe))
+        self._lock = threading.Lock()
+        self._chaves: List[str] = []
+        self._ids = array("q")
+        self._chaves_por_id: Dict[int, Tuple[str, ...]] = {}
+        self._rotulos: Dict[int, Tuple[str, str]] = {}
+        self.pronto = False
+        self.excedido = False
+        self._impressao = None
+        self._reconstrucao_pendente = True
+        self._pedidos_reconstrucao = 0
+        self._alterados_durante_reconstrucao: Optional[set] = None
+        # IDs invalidados à espera da thread do índice
+        self._pendentes: set = set()
+        self._atualizando = False
+        self._evento = threading.Event()
+        self._parar = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def disponivel(self) -> bool:
+        return self.pronto and not self.excedido
+
+    @property
+    def ocioso(self) -> bool:
+        """
+        Sem releituras à espera ou em andamento na thread do índice
+        """
+        return not self._pendentes and not self._atualizando and not self._reconstrucao_pendente
+
+    @staticmethod
+    def _gerar_chaves(nome: str, detalhe: str) -> Tuple[str, ...]:
+        palavras = normalizar(nome).split()
+        chaves = {" ".join(palavras[i:]) for i in range(len(palavras))}
+        if detalhe:
+            chaves.add(normalizar(detalhe))
+        return tuple(chaves)
+
+    # ----------------------------
+    # ATUALIZAÇÃO INCREMENTAL
+    # ----------------------------
+    def _remover(self, registro_id: int):
+        for chave in self._chaves_por_id.pop(registro_id, ()):
+            posicao = bisect_left(self._chaves, chave)
+            while posicao < len(self._chaves) and self._chaves[posicao] == chave:
+                if self._ids[posicao] == registro_id:
+                    del self._chaves[posicao]
+                    del self._ids[posicao]
+                    break
+                posicao += 1
+        self._rotulos.pop(registro_id, None)
+
+    def _inserir(self, registro_id: int, nome: str, detalhe: str):
+        chaves = self._gerar_chaves(nome, detalhe)
+        if len(self._chaves) + len(chaves) > settings.AUTOCOMPLETE_MAX_CHAVES:
+            self.excedido = True
+            return
+        for chave in chaves:
+            posicao = bisect_left(self._chaves, chave)
+            self._chaves.insert(posicao, chave)
+            self._ids.insert(posicao, registro_id)
+        self._chaves_por_id[registro_id] = chaves
+        self._rotulos[registro_id] = (nome, detalhe)
+
+    def atualizar(self, ids: Iterable[int]):
+        """
+        Recarrega apenas os registros informados
+        """
+        ids = set(ids)
+        with engine.connect() as conexao:
+            linhas = conexao.execute(select(*self.colunas).where(self.model.id.in_(ids))).all()
+        with self._lock:
+            if self._alterados_durante_reconstrucao is not None:
+                self._alterados_durante_reconstrucao.update(ids)
+            for registro_id in ids:
+                self._remover(registro_id)
+            for registro_id, nome, detalhe in linhas:
+                self._inserir(registro_id, nome, detalhe)
+
+    def _atualizar_pendentes(self):
+        with self._lock:
+            ids, self._pendentes = self._pendentes, set()
+            self._atualizando = True
+        try:
+            self.atualizar(ids)
+        finally:
+            self._atualizando = False
+
+    def _ao_invalidar(self, ids: Optional[set]):
+        # Chamado no commit da requisição: só enfileira para a thread do índice
+        with self._lock:
+            if ids is not None and len(self._pendentes) + len(ids) <= LIMITE_ATUALIZACAO_PARCIAL:
+                self._pendentes.update(ids)
+            else:
+                self._pedidos_reconstrucao += 1
+                self._reconstrucao_pendente = True
+                self.pronto = False
+        self._evento.set()
+
+    def verificar_versao(self):
+        """
+        Compara a impressão digital da tabela com a do índice para detectar
+        alterações feitas por outros processos
+        """
+        with engine.connect() as conexao:
+            impressao = invalidacao.impressao_digital(conexao, self.model)
+            if impressao == self._impressao:
+                return
+            ids = invalidacao.alterados_desde(conexao, self.model, self._impressao, impressao)
+        if ids is None:
+            self.reconstruir()
+            return
+        self.atualizar(ids)
+        self._impressao = impressao
+
+    # ----------------------------
+    # RECONSTRUÇÃO COMPLETA
+    # ----------------------------
+    def reconstruir(self):
+        """
+        Recarrega o índice inteiro a partir do banco, sem bloquear as buscas
+        """
+        with self._lock:
+            self._alterados_durante_reconstrucao = set()
+            # A carga lê depois dos commits que enfileiraram estes IDs
+            self._pendentes = set()
+            pedidos = self._pedidos_reconstrucao
+
+        pares, chaves_por_id, rotulos = [], {}, {}
+        excedido = False
+        with engine.connect() as conexao:
+            impressao = invalidacao.impressao_digital(conexao, self.model)
+            for registro_id, nome, detalhe in conexao.execution_options(yield_per=10000).execute(select(*self.colunas)):
+                chaves = self._gerar_chaves(nome, detalhe)
+                if len(pares) + len(chaves) > settings.AUTOCOMPLETE_MAX_CHAVES:
+                    excedido = True
+                    break
+                pares.extend((chave, registro_id) for chave in chaves)
+                chaves_por_id[registro_id] = chaves
+                rotulos[registro_id] = (nome, detalhe)
+        pares.sort()
+
+        with self._lock:
+            alterados = self._alterados_durante_reconstrucao
+            self._alterados_durante_reconstrucao = None
+            self._chaves = [chave for chave, _ in pares]
+            self._ids = array("q", (registro_id for _, registro_id in pares))
+            self._chaves_por_id = chaves_por_id
+            self._rotulos = rotulos
+            self._impressao = impressao
+            self.excedido = excedido
+            # Um novo pedido de reconstrução durante a carga exige outra carga
+            self._reconstrucao_pendente = pedidos != self._pedidos_reconstrucao
+            self.pronto = not self._reconstrucao_pendente
+        if alterados:
+            self.atualizar(alterados)
+
+    # ----------------------------
+    # CICLO DE VIDA
+    # ----------------------------
+    def _executar(self):
+        while not self._parar:
+            try:
+                if self._reconstrucao_pendente:
+                    self.reconstruir()
+                elif self._pendentes:
+                    self._atualizar_pendentes()
+                else:
+                    self.verificar_versao()
+            except Exception:
+                logger.exception("Falha ao atualizar o autocomplete", extra={"tabela": self.tabela})
+                # Releituras perdidas: as buscas vão ao banco até a reconstrução
+                self._reconstrucao_pendente = True
+                self.pronto = False
+            self._evento.wait(settings.AUTOCOMPLETE_INTERVALO_VERIFICACAO)
+            self._evento.clear()
+
+    def iniciar(self):
+        """
+        Registra o ouvinte (só para as colunas indexadas) e inicia a carga e a
+        verificação periódica em segundo plano
+        """
+        invalidacao.registrar_ouvinte(self.tabela, self._ao_invalidar, colunas=self.campos)
+        self._parar = False
+        self._thread = threading.Thread(target=self._executar, name=f"autocomplete-{self.tabela}", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar = True
+        self._evento.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # ----------------------------
+    # BUSCA
+    # ----------------------------
+    def buscar(self, termo: str, limite: int) -> List[dict]:
+        prefixo = normalizar(termo)
+        encontrados: List[int] = []
+        with self._lock:
+            posicao = bisect_left(self._chaves, prefixo)
+            while posicao < len(self._chaves) and len(encontrados) < limite:
+                if not self._chaves[posicao].startswith(prefixo):
+                    break
+                registro_id = self._ids[posicao]
+                if registro_id not in encontrados:
+                    encontrados.append(registro_id)
+                posicao += 1
+            rotulos = [self._rotulos[registro_id] for registro_id in encontrados]
+        return [
+            {"id": registro_id, "nome": nome, "detalhe": detalhe}
+            for registro_id, (nome, detalhe) in zip(encontrados, rotulos)
+        ]
+
+    def buscar_no_banco(self, db: Session, termo: str, limite: int) -> List[dict]:
+        """
+        Busca por prefixo no banco (sem normalização de acentos), usada
+        enquanto o índice não está disponível
+        """
+        _, coluna_nome, coluna_detalhe = self.colunas
+        prefixo = f"{termo}%"
+        linhas = db.execute(
+            select(*self.colunas)
+            .where(or_(coluna_nome.ilike(prefixo), coluna_detalhe.ilike(prefixo)))
+            .order_by(coluna_nome)
+            .limit(limite)
+        ).all()
+        return [{"id": registro_id, "nome": nome, "detalhe": detalhe} for registro_id, nome, detalhe in linhas]
+
+    def status(self) -> dict:
+        return {
+            "disponivel": self.disponivel,
+            "registros": len(self._rotulos),
+            "chaves": len(self._chaves),
+            "limite_chaves": settings.AUTOCOMPLETE_MAX_CHAVES,
+        }
+
+
+indices = {
+    "produtos": IndicePrefixos(Produto, "nome", "codigo_sku"),
+    "clientes": IndicePrefixos(Cliente, "nome", "email"),
+}
+
+
+def iniciar_indices():
+    for indice in indices.values():
+        indice.iniciar()
+
+
+def parar_indices():
+    for indice in indices.values():
+        indice.parar()
+
+
+def sugerir(db: Session, entidade: str, termo: str, limite: Optional[int] = None) -> List[dict]:
+    """
+    Retorna até `limite` sugestões cujo nome (ou alguma palavra do nome), SKU ou
+    email começa com o termo informado
+    """
+    indice = indices[entidade]
+    limite = max(1, min(limite or settings.AUTOCOMPLETE_LIMITE_PADRAO, settings.AUTOCOMPLETE_LIMITE_MAXIMO))
+    if indice.disponivel:
+        return indice.buscar(termo, limite)
+    return indice.buscar_no_banco(db, termo, limite)
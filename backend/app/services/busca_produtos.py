@@ -0,0 +1,66 @@
+"""
+Busca de produtos em lote por IDs e/ou SKUs.
+
+Resolve todos os itens com uma única consulta IN e devolve os resultados na
+mesma ordem em que foram pedidos, junto com os itens não encontrados.
+"""
+from typing import List, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import or_
+from sqlalchemy.orm import Query
+
+from app.config import settings
+from app.models.produto import Produto
+
+
+def parse_ids(ids: str) -> List[int]:
+    """
+    Converte "1,2,3" em [1, 2, 3], removendo repetições e mantendo a ordem
+    """
+    try:
+        lista = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O parâmetro ids deve conter números inteiros separados por vírgula"
+        )
+    return list(dict.fromkeys(lista))
+
+
+def buscar_em_lote(query: Query, ids: List[int], skus: List[str] = ()) -> Tuple[list, List[int], List[str]]:
+    """
+    Aplica o filtro IN à consulta e retorna (produtos na ordem pedida, ids não
+    encontrados, skus não encontrados). As linhas da consulta precisam expor
+    id (e codigo_sku, quando a busca for por SKU).
+    """
+    ids = list(dict.fromkeys(ids))
+    skus = list(dict.fromkeys(skus))
+    if len(ids) + len(skus) > settings.PRODUTOS_LOTE_MAXIMO:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo de {settings.PRODUTOS_LOTE_MAXIMO} produtos por consulta"
+        )
+    if not ids and not skus:
+        return [], [], []
+
+    condicoes = []
+    if ids:
+        condicoes.append(Produto.id.in_(ids))
+    if skus:
+        condicoes.append(Produto.codigo_sku.in_(skus))
+    linhas = query.filter(or_(*condicoes)).all()
+
+    por_id = {linha.id: linha for linha in linhas}
+    por_sku = {linha.codigo_sku: linha for linha in linhas} if skus else {}
+
+    resultado, incluidos = [], set()
+    for chave, indice in [(i, por_id) for i in ids] + [(s, por_sku) for s in skus]:
+        linha = indice.get(chave)
+        if linha is not None and linha.id not in incluidos:
+            incluidos.add(linha.id)
+            resultado.append(linha)
+
+    nao_encontrados_ids = [i for i in ids if i not in por_id]
+    nao_encontrados_skus = [s for s in skus if s not in por_sku]
+    return resultado, nao_encontrados_ids, nao_encontrados_skus
@@ -0,0 +1,234 @@
+"""
+Chaves de API para terminais de ponto de venda e integrações (loja virtual).
+
+Uma chave age em nome de um usuário (permissões e autoria na auditoria) e só
+é aceita nos routers dos seus escopos. Substitui o login com senha nesses
+clientes: a autenticação é um HMAC-SHA256 da chave e uma consulta a um dict
+em memória, sem bcrypt nem acesso ao banco.
+
+- A chave tem o formato sgk_<prefixo>_<segredo> e é mostrada só na criação;
+  no banco fica o HMAC (ver app.utils.security.hash_segredo).
+- O índice em memória tem as chaves ativas de usuários ativos. É recarregado
+  após cada criação/revogação neste processo, a cada
+  CHAVES_API_INTERVALO_VERIFICACAO segundos (alterações de outros processos)
+  e quando o usuário de uma chave tem o token_versao incrementado
+  (desativação, troca de nível; ver app.services.revogacao).
+- Os routers acessíveis por chave declaram a dependência exigir_escopo() em
+  app.main; get_current_user e get_current_cliente usam o usuário da chave
+  validada por ela.
+- Usos por chave vão para chaves_api.usos/ultimo_uso pela escrita adiada
+  (app.services.escrita_adiada) e para /metrics
+  (synchrogest_chaves_api_requisicoes_total).
+- No modo multiloja cada loja tem o seu índice, carregado no primeiro uso e
+  descartado quando o engine da loja sai do LRU.
+"""
+import logging
+import secrets
+import threading
+from datetime import datetime
+from typing import Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import APIKeyHeader
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import engine_da_loja, roteador
+from app.models.chave_api import ChaveApi
+from app.models.usuario import Usuario
+from app.services.auth import UsuarioToken
+from app.services.escrita_adiada import escrita_adiada
+from app.services.revogacao import revogacao
+from app.utils.contexto import loja_atual
+from app.utils.metricas import registro
+from app.utils.security import hash_segredo
+
+logger = logging.getLogger(__name__)
+
+CABECALHO = "X-API-Key"
+# Escopos e os routers que liberam (dependências em app.main)
+ESCOPOS = {
+    "movimentacoes": "Movimentações de estoque (/api/movimentacoes)",
+    "checkout": "Finalização de compras (/api/compras), cliente em X-Cliente-Id",
+    "catalogo": "Produtos e categorias (/api/produtos, /api/categorias)",
+}
+
+METRICA_USO = "synchrogest_chaves_api_requisicoes_total"
+registro.registrar_contador(METRICA_USO, "Requisições autenticadas por chave de API, por chave e escopo")
+
+api_key_header = APIKeyHeader(name=CABECALHO, auto_error=False)
+
+
+class ChaveAutorizada(NamedTuple):
+    id: int
+    prefixo: str
+    escopos: FrozenSet[str]
+    usuario: UsuarioToken
+    # token_versao do usuário na carga; versão maior indica índice desatualizado
+    versao: int
+
+
+def gerar_chave() -> Tuple[str, str]:
+    """
+    Gera uma chave nova; devolve (chave completa, prefixo)
+    """
+    prefixo = secrets.token_hex(4)
+    return f"sgk_{prefixo}_{secrets.token_urlsafe(32)}", prefixo
+
+
+class IndiceChavesApi:
+    def __init__(self):
+        # loja -> {hash da chave: chave}; None é o banco padrão
+        self._chaves: Dict[Optional[str], Dict[str, ChaveAutorizada]] = {}
+        # Serializa as trocas (carga no primeiro uso, periódica e descarte do LRU)
+        self._lock = threading.Lock()
+        self._ativo = False
+        self._evento = threading.Event()
+        self._parar = False
+        self._thread: Optional[threading.Thread] = None
+
+    # ----------------------------
+    # CONSULTA
+    # ----------------------------
+    def autenticar(self, chave: str) -> Optional[ChaveAutorizada]:
+        chave_hash = hash_segredo(chave)
+        loja = loja_atual.get()
+        if loja not in self._chaves and self._ativo:
+            try:
+                self.carregar(loja)
+            except Exception:
+                logger.exception("Falha ao carregar as chaves de API", extra={"loja": loja})
+        chaves = self._chaves.get(loja)
+        if chaves is None:
+            # Índice ainda não carregado: consulta só esta chave
+            return self._consultar(loja, ChaveApi.chave_hash == chave_hash).get(chave_hash)
+
+        autorizada = chaves.get(chave_hash)
+        if autorizada is not None and revogacao.revogado(autorizada.usuario.id, autorizada.versao):
+            # O usuário da chave foi alterado (desativação, nível, senha)
+            self.carregar(loja)
+            autorizada = self._chaves.get(loja, {}).get(chave_hash)
+        return autorizada
+
+    @staticmethod
+    def registrar_uso(autorizada: ChaveAutorizada, escopo: str):
+        escrita_adiada.incrementar(ChaveApi, autorizada.id, "usos")
+        escrita_adiada.definir(ChaveApi, autorizada.id, "ultimo_uso", datetime.utcnow())
+        registro.incrementar(METRICA_USO, chave=autorizada.prefixo, escopo=escopo)
+
+    # ----------------------------
+    # CARGA
+    # ----------------------------
+    @staticmethod
+    def _consultar(loja: Optional[str], *filtros) -> Dict[str, ChaveAutorizada]:
+        with engine_da_loja(loja).connect() as conexao:
+            linhas = conexao.execute(
+                select(
+                    ChaveApi.id,
+                    ChaveApi.prefixo,
+                    ChaveApi.chave_hash,
+                    ChaveApi.escopos,
+                    ChaveApi.usuario_id,
+                    Usuario.nivel_acesso,
+                    Usuario.token_versao,
+                )
+                .join(Usuario, ChaveApi.usuario_id == Usuario.id)
+                .where(ChaveApi.ativo.is_(True), Usuario.ativo.is_(True), *filtros)
+            ).all()
+        return {
+            linha.chave_hash: ChaveAutorizada(
+                id=linha.id,
+                prefixo=linha.prefixo,
+                escopos=frozenset(linha.escopos.split(",")),
+                usuario=UsuarioToken(linha.usuario_id, linha.nivel_acesso, True),
+                versao=linha.token_versao or 0,
+            )
+            for linha in linhas
+        }
+
+    def carregar(self, loja: Optional[str] = None):
+        # Troca os dicts inteiros: leituras concorrentes veem o antigo ou o novo
+        chaves = self._consultar(loja)
+        with self._lock:
+            lojas = dict(self._chaves)
+            lojas[loja] = chaves
+            self._chaves = lojas
+
+    def descartar(self, loja: Optional[str]):
+        """
+        Libera o índice de uma loja (recarregado no próximo uso)
+        """
+        with self._lock:
+            lojas = dict(self._chaves)
+            lojas.pop(loja, None)
+            self._chaves = lojas
+
+    # ----------------------------
+    # CICLO DE VIDA
+    # ----------------------------
+    def _executar(self):
+        while True:
+            self._evento.wait(settings.CHAVES_API_INTERVALO_VERIFICACAO)
+            self._evento.clear()
+            if self._parar:
+                return
+            for loja in list(self._chaves):
+                try:
+                    self.carregar(loja)
+                except Exception:
+                    # Mantém o índice anterior; a próxima verificação tenta de novo
+                    logger.exception("Falha ao recarregar as chaves de API", extra={"loja": loja})
+
+    def iniciar(self):
+        """
+        Carrega as chaves e inicia a verificação periódica em segundo plano
+        (no modo multiloja, as de cada loja são carregadas no primeiro uso)
+        """
+        if not settings.MULTILOJA_ATIVO:
+            try:
+                self.carregar()
+            except Exception:
+                logger.exception("Falha ao carregar as chaves de API")
+        self._ativo = True
+        self._parar = False
+        self._thread = threading.Thread(target=self._executar, name="indice-chaves-api", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar = True
+        self._evento.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._ativo = False
+        self._chaves = {}
+
+
+indice_chaves_api = IndiceChavesApi()
+roteador.ao_descartar(indice_chaves_api.descartar)
+
+
+def exigir_escopo(escopo: str):
+    """
+    Dependência dos routers acessíveis por chave de API. Sem o cabeçalho
+    X-API-Key não faz nada (vale o token Bearer); com ele, valida a chave e o
+    escopo e guarda a chave em request.state para get_current_user
+    """
+    def verificar(request: Request, chave: Optional[str] = Depends(api_key_header)):
+        if chave is None:
+            return
+        autorizada = indice_chaves_api.autenticar(chave)
+        if autorizada is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Chave de API inválida",
+                headers={"WWW-Authenticate": "ApiKey"},
+            )
+        if escopo not in autorizada.escopos:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Chave de API sem o escopo '{escopo}'",
+            )
+        indice_chaves_api.registrar_uso(autorizada, escopo)
+        request.state.chave_api = autorizada
+
+    return verificar
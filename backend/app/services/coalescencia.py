@@ -0,0 +1,95 @@
+"""
+Coalescência (single-flight) de leituras idênticas e simultâneas.
+
+Numa promoção da loja virtual chegam centenas de GET /api/produtos/ iguais no
+mesmo instante, e cada um executaria a mesma consulta. Com um Coalescedor a
+primeira requisição de cada chave (parâmetros normalizados) executa a
+consulta, numa thread do threadpool, e as que chegam enquanto ela está em
+andamento esperam o mesmo resultado, já serializado em JSON (bytes), sem
+tocar no banco.
+
+- Nada fica guardado depois que a consulta termina: não é um cache, só
+  junta requisições concorrentes.
+- Uma alteração nas tabelas de que a leitura depende (ver
+  app.services.invalidacao) faz as requisições seguintes começarem uma
+  consulta nova, em vez de esperar um resultado lido antes do commit.
+- No modo multiloja a chave inclui a loja: requisições de lojas diferentes
+  nunca compartilham um resultado.
+- Quem espera mais que o timeout do coalescedor (ou o passado a executar())
+  desiste e faz a própria consulta.
+
+Contagem em /metrics: synchrogest_coalescencia_requisicoes_total, por leitura
+e resultado (executada, coalescida, timeout).
+"""
+import asyncio
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services import invalidacao
+from app.utils.contexto import loja_atual
+from app.utils.metricas import registro
+
+METRICA = "synchrogest_coalescencia_requisicoes_total"
+registro.registrar_contador(
+    METRICA, "Leituras coalescidas: executadas no banco, atendidas por outra em andamento ou após timeout"
+)
+
+
+class Coalescedor:
+    def __init__(self, nome: str, tabelas: Iterable[str], timeout: Optional[float] = None):
+        self.nome = nome
+        self.timeout = settings.COALESCENCIA_TIMEOUT if timeout is None else timeout
+        self._em_voo: Dict[Hashable, asyncio.Future] = {}
+        for tabela in tabelas:
+            invalidacao.registrar_ouvinte(tabela, self._ao_invalidar)
+
+    def _ao_invalidar(self, ids):
+        # Troca o dict (pode ser chamado de outra thread): as consultas em
+        # andamento terminam para quem já espera, as próximas começam de novo
+        self._em_voo = {}
+
+    async def executar(self, chave: Hashable, consultar: Callable[[], bytes], timeout: Optional[float] = None) -> bytes:
+        """
+        Executa consultar() no threadpool, ou espera a execução em andamento com a mesma chave
+        """
+        if not settings.COALESCENCIA_ATIVA:
+            return await run_in_threadpool(consultar)
+
+        chave = (loja_atual.get(), chave)
+        em_voo = self._em_voo
+        futuro = em_voo.get(chave)
+        if futuro is not None:
+            try:
+                resultado = await asyncio.wait_for(asyncio.shield(futuro), self.timeout if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                registro.incrementar(METRICA, leitura=self.nome, resultado="timeout")
+                return await run_in_threadpool(consultar)
+            except asyncio.CancelledError:
+                if not futuro.cancelled():
+                    raise
+                # A requisição que executava a consulta foi cancelada
+                return await run_in_threadpool(consultar)
+            registro.incrementar(METRICA, leitura=self.nome, resultado="coalescida")
+            return resultado
+
+        futuro = asyncio.get_running_loop().create_future()
+        em_voo[chave] = futuro
+        registro.incrementar(METRICA, leitura=self.nome, resultado="executada")
+        try:
+            resultado = await run_in_threadpool(consultar)
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as erro:
+            futuro.set_exception(erro)
+            # Marca a exceção como lida: sem ninguém esperando, o asyncio avisaria no log
+            futuro.exception()
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            if em_voo.get(chave) is futuro:
+                del em_voo[chave]
@@ -0,0 +1,142 @@
+"""
+Registro de consultas lentas do engine.
+
+Comandos acima de CONSULTAS_LENTAS_LIMITE_MS são guardados em um buffer
+circular (consultado pelos administradores) e registrados no log estruturado
+com o SQL, o formato dos parâmetros (tipos, nunca os valores), a duração e a
+rota da requisição. Com CONSULTAS_LENTAS_EXPLAIN, o plano da consulta
+(EXPLAIN no PostgreSQL, EXPLAIN QUERY PLAN no SQLite) é obtido por uma thread
+em segundo plano, fora do caminho da requisição. No modo multiloja cada
+entrada guarda a loja e o engine em que a consulta rodou, e a listagem mostra
+só as da loja do administrador.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, List, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.utils.contexto import loja_atual, request_id, rota_atual
+
+logger = logging.getLogger(__name__)
+
+# Consultas aguardando EXPLAIN; se a fila encher, o plano é simplesmente omitido
+TAMANHO_FILA_EXPLAIN = 100
+
+
+def _formato_parametros(parametros: Any, executemany: bool) -> Any:
+    """
+    Descreve os parâmetros pelos tipos, sem copiar valores (que podem ser dados pessoais)
+    """
+    if executemany:
+        return {"linhas": len(parametros), "formato": _formato_parametros(parametros[0], False) if parametros else None}
+    if isinstance(parametros, dict):
+        return {nome: type(valor).__name__ for nome, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [type(valor).__name__ for valor in parametros]
+    return None
+
+
+class RegistroConsultasLentas:
+    def __init__(self):
+        self._entradas: deque = deque(maxlen=settings.CONSULTAS_LENTAS_MAXIMO)
+        self._fila_explain: "queue.Queue" = queue.Queue(maxsize=TAMANHO_FILA_EXPLAIN)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # ----------------------------
+    # CAPTURA
+    # ----------------------------
+    def instrumentar(self, engine):
+        @event.listens_for(engine, "before_cursor_execute")
+        def _antes(conn, cursor, statement, parameters, context, executemany):
+            conn.info["consulta_lenta_inicio"] = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _depois(conn, cursor, statement, parameters, context, executemany):
+            inicio = conn.info.pop("consulta_lenta_inicio", None)
+            if inicio is None:
+                return
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            if duracao_ms >= settings.CONSULTAS_LENTAS_LIMITE_MS:
+                if conn.get_execution_options().get("consulta_explain"):
+                    return
+                self._registrar(conn.engine, statement, parameters, executemany, duracao_ms)
+
+    def _registrar(self, engine, comando: str, parametros: Any, executemany: bool, duracao_ms: float):
+        entrada = {
+            "data_hora": datetime.utcnow(),
+            "sql": comando,
+            "parametros": _formato_parametros(parametros, executemany),
+            "duracao_ms": round(duracao_ms, 2),
+            "rota": rota_atual(),
+            "request_id": request_id.get(),
+            "loja": loja_atual.get(),
+            "plano": None,
+        }
+        self._entradas.append(entrada)
+
+        explicavel = comando.lstrip()[:6].upper() in ("SELECT", "WITH")
+        if settings.CONSULTAS_LENTAS_EXPLAIN and explicavel and not executemany:
+            try:
+                self._fila_explain.put_nowait((engine, entrada, parametros))
+                self._garantir_thread()
+                return
+            except queue.Full:
+                pass
+        self._logar(entrada)
+
+    @staticmethod
+    def _logar(entrada: dict):
+        campos = {chave: valor for chave, valor in entrada.items() if chave not in ("data_hora", "request_id")}
+        logger.warning("Consulta lenta (%.0f ms)", entrada["duracao_ms"], extra=campos)
+
+    # ----------------------------
+    # EXPLAIN EM SEGUNDO PLANO
+    # ----------------------------
+    def _garantir_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar_explains, name="explain", daemon=True)
+                self._thread.start()
+
+    @staticmethod
+    def _plano(engine, comando: str, parametros: Any) -> List[str]:
+        dialeto = engine.dialect.name
+        prefixo = "EXPLAIN QUERY PLAN " if dialeto == "sqlite" else "EXPLAIN "
+        with engine.connect() as conexao:
+            linhas = conexao.execution_options(consulta_explain=True).exec_driver_sql(prefixo + comando, parametros).all()
+        if dialeto == "sqlite":
+            # (id, parent, notused, detail)
+            return [linha[-1] for linha in linhas]
+        return [linha[0] for linha in linhas]
+
+    def _executar_explains(self):
+        while True:
+            engine, entrada, parametros = self._fila_explain.get()
+            try:
+                entrada["plano"] = self._plano(engine, entrada["sql"], parametros)
+            except Exception as erro:
+                entrada["plano"] = [f"EXPLAIN falhou: {erro}"]
+            self._logar(entrada)
+
+    # ----------------------------
+    # CONSULTA
+    # ----------------------------
+    def listar(self) -> List[dict]:
+        """
+        Entradas do buffer (da loja atual), da mais recente para a mais antiga
+        """
+        loja = loja_atual.get()
+        return [entrada for entrada in reversed(self._entradas) if entrada["loja"] == loja]
+
+    def limpar(self):
+        self._entradas.clear()
+
+
+consultas_lentas = RegistroConsultasLentas()
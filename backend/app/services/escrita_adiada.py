@@ -0,0 +1,159 @@
+"""
+Escrita adiada (write-behind) de atualizações não críticas.
+
+Campos como usuarios.ultimo_login e os contadores de uso das chaves de API
+não precisam estar no banco no instante em que mudam. Gravá-los na própria
+requisição custa um commit extra e disputa o bloqueio da linha (ex.: logins
+em rajada na troca de turno). Aqui eles ficam num buffer em memória e uma
+thread os grava a cada ESCRITA_ADIADA_INTERVALO segundos, com um único
+UPDATE em lote (executemany) por tabela e coluna:
+
+- definir(): o valor mais recente de cada linha vence (ex.: último login);
+- incrementar(): os incrementos da mesma linha são somados no buffer e
+  aplicados sobre o valor do banco (coluna = coluna + n), o que mantém a soma
+  correta com vários processos.
+
+Os valores ficam no máximo ESCRITA_ADIADA_INTERVALO segundos sem ir para o
+banco; parar() grava o que restou no encerramento. Se a gravação falhar, as
+atualizações voltam para o buffer e são tentadas no próximo ciclo. Sem a
+thread iniciada (scripts, testes), cada atualização é gravada na hora.
+
+Os UPDATEs são Core, fora do ORM: não passam pela auditoria nem pela
+revogação de tokens, o que é o desejado para estes campos. No modo multiloja
+cada atualização guarda a loja da requisição e vai para o banco dela (uma
+transação por loja).
+"""
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, func, update
+
+from app.config import settings
+from app.database import engine_da_loja
+from app.utils.contexto import loja_atual
+
+logger = logging.getLogger(__name__)
+
+# (loja, modelo, coluna) -> {id da linha: valor}
+Pendentes = Dict[Tuple[Optional[str], type, str], Dict[int, Any]]
+
+
+class EscritaAdiada:
+    def __init__(self):
+        self._valores: Pendentes = {}
+        self._incrementos: Pendentes = {}
+        self._trava = threading.Lock()
+        self._evento = threading.Event()
+        self._parar = False
+        self._thread: Optional[threading.Thread] = None
+
+    # ----------------------------
+    # REGISTRO
+    # ----------------------------
+    def definir(self, modelo, id: int, coluna: str, valor: Any):
+        with self._trava:
+            self._valores.setdefault((loja_atual.get(), modelo, coluna), {})[id] = valor
+        self._gravar_sem_thread()
+
+    def incrementar(self, modelo, id: int, coluna: str, valor: int = 1):
+        with self._trava:
+            linhas = self._incrementos.setdefault((loja_atual.get(), modelo, coluna), {})
+            linhas[id] = linhas.get(id, 0) + valor
+        self._gravar_sem_thread()
+
+    def _gravar_sem_thread(self):
+        if self._thread is None:
+            self.descarregar()
+
+    def pendentes(self) -> int:
+        with self._trava:
+            return sum(len(linhas) for linhas in self._valores.values()) + sum(
+                len(linhas) for linhas in self._incrementos.values()
+            )
+
+    # ----------------------------
+    # GRAVAÇÃO
+    # ----------------------------
+    def descarregar(self):
+        """
+        Grava as atualizações pendentes: um UPDATE em lote por loja, tabela e coluna
+        """
+        with self._trava:
+            valores, self._valores = self._valores, {}
+            incrementos, self._incrementos = self._incrementos, {}
+        if not valores and not incrementos:
+            return
+
+        for loja in {chave[0] for chave in valores} | {chave[0] for chave in incrementos}:
+            valores_loja = {chave: linhas for chave, linhas in valores.items() if chave[0] == loja}
+            incrementos_loja = {chave: linhas for chave, linhas in incrementos.items() if chave[0] == loja}
+            try:
+                with engine_da_loja(loja).begin() as conexao:
+                    for (_, modelo, coluna), linhas in valores_loja.items():
+                        tabela = modelo.__table__
+                        conexao.execute(
+                            update(tabela)
+                            .where(tabela.c.id == bindparam("_id"))
+                            .values({coluna: bindparam("_valor")}),
+                            [{"_id": id, "_valor": valor} for id, valor in linhas.items()],
+                        )
+                    for (_, modelo, coluna), linhas in incrementos_loja.items():
+                        tabela = modelo.__table__
+                        conexao.execute(
+                            update(tabela)
+                            .where(tabela.c.id == bindparam("_id"))
+                            .values({coluna: func.coalesce(tabela.c[coluna], 0) + bindparam("_valor")}),
+                            [{"_id": id, "_valor": valor} for id, valor in linhas.items()],
+                        )
+            except Exception:
+                logger.exception(
+                    "Falha ao gravar as atualizações adiadas; nova tentativa no próximo ciclo", extra={"loja": loja}
+                )
+                self._devolver(valores_loja, incrementos_loja)
+
+    def _devolver(self, valores: Pendentes, incrementos: Pendentes):
+        with self._trava:
+            for chave, linhas in valores.items():
+                atuais = self._valores.setdefault(chave, {})
+                for id, valor in linhas.items():
+                    # Um valor registrado depois da falha é mais recente
+                    atuais.setdefault(id, valor)
+            for chave, linhas in incrementos.items():
+                atuais = self._incrementos.setdefault(chave, {})
+                for id, valor in linhas.items():
+                    atuais[id] = atuais.get(id, 0) + valor
+
+    # ----------------------------
+    # CICLO DE VIDA
+    # ----------------------------
+    def _executar(self):
+        while True:
+            self._evento.wait(settings.ESCRITA_ADIADA_INTERVALO)
+            self._evento.clear()
+            self.descarregar()
+            if self._parar:
+                return
+
+    def iniciar(self):
+        """
+        Inicia a gravação periódica em segundo plano
+        """
+        self._parar = False
+        self._thread = threading.Thread(target=self._executar, name="escrita-adiada", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        """
+        Encerra a thread gravando as atualizações pendentes
+        """
+        self._parar = True
+        self._evento.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        # Atualizações registradas durante o encerramento
+        self.descarregar()
+
+
+escrita_adiada = EscritaAdiada()
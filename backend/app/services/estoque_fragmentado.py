@@ -0,0 +1,288 @@
+"""
+Estoque fragmentado para produtos muito vendidos.
+
+Numa promoção o mesmo produto recebe centenas de baixas por segundo (checkout
+e movimentações), e cada uma bloqueia a linha do produto até o commit: as
+vendas passam a andar uma de cada vez. Com o estoque fragmentado o saldo do
+produto fica dividido em N linhas de estoque_fragmentos, e cada baixa
+atualiza só um fragmento sorteado, com um UPDATE condicional (quantidade >=
+pedida) que nunca deixa o fragmento negativo: até N vendas seguem em paralelo.
+
+- Ativado por produto (PUT /api/produtos/{id}/fragmentos, administradores);
+  o saldo atual é dividido igualmente entre os fragmentos.
+- Se o fragmento sorteado não tem saldo, a baixa percorre os fragmentos com
+  saldo na ordem do número do fragmento (a mesma em que o balanceador os
+  bloqueia, para não haver deadlock); estoque insuficiente só quando a soma
+  não cobre.
+- Uma thread, a cada ESTOQUE_FRAGMENTOS_INTERVALO segundos, grava a soma em
+  produtos.quantidade (listagens, estoque baixo, índice de SKUs) e
+  redistribui o saldo quando algum fragmento cai abaixo de
+  ESTOQUE_FRAGMENTOS_LIMIAR da cota igual. A verificação do checkout e
+  GET /api/produtos/{id} somam os fragmentos e veem o saldo exato.
+
+Contagem em /metrics: synchrogest_estoque_fragmentado_baixas_total, por
+resultado (fragmento, varios, insuficiente), e
+synchrogest_estoque_fragmentado_rebalanceamentos_total.
+"""
+import logging
+import random
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import engine_da_loja, roteador
+from app.models.estoque_fragmento import EstoqueFragmento
+from app.models.produto import Produto
+from app.services.invalidacao import invalidar, marcar_alterados
+from app.utils.metricas import registro
+
+logger = logging.getLogger(__name__)
+
+METRICA_BAIXAS = "synchrogest_estoque_fragmentado_baixas_total"
+METRICA_REBALANCEAMENTOS = "synchrogest_estoque_fragmentado_rebalanceamentos_total"
+registro.registrar_contador(
+    METRICA_BAIXAS, "Baixas de estoque fragmentado: num fragmento sorteado, em vários ou recusadas"
+)
+registro.registrar_contador(METRICA_REBALANCEAMENTOS, "Redistribuições do saldo entre os fragmentos de um produto")
+
+# Releituras dos fragmentos quando outra baixa esvazia um deles no meio da retirada
+TENTATIVAS = 3
+
+fragmentos = EstoqueFragmento.__table__
+
+
+def distribuir(total: int, partes: int) -> List[int]:
+    """
+    Divide o total em partes iguais (as primeiras recebem o resto)
+    """
+    return [total // partes + (1 if i < total % partes else 0) for i in range(partes)]
+
+
+# ----------------------------
+# LEITURA
+# ----------------------------
+def quantidade_total(db: Session, produto_id: int) -> int:
+    return db.execute(
+        select(func.coalesce(func.sum(fragmentos.c.quantidade), 0)).where(fragmentos.c.produto_id == produto_id)
+    ).scalar()
+
+
+def quantidades(db: Session, produto_id: int) -> List[int]:
+    return list(db.execute(
+        select(fragmentos.c.quantidade).where(fragmentos.c.produto_id == produto_id).order_by(fragmentos.c.fragmento)
+    ).scalars())
+
+
+# ----------------------------
+# BAIXAS E ENTRADAS (na transação da requisição)
+# ----------------------------
+def _subtrair(db: Session, produto_id: int, fragmento: int, quantidade: int) -> bool:
+    resultado = db.execute(
+        update(fragmentos)
+        .where(
+            fragmentos.c.produto_id == produto_id,
+            fragmentos.c.fragmento == fragmento,
+            fragmentos.c.quantidade >= quantidade,
+        )
+        .values(quantidade=fragmentos.c.quantidade - quantidade)
+    )
+    return resultado.rowcount == 1
+
+
+def retirar(db: Session, produto: Produto, quantidade: int) -> bool:
+    """
+    Dá baixa de quantidade no estoque fragmentado; False se não há saldo
+    """
+    if _subtrair(db, produto.id, random.randrange(produto.fragmentos_estoque), quantidade):
+        registro.incrementar(METRICA_BAIXAS, resultado="fragmento")
+        return True
+
+    # Fragmento sorteado sem saldo: retira dos fragmentos com saldo em ordem
+    # crescente (como o balanceador); numa nova tentativa, só dos que vêm
+    # depois do último já bloqueado
+    restante, inicio = quantidade, 0
+    for _ in range(TENTATIVAS):
+        linhas = db.execute(
+            select(fragmentos.c.fragmento, fragmentos.c.quantidade)
+            .where(
+                fragmentos.c.produto_id == produto.id,
+                fragmentos.c.fragmento >= inicio,
+                fragmentos.c.quantidade > 0,
+            )
+            .order_by(fragmentos.c.fragmento)
+        ).all()
+        if sum(disponivel for _, disponivel in linhas) < restante:
+            break
+        for fragmento, disponivel in linhas:
+            parte = min(disponivel, restante)
+            if _subtrair(db, produto.id, fragmento, parte):
+                restante -= parte
+                inicio = fragmento
+            if restante == 0:
+                registro.incrementar(METRICA_BAIXAS, resultado="varios")
+                return True
+
+    # As baixas parciais são desfeitas com o rollback da requisição
+    registro.incrementar(METRICA_BAIXAS, resultado="insuficiente")
+    return False
+
+
+def retirar_do_produto(db: Session, produto: Produto, quantidade: int) -> bool:
+    """
+    Baixa em produto sem fragmentos: UPDATE ... SET quantidade = quantidade - n
+    WHERE quantidade >= n, atômico (a linha fica bloqueada até o commit e duas
+    baixas simultâneas não vendem o mesmo saldo); False se não há saldo
+    """
+    resultado = db.execute(
+        update(Produto)
+        .where(Produto.id == produto.id, Produto.quantidade >= quantidade)
+        .values(quantidade=Produto.quantidade - quantidade)
+        .execution_options(synchronize_session=False)
+    )
+    # Lido de novo no próximo acesso (ex.: o saldo na mensagem de estoque insuficiente)
+    db.expire(produto, ["quantidade"])
+    if resultado.rowcount != 1:
+        return False
+    marcar_alterados(db, Produto.__tablename__, (produto.id,), ("quantidade",))
+    return True
+
+
+def adicionar(db: Session, produto: Produto, quantidade: int):
+    """
+    Soma quantidade a um fragmento sorteado (entradas e estornos de saídas)
+    """
+    db.execute(
+        update(fragmentos)
+        .where(
+            fragmentos.c.produto_id == produto.id,
+            fragmentos.c.fragmento == random.randrange(produto.fragmentos_estoque),
+        )
+        .values(quantidade=fragmentos.c.quantidade + quantidade)
+    )
+
+
+# ----------------------------
+# CONFIGURAÇÃO
+# ----------------------------
+def configurar(db: Session, produto: Produto, partes: int):
+    """
+    Divide o saldo atual do produto em partes fragmentos (0 volta a usar só
+    produtos.quantidade). O produto deve ter sido lido com bloqueio (FOR UPDATE).
+    """
+    if produto.fragmentos_estoque:
+        total = sum(db.execute(
+            select(fragmentos.c.quantidade).where(fragmentos.c.produto_id == produto.id).with_for_update()
+        ).scalars())
+    else:
+        total = produto.quantidade or 0
+
+    db.execute(delete(fragmentos).where(fragmentos.c.produto_id == produto.id))
+    if partes:
+        db.execute(insert(fragmentos), [
+            {"produto_id": produto.id, "fragmento": fragmento, "quantidade": quantidade}
+            for fragmento, quantidade in enumerate(distribuir(total, partes))
+        ])
+    produto.fragmentos_estoque = partes
+    produto.quantidade = total
+    db.commit()
+
+
+# ----------------------------
+# CONSOLIDAÇÃO E REBALANCEAMENTO
+# ----------------------------
+class BalanceadorEstoque:
+    def __init__(self):
+        self._evento = threading.Event()
+        self._parar = False
+        self._thread: Optional[threading.Thread] = None
+
+    def executar(self, loja: Optional[str] = None) -> Dict[str, int]:
+        """
+        Consolida e rebalanceia os produtos fragmentados da loja (uma
+        transação curta por produto, para não segurar as baixas)
+        """
+        engine = engine_da_loja(loja)
+        with engine.connect() as conexao:
+            produtos = conexao.execute(
+                select(Produto.id, Produto.quantidade).where(Produto.fragmentos_estoque > 0)
+            ).all()
+
+        consolidados, rebalanceados = [], 0
+        for produto_id, consolidada in produtos:
+            with engine.begin() as conexao:
+                # Produto antes dos fragmentos, na mesma ordem de configurar()
+                # (PUT /fragmentos): a ordem inversa daria deadlock
+                conexao.execute(select(Produto.id).where(Produto.id == produto_id).with_for_update())
+                linhas = conexao.execute(
+                    select(fragmentos.c.fragmento, fragmentos.c.quantidade)
+                    .where(fragmentos.c.produto_id == produto_id)
+                    .order_by(fragmentos.c.fragmento)
+                    .with_for_update()
+                ).all()
+                if not linhas:
+                    continue
+                atuais = [quantidade for _, quantidade in linhas]
+                total = sum(atuais)
+                cota = total / len(atuais)
+                if total >= len(atuais) and min(atuais) < cota * settings.ESTOQUE_FRAGMENTOS_LIMIAR:
+                    novas = distribuir(total, len(atuais))
+                    conexao.execute(
+                        update(fragmentos)
+                        .where(fragmentos.c.produto_id == produto_id, fragmentos.c.fragmento == bindparam("_fragmento"))
+                        .values(quantidade=bindparam("_quantidade")),
+                        [
+                            {"_fragmento": fragmento, "_quantidade": quantidade}
+                            for (fragmento, _), quantidade in zip(linhas, novas)
+                        ],
+                    )
+                    rebalanceados += 1
+                    registro.incrementar(METRICA_REBALANCEAMENTOS)
+                if total != consolidada:
+                    conexao.execute(
+                        update(Produto)
+                        .where(Produto.id == produto_id)
+                        .values(quantidade=total, data_atualizacao=datetime.utcnow())
+                    )
+                    consolidados.append(produto_id)
+
+        if consolidados:
+            invalidar(Produto.__tablename__, consolidados, ("quantidade", "data_atualizacao"))
+        return {"produtos": len(produtos), "consolidados": len(consolidados), "rebalanceados": rebalanceados}
+
+    # ----------------------------
+    # CICLO DE VIDA
+    # ----------------------------
+    def _executar(self):
+        while True:
+            self._evento.wait(settings.ESTOQUE_FRAGMENTOS_INTERVALO)
+            self._evento.clear()
+            if self._parar:
+                return
+            # No multiloja, as lojas com engine aberto (as que tiveram requisições)
+            for loja in roteador.lojas() if settings.MULTILOJA_ATIVO else [None]:
+                try:
+                    self.executar(loja)
+                except Exception:
+                    logger.exception("Falha ao consolidar o estoque fragmentado", extra={"loja": loja})
+
+    def iniciar(self):
+        """
+        Inicia a consolidação periódica em segundo plano
+        """
+        self._parar = False
+        self._thread = threading.Thread(target=self._executar, name="estoque-fragmentado", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar = True
+        self._evento.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+
+balanceador_estoque = BalanceadorEstoque()
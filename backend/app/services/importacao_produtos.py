@@ -0,0 +1,288 @@
+"""
+Importação em massa de produtos a partir de arquivos CSV ou XLSX.
+
+O arquivo é lido em streaming (linha a linha) e processado em lotes: para cada
+lote, categorias e SKUs são verificados com uma única consulta IN e os produtos
+são gravados com INSERT/UPDATE em massa, em vez de uma consulta por linha.
+
+Produtos já existentes (atualizar_existentes) recebem só as colunas presentes
+no cabeçalho do arquivo: uma planilha só com SKU e preços não apaga a
+descrição nem zera a quantidade mínima.
+"""
+import csv
+import io
+import zipfile
+from datetime import datetime
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.categoria import Categoria
+from app.models.produto import Produto
+from app.schemas.produto import ProdutoCreate
+from app.services.atualizacao_produtos import ATUALIZAR_POR_ID, agrupar_por_campos
+from app.services.invalidacao import invalidar
+
+CAMPOS_DECIMAIS = ("preco_custo", "preco_venda")
+
+
+class FormatoNaoSuportado(Exception):
+    """
+    Arquivo de importação em formato não reconhecido ou sem suporte instalado
+    """
+
+
+class ArquivoInvalido(Exception):
+    """
+    Arquivo de importação corrompido ou ilegível
+    """
+
+
+# ----------------------------
+# LEITURA EM STREAMING
+# ----------------------------
+def _normalizar_cabecalho(colunas) -> List[str]:
+    return [str(c or "").strip().lower() for c in colunas]
+
+
+def ler_linhas_csv(arquivo: IO[bytes]) -> Iterator[Tuple[int, Dict[str, Optional[str]]]]:
+    """
+    Lê um CSV linha a linha, detectando o separador (',' ou ';'), com o
+    número da linha no arquivo (as linhas em branco são puladas)
+    """
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    amostra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+    except csv.Error:
+        dialeto = csv.excel
+
+    leitor = csv.reader(texto, dialeto)
+    cabecalho = _normalizar_cabecalho(next(leitor, []))
+    for valores in leitor:
+        if not any(valores):
+            continue
+        yield leitor.line_num, dict(zip(cabecalho, valores))
+
+
+def ler_linhas_xlsx(arquivo: IO[bytes]) -> Iterator[Tuple[int, Dict[str, Optional[str]]]]:
+    """
+    Lê a primeira planilha de um XLSX em modo read-only (streaming), com o
+    número da linha na planilha
+    """
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise FormatoNaoSuportado("Importação de XLSX requer o pacote openpyxl")
+
+    try:
+        planilha = load_workbook(arquivo, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        # KeyError: zip válido sem as partes de uma planilha
+        raise ArquivoInvalido("Arquivo XLSX inválido ou corrompido")
+    try:
+        linhas = planilha.active.iter_rows(values_only=True)
+        cabecalho = _normalizar_cabecalho(next(linhas, []))
+        for numero, valores in enumerate(linhas, start=2):
+            if not any(v not in (None, "") for v in valores):
+                continue
+            # Converte as células para texto, como viriam de um CSV
+            yield numero, {
+                coluna: None if valor is None else str(int(valor) if isinstance(valor, float) and valor.is_integer() else valor)
+                for coluna, valor in zip(cabecalho, valores)
+            }
+    finally:
+        planilha.close()
+
+
+def ler_linhas(arquivo: IO[bytes], nome_arquivo: Optional[str]) -> Iterator[Tuple[int, Dict[str, Optional[str]]]]:
+    """
+    Escolhe o leitor adequado pela extensão do arquivo
+    """
+    nome = (nome_arquivo or "").lower()
+    if nome.endswith(".xlsx"):
+        return ler_linhas_xlsx(arquivo)
+    if nome.endswith(".csv") or nome.endswith(".txt"):
+        return ler_linhas_csv(arquivo)
+    raise FormatoNaoSuportado("Formato de arquivo não suportado. Envie um arquivo .csv ou .xlsx")
+
+
+# ----------------------------
+# NORMALIZAÇÃO DE LINHAS
+# ----------------------------
+def _normalizar_decimal(valor: str) -> str:
+    # Aceita o formato brasileiro (1.234,56) além do formato com ponto
+    if "," in valor:
+        return valor.replace(".", "").replace(",", ".")
+    return valor
+
+
+def _normalizar_linha(linha: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    dados = {}
+    for chave, valor in linha.items():
+        if not chave:
+            continue
+        if isinstance(valor, str):
+            valor = valor.strip() or None
+        if valor is not None and chave in CAMPOS_DECIMAIS:
+            valor = _normalizar_decimal(valor)
+        dados[chave] = valor
+    return dados
+
+
+def _formatar_erros(exc: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(p) for p in erro['loc'])}: {erro['msg']}" for erro in exc.errors()]
+
+
+# ----------------------------
+# IMPORTAÇÃO EM LOTES
+# ----------------------------
+class _Importacao:
+    def __init__(self, db: Session, atualizar_existentes: bool, tamanho_lote: int, max_erros: int):
+        self.db = db
+        self.atualizar_existentes = atualizar_existentes
+        self.tamanho_lote = tamanho_lote
+        self.max_erros = max_erros
+        self.skus_vistos = set()
+        self.categorias_por_id = set()
+        self.categorias_por_nome: Dict[str, int] = {}
+        self.resultado = {
+            "total_linhas": 0,
+            "inseridos": 0,
+            "atualizados": 0,
+            "ignorados": 0,
+            "erros": [],
+            "erros_truncados": False,
+        }
+
+    def registrar_erro(self, numero: int, sku: Optional[str], mensagens: List[str]):
+        self.resultado["ignorados"] += 1
+        if len(self.resultado["erros"]) >= self.max_erros:
+            self.resultado["erros_truncados"] = True
+            return
+        self.resultado["erros"].append({"linha": numero, "codigo_sku": sku, "erros": mensagens})
+
+    def _carregar_categorias(self, lote: List[Tuple[int, Dict]]):
+        """
+        Resolve, em uma única consulta, as categorias do lote ainda não conhecidas
+        """
+        ids, nomes = set(), set()
+        for _, dados in lote:
+            categoria_id = dados.get("categoria_id")
+            if categoria_id and categoria_id.isdigit():
+                if int(categoria_id) not in self.categorias_por_id:
+                    ids.add(int(categoria_id))
+            elif dados.get("categoria") and dados["categoria"] not in self.categorias_por_nome:
+                nomes.add(dados["categoria"])
+
+        if not ids and not nomes:
+            return
+        consulta = select(Categoria.id, Categoria.nome).where(
+            or_(Categoria.id.in_(ids), Categoria.nome.in_(nomes))
+        )
+        for categoria_id, nome in self.db.execute(consulta):
+            self.categorias_por_id.add(categoria_id)
+            self.categorias_por_nome[nome] = categoria_id
+
+    def processar_lote(self, lote: List[Tuple[int, Dict]]):
+        lote = [(numero, _normalizar_linha(linha)) for numero, linha in lote]
+        self._carregar_categorias(lote)
+
+        validos: List[Tuple[int, ProdutoCreate]] = []
+        for numero, dados in lote:
+            sku = dados.get("codigo_sku")
+
+            # Resolver categoria por ID ou por nome
+            nome_categoria = dados.pop("categoria", None)
+            if not dados.get("categoria_id") and nome_categoria:
+                dados["categoria_id"] = self.categorias_por_nome.get(nome_categoria)
+                if dados["categoria_id"] is None:
+                    self.registrar_erro(numero, sku, [f"Categoria '{nome_categoria}' não encontrada"])
+                    continue
+
+            try:
+                produto = ProdutoCreate.model_validate(dados)
+            except ValidationError as exc:
+                self.registrar_erro(numero, sku, _formatar_erros(exc))
+                continue
+
+            if produto.categoria_id not in self.categorias_por_id:
+                self.registrar_erro(numero, sku, [f"Categoria {produto.categoria_id} não encontrada"])
+                continue
+
+            if produto.codigo_sku in self.skus_vistos:
+                self.registrar_erro(numero, sku, ["Código SKU duplicado no arquivo"])
+                continue
+            self.skus_vistos.add(produto.codigo_sku)
+
+            validos.append((numero, produto))
+
+        if not validos:
+            return
+
+        # Verificar SKUs existentes com uma única consulta
+        skus = [produto.codigo_sku for _, produto in validos]
+        existentes = dict(
+            self.db.execute(select(Produto.codigo_sku, Produto.id).where(Produto.codigo_sku.in_(skus))).all()
+        )
+
+        agora = datetime.utcnow()
+        novos, atualizados = [], []
+        for numero, produto in validos:
+            produto_id = existentes.get(produto.codigo_sku)
+            if produto_id is None:
+                novos.append({**produto.model_dump(), "quantidade": 0, "data_criacao": agora, "data_atualizacao": agora})
+            elif self.atualizar_existentes:
+                # Só as colunas do arquivo: as ausentes mantêm o valor atual
+                campos = produto.model_dump(exclude_unset=True)
+                atualizados.append({**campos, "_id": produto_id, "data_atualizacao": agora})
+            else:
+                self.registrar_erro(numero, produto.codigo_sku, ["Produto com este código SKU já existe"])
+
+        if novos:
+            self.db.execute(insert(Produto), novos)
+        for grupo in agrupar_por_campos(atualizados):
+            self.db.execute(ATUALIZAR_POR_ID, grupo)
+        self.db.commit()
+
+        self.resultado["inseridos"] += len(novos)
+        self.resultado["atualizados"] += len(atualizados)
+
+
+def importar_produtos(
+    db: Session,
+    linhas: Iterator[Tuple[int, Dict[str, Optional[str]]]],
+    atualizar_existentes: bool = True,
+    tamanho_lote: Optional[int] = None,
+) -> dict:
+    """
+    Importa produtos em lotes e retorna um relatório com os erros por linha
+    (linhas numeradas como no arquivo, ver ler_linhas).
+    Cada lote é gravado em sua própria transação.
+    """
+    importacao = _Importacao(
+        db,
+        atualizar_existentes=atualizar_existentes,
+        tamanho_lote=tamanho_lote or settings.IMPORTACAO_TAMANHO_LOTE,
+        max_erros=settings.IMPORTACAO_MAX_ERROS,
+    )
+
+    lote = []
+    for numero, linha in linhas:
+        importacao.resultado["total_linhas"] += 1
+        lote.append((numero, linha))
+        if len(lote) >= importacao.tamanho_lote:
+            importacao.processar_lote(lote)
+            lote = []
+    if lote:
+        importacao.processar_lote(lote)
+
+    if importacao.resultado["inseridos"] or importacao.resultado["atualizados"]:
+        invalidar("produtos")
+
+    return importacao.resultado
@@ -0,0 +1,323 @@
+"""
+Índice em memória de codigo_sku -> resumo do produto, para leitura no caixa.
+
+Os dados ficam em estruturas compactas: um dict SKU -> posição, arrays
+tipados (id, preço em centavos, quantidade) e os nomes concatenados em um único
+buffer UTF-8. O índice é carregado na inicialização e mantido atualizado por:
+
+- ouvintes de invalidação (alterações pelo ORM e operações em massa), que só
+  enfileiram os IDs alterados: a releitura é feita pela thread do índice,
+  fora da requisição que gravou;
+- uma verificação periódica da "impressão digital" da tabela de produtos
+  (contagem, maior id e maior data_atualizacao), que detecta alterações feitas
+  por outros processos.
+
+Enquanto o índice não está pronto (ou aguarda uma reconstrução completa), as
+buscas vão direto ao banco.
+"""
+import sys
+import threading
+from array import array
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import engine
+from app.models.produto import Produto
+from app.services import invalidacao
+
+COLUNAS = (Produto.id, Produto.codigo_sku, Produto.nome, Produto.preco_venda, Produto.quantidade)
+
+# Acima deste número de IDs alterados é mais barato reconstruir o índice inteiro
+LIMITE_ATUALIZACAO_PARCIAL = 1000
+
+
+def _centavos(valor) -> int:
+    return int(round(Decimal(valor or 0) * 100))
+
+
+class _Tabela:
+    """
+    Armazenamento compacto dos resumos. Cada produto ocupa uma posição nos arrays.
+    """
+
+    def __init__(self):
+        self.posicao_por_sku: Dict[str, int] = {}
+        self.posicao_por_id = array("q")
+        self.ids = array("q")
+        self.precos = array("q")
+        self.quantidades = array("q")
+        # Nomes em um único buffer (início e tamanho por posição); nomes
+        # substituídos só são descartados na próxima reconstrução
+        self.nomes = bytearray()
+        self.nome_inicio = array("q")
+        self.nome_tamanho = array("l")
+        self.skus: List[Optional[str]] = []
+        self.livres: List[int] = []
+
+    def _posicao(self, produto_id: int) -> int:
+        if produto_id < len(self.posicao_por_id):
+            return self.posicao_por_id[produto_id]
+        return -1
+
+    def gravar(self, produto_id: int, sku: str, nome: str, preco, quantidade: Optional[int]):
+        posicao = self._posicao(produto_id)
+        if posicao >= 0:
+            if self.skus[posicao] != sku:
+                self.posicao_por_sku.pop(self.skus[posicao], None)
+        elif self.livres:
+            posicao = self.livres.pop()
+        else:
+            posicao = len(self.ids)
+            self.ids.append(0)
+            self.precos.append(0)
+            self.quantidades.append(0)
+            self.nome_inicio.append(0)
+            self.nome_tamanho.append(0)
+            self.skus.append(None)
+
+        if produto_id >= len(self.posicao_por_id):
+            self.posicao_por_id.extend([-1] * (produto_id + 1 - len(self.posicao_por_id)))
+        self.posicao_por_id[produto_id] = posicao
+
+        self.ids[posicao] = produto_id
+        self.precos[posicao] = _centavos(preco)
+        self.quantidades[posicao] = quantidade or 0
+        nome = (nome or "").encode()
+        self.nome_inicio[posicao] = len(self.nomes)
+        self.nome_tamanho[posicao] = len(nome)
+        self.nomes += nome
+        self.skus[posicao] = sku
+        self.posicao_por_sku[sku] = posicao
+
+    def remover(self, produto_id: int):
+        posicao = self._posicao(produto_id)
+        if posicao < 0:
+            return
+        self.posicao_por_sku.pop(self.skus[posicao], None)
+        self.posicao_por_id[produto_id] = -1
+        self.skus[posicao] = None
+        self.livres.append(posicao)
+
+    def _nome(self, posicao: int) -> str:
+        inicio = self.nome_inicio[posicao]
+        return self.nomes[inicio:inicio + self.nome_tamanho[posicao]].decode()
+
+    def obter(self, sku: str) -> Optional[dict]:
+        posicao = self.posicao_por_sku.get(sku)
+        if posicao is None:
+            return None
+        return {
+            "id": self.ids[posicao],
+            "codigo_sku": sku,
+            "nome": self._nome(posicao),
+            "preco_venda": Decimal(self.precos[posicao]).scaleb(-2),
+            "quantidade": self.quantidades[posicao],
+        }
+
+    def memoria(self) -> int:
+        """
+        Estimativa em bytes da memória ocupada (estruturas + strings + inteiros)
+        """
+        total = sys.getsizeof(self.posicao_por_sku) + sys.getsizeof(self.skus) + sys.getsizeof(self.nomes)
+        total += sum(sys.getsizeof(p) for p in self.posicao_por_sku.values())
+        total += sum(sys.getsizeof(s) for s in self.skus if s is not None)
+        vetores = (self.posicao_por_id, self.ids, self.precos, self.quantidades, self.nome_inicio, self.nome_tamanho)
+        for vetor in vetores:
+            total += vetor.buffer_info()[1] * vetor.itemsize
+        return total
+
+    def __len__(self):
+        return len(self.posicao_por_sku)
+
+
+class IndiceSku:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tabela = _Tabela()
+        self._versao = -1
+        self._impressao = None
+        self._reconstrucao_pendente = True
+        self._pedidos_reconstrucao = 0
+        self._alterados_durante_reconstrucao: Optional[set] = None
+        # IDs invalidados à espera da thread do índice
+        self._pendentes: set = set()
+        self._evento = threading.Event()
+        self._parar = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def disponivel(self) -> bool:
+        return (
+            not self._reconstrucao_pendente
+            and self._versao == invalidacao.versao(Produto.__tablename__)
+        )
+
+    @property
+    def ocioso(self) -> bool:
+        """
+        Sem releituras à espera ou em andamento na thread do índice
+        """
+        return not self._pendentes and self.disponivel
+
+    # ----------------------------
+    # CARGA E ATUALIZAÇÃO
+    # ----------------------------
+    def reconstruir(self):
+        """
+        Recarrega o índice inteiro a partir do banco, sem bloquear as leituras
+        """
+        with self._lock:
+            self._alterados_durante_reconstrucao = set()
+            # A carga lê depois dos commits que enfileiraram estes IDs
+            self._pendentes = set()
+            versao = invalidacao.versao(Produto.__tablename__)
+            pedidos = self._pedidos_reconstrucao
+
+        nova = _Tabela()
+        with engine.connect() as conexao:
+            impressao = invalidacao.impressao_digital(conexao, Produto)
+            for linha in conexao.execution_options(yield_per=10000).execute(select(*COLUNAS)):
+                nova.gravar(*linha)
+
+        with self._lock:
+            alterados = self._alterados_durante_reconstrucao
+            self._alterados_durante_reconstrucao = None
+            self._tabela = nova
+            self._impressao = impressao
+            self._versao = versao
+            # Um novo pedido de reconstrução durante a carga exige outra carga
+            self._reconstrucao_pendente = pedidos != self._pedidos_reconstrucao
+        if alterados:
+            self.atualizar(alterados)
+
+    def atualizar(self, ids: Iterable[int], versao: Optional[int] = None):
+        """
+        Recarrega apenas os produtos informados; versao é a versão de
+        invalidação que a releitura cobre, lida antes de os IDs serem
+        determinados (se omitida, a atual antes da consulta)
+        """
+        ids = set(ids)
+        if versao is None:
+            versao = invalidacao.versao(Produto.__tablename__)
+        with engine.connect() as conexao:
+            linhas = conexao.execute(select(*COLUNAS).where(Produto.id.in_(ids))).all()
+        with self._lock:
+            if self._alterados_durante_reconstrucao is not None:
+                self._alterados_durante_reconstrucao.update(ids)
+            encontrados = set()
+            for linha in linhas:
+                self._tabela.gravar(*linha)
+                encontrados.add(linha.id)
+            for produto_id in ids - encontrados:
+                self._tabela.remover(produto_id)
+            self._versao = versao
+
+    def _atualizar_pendentes(self):
+        with self._lock:
+            ids, self._pendentes = self._pendentes, set()
+            versao = invalidacao.versao(Produto.__tablename__)
+        self.atualizar(ids, versao)
+
+    def _ao_invalidar(self, ids: Optional[set]):
+        # Chamado no commit da requisição: só enfileira; as buscas vão ao
+        # banco (versão desatualizada) até a thread do índice reler os produtos
+        with self._lock:
+            if ids is not None and len(self._pendentes) + len(ids) <= LIMITE_ATUALIZACAO_PARCIAL:
+                self._pendentes.update(ids)
+            else:
+                self._pedidos_reconstrucao += 1
+                self._reconstrucao_pendente = True
+        self._evento.set()
+
+    def verificar_versao(self):
+        """
+        Compara a impressão digital da tabela com a do índice para detectar
+        alterações feitas por outros processos
+        """
+        # Antes das consultas: um commit deste processo no meio delas deixa o
+        # índice indisponível até a releitura dos IDs enfileirados
+        versao = invalidacao.versao(Produto.__tablename__)
+        with engine.connect() as conexao:
+            impressao = invalidacao.impressao_digital(conexao, Produto)
+            if impressao == self._impressao:
+                return
+            ids = invalidacao.alterados_desde(conexao, Produto, self._impressao, impressao)
+        if ids is None:
+            self.reconstruir()
+            return
+        self.atualizar(ids, versao)
+        self._impressao = impressao
+
+    # ----------------------------
+    # CONSULTA
+    # ----------------------------
+    def obter(self, sku: str) -> Optional[dict]:
+        return self._tabela.obter(sku)
+
+    def status(self) -> dict:
+        tabela = self._tabela
+        return {
+            "disponivel": self.disponivel,
+            "total": len(tabela),
+            "memoria_bytes": tabela.memoria(),
+        }
+
+    # ----------------------------
+    # CICLO DE VIDA
+    # ----------------------------
+    def _executar(self):
+        while not self._parar:
+            try:
+                if self._reconstrucao_pendente:
+                    self.reconstruir()
+                elif self._pendentes:
+                    self._atualizar_pendentes()
+                else:
+                    self.verificar_versao()
+            except Exception:
+                # Falhas temporárias do banco: as buscas continuam indo ao banco
+                self._reconstrucao_pendente = True
+            self._evento.wait(settings.INDICE_SKU_INTERVALO_VERIFICACAO)
+            self._evento.clear()
+
+    def iniciar(self):
+        """
+        Registra os ouvintes e inicia a carga e a verificação periódica em segundo plano
+        """
+        invalidacao.registrar_ouvinte(Produto.__tablename__, self._ao_invalidar)
+        self._parar = False
+        self._thread = threading.Thread(target=self._executar, name="indice-sku", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar = True
+        self._evento.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+indice_sku = IndiceSku()
+
+
+def buscar_por_sku(db: Session, codigo: str) -> Optional[dict]:
+    """
+    Busca o resumo do produto no índice em memória, ou no banco se o índice
+    não estiver disponível
+    """
+    if settings.INDICE_SKU_ATIVO and indice_sku.disponivel:
+        return indice_sku.obter(codigo)
+
+    linha = db.execute(select(*COLUNAS).where(Produto.codigo_sku == codigo)).first()
+    if linha is None:
+        return None
+    return {
+        "id": linha.id,
+        "codigo_sku": linha.codigo_sku,
+        "nome": linha.nome,
+        "preco_venda": linha.preco_venda,
+        "quantidade": linha.quantidade or 0,
+    }
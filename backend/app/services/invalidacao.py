@@ -0,0 +1,136 @@
+"""
+Registro de invalidação dos caches em memória derivados do banco.
+
+Cada cache registra um ouvinte para as tabelas de que depende; quem altera os
+dados chama invalidar() uma única vez por operação (e não uma vez por linha).
+A versão por tabela permite que um cache detecte invalidações que perdeu.
+Um ouvinte pode se limitar a algumas colunas: invalidações que informam as
+colunas alteradas (ex.: só quantidade, numa baixa de estoque) e não tocam
+nenhuma delas não o chamam.
+
+Alterações feitas pelo ORM (add/delete/setattr + commit) são detectadas pelos
+eventos de sessão abaixo e invalidam os caches automaticamente após o commit.
+Alterações de outros processos (outros workers, scripts) não passam por aqui:
+os caches as detectam comparando a impressao_digital() da tabela.
+"""
+import threading
+from collections import defaultdict
+from itertools import chain
+from typing import Callable, Iterable, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+_lock = threading.Lock()
+_versoes = defaultdict(int)
+_ouvintes = defaultdict(list)
+
+
+def registrar_ouvinte(
+    tabela: str, ouvinte: Callable[[Optional[set]], None], colunas: Optional[Iterable[str]] = None
+):
+    """
+    Registra uma função chamada a cada invalidação da tabela (ou só das que
+    podem ter alterado alguma das colunas informadas).
+    A função recebe o conjunto de IDs alterados, ou None se não for conhecido.
+    """
+    colunas = frozenset(colunas) if colunas is not None else None
+    with _lock:
+        if all(registrado != ouvinte for registrado, _ in _ouvintes[tabela]):
+            _ouvintes[tabela].append((ouvinte, colunas))
+
+
+def versao(tabela: str) -> int:
+    """
+    Retorna o número de invalidações já registradas para a tabela
+    """
+    return _versoes[tabela]
+
+
+def invalidar(tabela: str, ids: Optional[Iterable[int]] = None, colunas: Optional[Iterable[str]] = None):
+    """
+    Invalida os caches dependentes da tabela; colunas, se conhecidas, são as
+    alteradas (None: qualquer coluna, inclusive inserções e exclusões)
+    """
+    ids = set(ids) if ids is not None else None
+    colunas = set(colunas) if colunas is not None else None
+    with _lock:
+        _versoes[tabela] += 1
+        ouvintes = list(_ouvintes[tabela])
+    for ouvinte, interesse in ouvintes:
+        if colunas is None or interesse is None or not interesse.isdisjoint(colunas):
+            ouvinte(ids)
+
+
+# ----------------------------
+# ALTERAÇÕES DE OUTROS PROCESSOS
+# ----------------------------
+def impressao_digital(conexao, model) -> Tuple:
+    """
+    Contagem, maior id e maior data_atualizacao da tabela: muda com inserções,
+    exclusões e edições (data_atualizacao tem onupdate), de qualquer processo
+    """
+    return tuple(conexao.execute(
+        select(func.count(model.id), func.max(model.id), func.max(model.data_atualizacao))
+    ).one())
+
+
+def alterados_desde(conexao, model, anterior: Optional[Tuple], atual: Tuple) -> Optional[set]:
+    """
+    IDs inseridos ou editados desde a impressão digital anterior; None quando
+    só uma recarga completa resolve (primeira leitura, exclusões)
+    """
+    if anterior is None or atual[0] < anterior[0] or anterior[2] is None:
+        return None
+    _, maior_id, ultima_data = anterior
+    # id > maior_id: inserções com data_atualizacao antiga (cargas, scripts)
+    return set(conexao.execute(
+        select(model.id).where(or_(model.data_atualizacao >= ultima_data, model.id > (maior_id or 0)))
+    ).scalars())
+
+
+# ----------------------------
+# EVENTOS DE SESSÃO DO ORM
+# ----------------------------
+def marcar_alterados(session: Session, tabela: str, ids: Iterable[int], colunas: Optional[Iterable[str]] = None):
+    """
+    Inclui IDs alterados por UPDATEs do Core na invalidação feita após o
+    commit da sessão (descartados no rollback); colunas None: qualquer coluna
+    """
+    alteradas = session.info.setdefault("tabelas_alteradas", {})
+    entrada = alteradas.setdefault(tabela, {"ids": set(), "colunas": set()})
+    entrada["ids"].update(ids)
+    if colunas is None:
+        entrada["colunas"] = None
+    elif entrada["colunas"] is not None:
+        entrada["colunas"].update(colunas)
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_alteracoes(session, flush_context):
+    """
+    Guarda os IDs (e, nas edições, as colunas) alterados das tabelas com
+    caches registrados
+    """
+    for obj in chain(session.new, session.deleted):
+        tabela = getattr(obj, "__tablename__", None)
+        if _ouvintes.get(tabela):
+            marcar_alterados(session, tabela, (obj.id,))
+    for obj in session.dirty:
+        tabela = getattr(obj, "__tablename__", None)
+        if _ouvintes.get(tabela):
+            # O histórico dos atributos ainda é o de antes do flush
+            colunas = [atributo.key for atributo in inspect(obj).attrs if atributo.history.has_changes()]
+            marcar_alterados(session, tabela, (obj.id,), colunas)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_apos_commit(session):
+    alteradas = session.info.pop("tabelas_alteradas", None)
+    for tabela, entrada in (alteradas or {}).items():
+        invalidar(tabela, entrada["ids"], entrada["colunas"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_alteracoes(session):
+    session.info.pop("tabelas_alteradas", None)
@@ -0,0 +1,305 @@
+"""
+Limite de taxa (token bucket) para o login e a finalização de compras.
+
+Cada tentativa de login custa um bcrypt (~0,3 s de CPU) e cada checkout uma
+transação com bloqueio de estoque; uma rajada de tentativas ruins ocupa todos
+os workers. O middleware abaixo consome uma ficha de três baldes antes de
+deixar a requisição seguir:
+
+- por IP (ou por chave de API válida, no lugar do IP: a loja virtual atende
+  muitos clientes a partir de um único endereço);
+- por conta: o e-mail do formulário de login, o cliente do token ou do
+  cabeçalho X-Cliente-Id no checkout;
+- por rota, somando todos os clientes (teto de trabalho caro por processo).
+
+Sem ficha em algum balde a resposta é 429 com Retry-After (segundos até a
+próxima ficha) e a recusa é contada em synchrogest_limite_taxa_recusas_total.
+Os limites são "capacidade/segundos" (ex.: "20/60": rajadas de até 20 e 20
+fichas repostas a cada 60 s).
+
+Os baldes ficam num dict chave -> tupla de floats, só com as chaves
+usadas recentemente: um balde que já se encheu de novo equivale a um balde
+ausente e é removido na limpeza periódica (e antes disso, se o número de
+chaves passar de LIMITE_TAXA_MAX_CHAVES). Com vários workers, cada um tem os
+seus baldes; LIMITE_TAXA_BANCO aponta um arquivo SQLite compartilhado (mesma
+máquina) onde os baldes são atualizados por um único UPSERT atômico.
+
+No modo multiloja a chave do balde por conta leva a loja (o mesmo e-mail ou id
+de cliente em lojas diferentes são contas diferentes); os baldes por IP e por
+rota continuam do processo, que é o recurso protegido.
+"""
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs
+
+from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from app.config import settings
+from app.services.chaves_api import CABECALHO, indice_chaves_api
+from app.utils.contexto import loja_atual
+from app.utils.metricas import registro
+
+METRICA_RECUSAS = "synchrogest_limite_taxa_recusas_total"
+registro.registrar_contador(METRICA_RECUSAS, "Requisições recusadas (429) pelo limite de taxa, por regra e balde")
+
+# Formulário de login maior que isto é recusado (413): sem ler o username,
+# a tentativa escaparia do balde por conta
+TAMANHO_MAXIMO_FORMULARIO = 8192
+
+
+class Limite(NamedTuple):
+    capacidade: float
+    taxa: float  # fichas repostas por segundo
+
+    @classmethod
+    def ler(cls, valor: str) -> "Limite":
+        capacidade, segundos = valor.split("/")
+        return cls(float(capacidade), float(capacidade) / float(segundos))
+
+
+class Regra(NamedTuple):
+    nome: str
+    rotas: Tuple[Tuple[str, str], ...]  # (método, caminho)
+    por_ip: Limite
+    por_conta: Limite
+    por_rota: Limite
+
+
+def _regras() -> List[Regra]:
+    return [
+        Regra(
+            "login",
+            (("POST", "/api/auth/login"), ("POST", "/api/auth/clientes/login"), ("POST", "/api/auth/verify-admin")),
+            Limite.ler(settings.LIMITE_TAXA_LOGIN_IP),
+            Limite.ler(settings.LIMITE_TAXA_LOGIN_CONTA),
+            Limite.ler(settings.LIMITE_TAXA_LOGIN_ROTA),
+        ),
+        Regra(
+            "checkout",
+            (("POST", "/api/compras"), ("POST", "/api/compras/")),
+            Limite.ler(settings.LIMITE_TAXA_CHECKOUT_IP),
+            Limite.ler(settings.LIMITE_TAXA_CHECKOUT_CONTA),
+            Limite.ler(settings.LIMITE_TAXA_CHECKOUT_ROTA),
+        ),
+    ]
+
+
+# ----------------------------
+# BALDES
+# ----------------------------
+class BaldesMemoria:
+    """
+    Baldes do processo: chave -> (fichas, instante, segundos para encher de
+    novo). Usado só pelo event loop, sem trava.
+    """
+
+    def __init__(self, max_chaves: int, intervalo_limpeza: float = 60.0):
+        self._baldes: Dict[str, Tuple[float, float, float]] = {}
+        self._max_chaves = max_chaves
+        self._intervalo_limpeza = intervalo_limpeza
+        self._ultima_limpeza = time.monotonic()
+
+    def consumir(self, chave: str, limite: Limite) -> float:
+        """
+        Consome uma ficha; devolve 0 se havia ficha ou os segundos até a próxima
+        """
+        agora = time.monotonic()
+        recarga = limite.capacidade / limite.taxa
+        fichas, instante, _ = self._baldes.get(chave, (limite.capacidade, agora, recarga))
+        fichas = min(limite.capacidade, fichas + (agora - instante) * limite.taxa)
+        if fichas < 1:
+            self._baldes[chave] = (fichas, agora, recarga)
+            return (1 - fichas) / limite.taxa
+        self._baldes[chave] = (fichas - 1, agora, recarga)
+        if len(self._baldes) > self._max_chaves or agora - self._ultima_limpeza > self._intervalo_limpeza:
+            self.limpar(agora)
+        return 0.0
+
+    def limpar(self, agora: Optional[float] = None):
+        """
+        Remove os baldes que já se encheram de novo (equivalentes a ausentes)
+        """
+        agora = time.monotonic() if agora is None else agora
+        self._ultima_limpeza = agora
+        self._baldes = {
+            chave: balde for chave, balde in self._baldes.items() if agora - balde[1] < balde[2]
+        }
+        # Muitas chaves ativas: descarta as mais antigas, com folga de 10% para
+        # que a próxima chave nova não dispare outra limpeza
+        excesso = len(self._baldes) - int(self._max_chaves * 0.9)
+        if len(self._baldes) > self._max_chaves and excesso > 0:
+            for chave in list(self._baldes)[:excesso]:
+                del self._baldes[chave]
+
+    def __len__(self):
+        return len(self._baldes)
+
+
+class BaldesSQLite:
+    """
+    Baldes num arquivo SQLite compartilhado pelos workers da mesma máquina
+    (SQLite 3.35+, por causa do RETURNING)
+    """
+
+    def __init__(self, caminho: str, intervalo_limpeza: float = 60.0):
+        self._conexao = sqlite3.connect(caminho, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS baldes (chave TEXT PRIMARY KEY, fichas REAL NOT NULL, "
+            "instante REAL NOT NULL, recarga REAL NOT NULL)"
+        )
+        self._trava = threading.Lock()
+        self._intervalo_limpeza = intervalo_limpeza
+        self._ultima_limpeza = time.time()
+
+    def consumir(self, chave: str, limite: Limite) -> float:
+        # Relógio de parede: os processos não compartilham o monotonic
+        agora = time.time()
+        parametros = {"chave": chave, "capacidade": limite.capacidade, "taxa": limite.taxa, "agora": agora,
+                      "recarga": limite.capacidade / limite.taxa}
+        with self._trava:
+            linha = self._conexao.execute(
+                "INSERT INTO baldes (chave, fichas, instante, recarga) "
+                "VALUES (:chave, :capacidade - 1, :agora, :recarga) "
+                "ON CONFLICT(chave) DO UPDATE SET "
+                "fichas = min(:capacidade, fichas + (:agora - instante) * :taxa) - 1, instante = :agora "
+                "WHERE min(:capacidade, fichas + (:agora - instante) * :taxa) >= 1 "
+                "RETURNING fichas",
+                parametros,
+            ).fetchone()
+            if linha is None:
+                fichas, instante = self._conexao.execute(
+                    "SELECT fichas, instante FROM baldes WHERE chave = ?", (chave,)
+                ).fetchone()
+                fichas = min(limite.capacidade, fichas + (agora - instante) * limite.taxa)
+                return max((1 - fichas) / limite.taxa, 0.001)
+            if agora - self._ultima_limpeza > self._intervalo_limpeza:
+                self._ultima_limpeza = agora
+                self._conexao.execute("DELETE FROM baldes WHERE :agora - instante >= recarga", {"agora": agora})
+        return 0.0
+
+
+# ----------------------------
+# MIDDLEWARE
+# ----------------------------
+def _cabecalho(scope, nome: bytes) -> Optional[str]:
+    for chave, valor in scope.get("headers", ()):
+        if chave == nome:
+            return valor.decode("latin-1")
+    return None
+
+
+def _conta_do_token(scope) -> Optional[str]:
+    autorizacao = _cabecalho(scope, b"authorization")
+    if not autorizacao or not autorizacao.lower().startswith("bearer "):
+        return None
+    try:
+        # Token verificado: um sub forjado não pode esgotar o balde de outra conta
+        payload = jwt.decode(autorizacao[7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    sub = payload.get("sub")
+    return f'{payload.get("tipo", "usuario")}:{sub}' if sub is not None else None
+
+
+class LimiteTaxaMiddleware:
+    """
+    Middleware ASGI que aplica as regras de limite de taxa (ver o módulo)
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.regras = {rota: regra for regra in _regras() for rota in regra.rotas}
+        if settings.LIMITE_TAXA_BANCO:
+            self.baldes = BaldesSQLite(settings.LIMITE_TAXA_BANCO)
+        else:
+            self.baldes = BaldesMemoria(settings.LIMITE_TAXA_MAX_CHAVES)
+
+    async def __call__(self, scope, receive, send):
+        regra = self.regras.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if regra is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Chave de API válida substitui o IP; inválida conta como o IP (a rota recusa)
+        chave_api = _cabecalho(scope, CABECALHO.lower().encode())
+        # Fora do event loop: sem o índice carregado, autenticar consulta o banco
+        autorizada = await run_in_threadpool(indice_chaves_api.autenticar, chave_api) if chave_api else None
+        cliente = scope.get("client")
+        origem = f"chave:{autorizada.id}" if autorizada else f'ip:{cliente[0] if cliente else "-"}'
+
+        if regra.nome == "login":
+            conta, reenviar = await self._conta_do_formulario(receive)
+            if reenviar is None:
+                resposta = JSONResponse({"detail": "Formulário de login muito grande"}, status_code=413)
+                await resposta(scope, receive, send)
+                return
+            receive = reenviar
+        elif autorizada is not None:
+            cliente_id = _cabecalho(scope, b"x-cliente-id")
+            conta = f"cliente:{cliente_id}" if cliente_id else None
+        else:
+            conta = _conta_do_token(scope)
+
+        # O balde da rota (compartilhado) por último: só gasta ficha quem passou nos outros
+        loja = loja_atual.get()
+        prefixo = f"{loja}:" if loja is not None else ""
+        baldes = []
+        if autorizada is None:
+            baldes.append(("ip", f"{regra.nome}:{origem}", regra.por_ip))
+        if conta:
+            baldes.append(("conta", f"{prefixo}{regra.nome}:conta:{conta}", regra.por_conta))
+        baldes.append(("rota", f'rota:{scope["path"]}', regra.por_rota))
+
+        for balde, chave, limite in baldes:
+            if isinstance(self.baldes, BaldesSQLite):
+                espera = await run_in_threadpool(self.baldes.consumir, chave, limite)
+            else:
+                espera = self.baldes.consumir(chave, limite)
+            if espera:
+                registro.incrementar(METRICA_RECUSAS, regra=regra.nome, balde=balde)
+                segundos = max(1, math.ceil(espera))
+                resposta = JSONResponse(
+                    {"detail": f"Muitas tentativas. Tente novamente em {segundos} s."},
+                    status_code=429,
+                    headers={"Retry-After": str(segundos)},
+                )
+                await resposta(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _conta_do_formulario(receive):
+        """
+        Lê o corpo do formulário de login (username) e devolve um receive que o
+        entrega de novo à rota; (None, None) se o corpo passar de
+        TAMANHO_MAXIMO_FORMULARIO
+        """
+        partes, tamanho, mensagens = [], 0, []
+        while True:
+            mensagem = await receive()
+            mensagens.append(mensagem)
+            if mensagem["type"] != "http.request":
+                break
+            partes.append(mensagem.get("body", b""))
+            tamanho += len(partes[-1])
+            if not mensagem.get("more_body", False) or tamanho > TAMANHO_MAXIMO_FORMULARIO:
+                break
+
+        if tamanho > TAMANHO_MAXIMO_FORMULARIO:
+            return None, None
+        campos = parse_qs(b"".join(partes).decode("utf-8", "replace"))
+        conta = campos.get("username", [""])[0].strip().lower() or None
+
+        async def reenviar():
+            if mensagens:
+                return mensagens.pop(0)
+            return await receive()
+
+        return conta, reenviar
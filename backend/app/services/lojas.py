@@ -0,0 +1,88 @@
+"""
+Resolução da loja de cada requisição (modo multiloja).
+
+Com MULTILOJA_ATIVO, várias lojas (ex.: biscoito-pet-house, synchrogest-app)
+são atendidas pelo mesmo processo. A loja vem do cabeçalho X-Loja ou, sem
+ele, do primeiro rótulo do host (biscoito-pet-house.onrender.com); hosts que
+não são lojas usam LOJA_PADRAO. A loja fica em app.utils.contexto.loja_atual
+e define:
+
+- o banco usado pelas sessões (SessionLocal roteia para o engine da loja, ver
+  app.database.RoteadorEngines);
+- a claim "loja" dos tokens emitidos, recusados em outra loja;
+- a separação dos dados em memória (revogação, chaves de API, coalescência,
+  limite de taxa, escrita adiada, auditoria, consultas lentas).
+
+Os índices de SKU e de autocomplete não são carregados no modo multiloja (as
+buscas consultam o banco da loja). /metrics e os perfis de requisição são do
+processo, para quem opera o servidor.
+"""
+import re
+from typing import FrozenSet, Optional
+
+from starlette.responses import JSONResponse
+
+from app.config import settings
+from app.utils.contexto import loja_atual
+
+CABECALHO = "X-Loja"
+# Nome da loja: vai para o nome do arquivo SQLite ou do esquema
+FORMATO_LOJA = re.compile(r"^[a-z0-9][a-z0-9-]{0,62}$")
+# Rotas do processo, atendidas sem loja
+ROTAS_SEM_LOJA = frozenset({"/", "/metrics", "/api/test", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json"})
+
+
+def lojas_configuradas() -> FrozenSet[str]:
+    return frozenset(loja.strip().lower() for loja in settings.LOJAS.split(",") if loja.strip())
+
+
+def _cabecalho(scope, nome: bytes) -> Optional[str]:
+    for chave, valor in scope.get("headers", ()):
+        if chave == nome:
+            return valor.decode("latin-1").strip().lower()
+    return None
+
+
+def _preflight(scope) -> bool:
+    # O navegador não envia X-Loja no preflight do CORS (respondido pelo CORSMiddleware)
+    return scope["method"] == "OPTIONS" and _cabecalho(scope, b"access-control-request-method") is not None
+
+
+class LojasMiddleware:
+    """
+    Middleware ASGI que define a loja da requisição; loja desconhecida é 404
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.lojas = lojas_configuradas()
+        for loja in self.lojas | ({settings.LOJA_PADRAO} if settings.LOJA_PADRAO else set()):
+            if not FORMATO_LOJA.match(loja):
+                raise ValueError(f"Nome de loja inválido: {loja!r}")
+
+    def resolver(self, scope) -> Optional[str]:
+        loja = _cabecalho(scope, CABECALHO.lower().encode())
+        if loja:
+            return loja if loja in self.lojas else None
+        host = _cabecalho(scope, b"host") or ""
+        rotulo = host.split(":", 1)[0].split(".", 1)[0]
+        if rotulo in self.lojas:
+            return rotulo
+        return settings.LOJA_PADRAO or None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in ROTAS_SEM_LOJA or _preflight(scope):
+            await self.app(scope, receive, send)
+            return
+
+        loja = self.resolver(scope)
+        if loja is None:
+            resposta = JSONResponse({"detail": "Loja não encontrada"}, status_code=404)
+            await resposta(scope, receive, send)
+            return
+
+        token = loja_atual.set(loja)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            loja_atual.reset(token)
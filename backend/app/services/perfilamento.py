@@ -0,0 +1,278 @@
+"""
+Perfilamento sob demanda de requisições, por amostragem de pilhas.
+
+Um administrador (check_admin_user) envia o cabeçalho X-Perfilar: 1 ou o
+parâmetro ?perfilar=1 em qualquer requisição; a resposta traz X-Perfil-Id e o
+perfil fica disponível em /api/monitoramento/perfis/{id}, como pilhas no
+formato "folded" (flame graph) ou como tabela das funções mais frequentes.
+Também é possível perfilar uma porcentagem aleatória das requisições durante
+uma janela de tempo.
+
+Uma thread amostra as pilhas a cada PERFIL_INTERVALO_MS enquanto houver
+requisições perfiladas, atribuindo cada pilha à requisição dona: na thread do
+event loop, pela tarefa asyncio em execução; nas threads do threadpool (rotas
+síncronas), pelo contexto copiado para a thread. Sem o marcador e fora de uma
+janela de amostragem o middleware só repassa a requisição.
+"""
+import asyncio
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import Context, ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.auth import check_admin_user, get_current_user
+
+_perfil_atual: ContextVar[Optional["Perfil"]] = ContextVar("perfil_atual", default=None)
+
+
+def _nome_quadro(codigo) -> str:
+    arquivo = "/".join(codigo.co_filename.replace("\\", "/").rsplit("/", 2)[-2:])
+    return f"{codigo.co_qualname} ({arquivo}:{codigo.co_firstlineno})".replace(";", ",")
+
+
+class Perfil:
+    def __init__(self, origem: str):
+        self.id = uuid.uuid4().hex
+        self.origem = origem
+        self.data_hora = datetime.utcnow()
+        self.rota: Optional[str] = None
+        self.duracao_ms = 0.0
+        self.pilhas: Counter = Counter()
+        self.tarefa: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread_loop: Optional[int] = None
+
+    def registrar(self, quadro):
+        nomes = []
+        while quadro is not None:
+            nomes.append(_nome_quadro(quadro.f_code))
+            quadro = quadro.f_back
+        self.pilhas[";".join(reversed(nomes))] += 1
+
+    @property
+    def amostras(self) -> int:
+        return sum(self.pilhas.values())
+
+    def folded(self) -> str:
+        """
+        Uma linha "raiz;...;folha contagem" por pilha (flamegraph.pl, speedscope)
+        """
+        return "".join(f"{pilha} {total}\n" for pilha, total in self.pilhas.most_common())
+
+    def top(self, limite: int) -> List[dict]:
+        """
+        Funções com mais amostras: "propria" conta só quando a função está no
+        topo da pilha; "total" inclui o tempo nas funções chamadas
+        """
+        propria, total = Counter(), Counter()
+        for pilha, vezes in self.pilhas.items():
+            nomes = pilha.split(";")
+            propria[nomes[-1]] += vezes
+            for nome in set(nomes):
+                total[nome] += vezes
+        amostras = self.amostras or 1
+        return [
+            {
+                "funcao": nome,
+                "propria": propria[nome],
+                "total": vezes,
+                "percentual_total": round(vezes * 100 / amostras, 1),
+            }
+            for nome, vezes in total.most_common(limite)
+        ]
+
+    def resumo(self) -> dict:
+        return {
+            "id": self.id,
+            "origem": self.origem,
+            "data_hora": self.data_hora,
+            "rota": self.rota,
+            "duracao_ms": self.duracao_ms,
+            "amostras": self.amostras,
+        }
+
+
+class Perfilador:
+    def __init__(self):
+        self._ativos: Dict[str, Perfil] = {}
+        self._perfis: "OrderedDict[str, Perfil]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.amostragem_percentual = 0.0
+        self.amostragem_ate = 0.0
+
+    # ----------------------------
+    # AMOSTRAGEM DAS PILHAS
+    # ----------------------------
+    def _dono_thread_trabalho(self, quadro) -> Optional[Perfil]:
+        # As threads do anyio executam context.run(func) com o contexto da requisição
+        while quadro is not None:
+            codigo = quadro.f_code
+            if codigo.co_name == "run" and "anyio" in codigo.co_filename:
+                contexto = quadro.f_locals.get("context")
+                if isinstance(contexto, Context):
+                    return contexto.get(_perfil_atual)
+                return None
+            quadro = quadro.f_back
+        return None
+
+    def _amostrar(self):
+        intervalo = settings.PERFIL_INTERVALO_MS / 1000
+        propria = threading.get_ident()
+        while True:
+            with self._lock:
+                ativos = list(self._ativos.values())
+                if not ativos:
+                    self._thread = None
+                    return
+            por_loop: Dict[int, List[Perfil]] = {}
+            for perfil in ativos:
+                por_loop.setdefault(perfil.thread_loop, []).append(perfil)
+            for thread_id, quadro in sys._current_frames().items():
+                if thread_id == propria:
+                    continue
+                if thread_id in por_loop:
+                    perfis = por_loop[thread_id]
+                    tarefa = asyncio.current_task(perfis[0].loop)
+                    dono = next((perfil for perfil in perfis if perfil.tarefa is tarefa), None)
+                else:
+                    dono = self._dono_thread_trabalho(quadro)
+                if dono is not None and dono.id in self._ativos:
+                    dono.registrar(quadro)
+            time.sleep(intervalo)
+
+    def iniciar(self, perfil: Perfil):
+        perfil.tarefa = asyncio.current_task()
+        perfil.loop = asyncio.get_running_loop()
+        perfil.thread_loop = threading.get_ident()
+        with self._lock:
+            self._ativos[perfil.id] = perfil
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._amostrar, name="perfilador", daemon=True)
+                self._thread.start()
+
+    def finalizar(self, perfil: Perfil):
+        with self._lock:
+            self._ativos.pop(perfil.id, None)
+            self._perfis[perfil.id] = perfil
+            while len(self._perfis) > settings.PERFIL_MAXIMO:
+                self._perfis.popitem(last=False)
+
+    # ----------------------------
+    # JANELA DE AMOSTRAGEM ALEATÓRIA
+    # ----------------------------
+    def iniciar_amostragem(self, percentual: float, duracao_segundos: int):
+        self.amostragem_percentual = percentual
+        self.amostragem_ate = time.monotonic() + duracao_segundos
+
+    def parar_amostragem(self):
+        self.amostragem_ate = 0.0
+
+    def amostragem_status(self) -> dict:
+        restante = max(0.0, self.amostragem_ate - time.monotonic())
+        return {
+            "ativa": restante > 0,
+            "percentual": self.amostragem_percentual,
+            "segundos_restantes": round(restante),
+        }
+
+    # ----------------------------
+    # CONSULTA
+    # ----------------------------
+    def listar(self) -> List[dict]:
+        with self._lock:
+            return [perfil.resumo() for perfil in reversed(self._perfis.values())]
+
+    def obter(self, perfil_id: str) -> Optional[Perfil]:
+        return self._perfis.get(perfil_id)
+
+
+perfilador = Perfilador()
+
+
+def _pediu_perfil(scope) -> bool:
+    parametros = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if parametros.get("perfilar") == ["1"]:
+        return True
+    for nome, valor in scope.get("headers", ()):
+        if nome == b"x-perfilar":
+            return valor == b"1"
+    return False
+
+
+def _autorizacao(scope) -> Optional[str]:
+    for nome, valor in scope.get("headers", ()):
+        if nome == b"authorization":
+            tipo, _, token = valor.decode("latin-1").partition(" ")
+            return token if tipo.lower() == "bearer" and token else None
+    return None
+
+
+def _eh_admin(scope) -> bool:
+    token = _autorizacao(scope)
+    if not token:
+        return False
+    db = SessionLocal()
+    try:
+        check_admin_user(get_current_user(Request(scope), token, db))
+        return True
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+
+class PerfilamentoMiddleware:
+    """
+    Middleware ASGI que perfila as requisições marcadas por administradores e
+    as sorteadas durante uma janela de amostragem
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origem = None
+        if perfilador.amostragem_ate and time.monotonic() < perfilador.amostragem_ate:
+            if random.random() * 100 < perfilador.amostragem_percentual:
+                origem = "amostragem"
+        if origem is None and _pediu_perfil(scope):
+            if await run_in_threadpool(_eh_admin, scope):
+                origem = "admin"
+        if origem is None:
+            await self.app(scope, receive, send)
+            return
+
+        perfil = Perfil(origem)
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                mensagem["headers"] = [*mensagem.get("headers", ()), (b"x-perfil-id", perfil.id.encode())]
+            await send(mensagem)
+
+        token = _perfil_atual.set(perfil)
+        perfilador.iniciar(perfil)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            perfil.duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+            rota = scope.get("route")
+            perfil.rota = f'{scope["method"]} {rota.path if rota is not None else scope["path"]}'
+            perfilador.finalizar(perfil)
+            _perfil_atual.reset(token)
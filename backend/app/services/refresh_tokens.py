@@ -0,0 +1,143 @@
+"""
+Refresh tokens rotativos para renovar o acesso sem repetir o login com senha.
+
+O login (usuários e clientes) devolve, além do token de acesso, um refresh
+token opaco. POST /api/auth/refresh troca o refresh token por um novo par
+(token de acesso + novo refresh token) sem verificar a senha — o bcrypt é a
+operação mais cara da API. Cada refresh token vale uma única vez:
+
+- no banco fica só o HMAC-SHA256 do token (chave SECRET_KEY), rápido de
+  calcular e inútil para quem ler a tabela;
+- tokens da mesma cadeia de rotações formam uma "família"; apresentar de novo
+  um token já usado indica roubo, e a família inteira é revogada;
+- logout revoga a família; para usuários, uma alteração que incrementa o
+  token_versao (desativação, nível, senha) também invalida a família na
+  próxima renovação.
+
+Contadores em /metrics: logins com senha, renovações (cada uma é um login
+bcrypt evitado) e reusos detectados.
+"""
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.clientes import Cliente
+from app.models.refresh_token import RefreshToken
+from app.models.usuario import Usuario
+from app.services.auth import claims_usuario
+from app.utils.metricas import registro
+from app.utils.security import create_access_token, hash_segredo
+
+logger = logging.getLogger(__name__)
+
+METRICA_LOGINS = "synchrogest_auth_logins_total"
+METRICA_RENOVACOES = "synchrogest_auth_renovacoes_total"
+METRICA_REUSOS = "synchrogest_auth_refresh_reusos_total"
+
+registro.registrar_contador(METRICA_LOGINS, "Logins com verificação de senha (bcrypt) por tipo de titular")
+registro.registrar_contador(
+    METRICA_RENOVACOES,
+    "Acessos renovados com refresh token, sem senha; cada um é um login bcrypt evitado "
+    "(logins por hora economizados: increase(...[1h]))",
+)
+registro.registrar_contador(METRICA_REUSOS, "Refresh tokens reapresentados após o uso (família revogada)")
+
+
+def _credenciais_invalidas() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token inválido ou expirado",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def registrar_login(tipo: str):
+    registro.incrementar(METRICA_LOGINS, tipo=tipo)
+
+
+def emitir(db: Session, tipo: str, titular_id: int, versao: int = 0, familia: Optional[str] = None) -> str:
+    """
+    Cria um refresh token (nova família se `familia` não for informada) e o grava com commit
+    """
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        token_hash=hash_segredo(token),
+        familia=familia or uuid.uuid4().hex,
+        tipo=tipo,
+        titular_id=titular_id,
+        versao=versao,
+        expira_em=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    db.commit()
+    return token
+
+
+def _revogar_familia(db: Session, familia: str):
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.familia == familia, RefreshToken.revogado_em.is_(None))
+        .values(revogado_em=datetime.utcnow())
+    )
+    db.commit()
+
+
+def renovar(db: Session, token: str) -> dict:
+    """
+    Troca um refresh token válido por um novo token de acesso e um novo refresh token
+    """
+    atual = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_segredo(token)).first()
+    agora = datetime.utcnow()
+    if atual is None or atual.revogado_em is not None or atual.expira_em <= agora:
+        raise _credenciais_invalidas()
+
+    # Marca o uso de forma atômica: de duas renovações simultâneas, só uma vence
+    marcado = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == atual.id, RefreshToken.usado_em.is_(None))
+        .values(usado_em=agora)
+    ).rowcount
+    if not marcado:
+        db.rollback()
+        _revogar_familia(db, atual.familia)
+        registro.incrementar(METRICA_REUSOS, tipo=atual.tipo)
+        logger.warning(
+            "Refresh token reutilizado; família revogada",
+            extra={"tipo": atual.tipo, "titular_id": atual.titular_id},
+        )
+        raise _credenciais_invalidas()
+
+    if atual.tipo == "usuario":
+        usuario = db.get(Usuario, atual.titular_id)
+        if usuario is None or not usuario.ativo or (usuario.token_versao or 0) != atual.versao:
+            db.rollback()
+            _revogar_familia(db, atual.familia)
+            raise _credenciais_invalidas()
+        versao = usuario.token_versao or 0
+        access_token = create_access_token(data=claims_usuario(usuario))
+    else:
+        if db.get(Cliente, atual.titular_id) is None:
+            db.rollback()
+            _revogar_familia(db, atual.familia)
+            raise _credenciais_invalidas()
+        versao = 0
+        access_token = create_access_token(data={"sub": str(atual.titular_id), "tipo": "cliente"})
+
+    novo = emitir(db, atual.tipo, atual.titular_id, versao, familia=atual.familia)
+    registro.incrementar(METRICA_RENOVACOES, tipo=atual.tipo)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": novo}
+
+
+def revogar(db: Session, token: str):
+    """
+    Logout: revoga a família do refresh token (tokens desconhecidos são ignorados)
+    """
+    atual = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_segredo(token)).first()
+    if atual is not None:
+        _revogar_familia(db, atual.familia)
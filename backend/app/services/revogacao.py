@@ -0,0 +1,173 @@
+"""
+Revogação dos tokens de acesso por versão do usuário.
+
+Os tokens levam o nível de acesso e o estado do usuário nas claims, e
+get_current_user os autoriza sem consultar o banco. Para que uma desativação,
+troca de nível ou de senha tenha efeito antes de o token expirar, cada usuário
+tem um token_versao: a alteração de qualquer um desses campos incrementa a
+versão (evento before_update abaixo) e tokens emitidos com versão menor passam
+a ser recusados.
+
+As versões ficam em memória (só usuários com versão > 0), carregadas na
+inicialização e mantidas atualizadas por:
+
+- as versões incrementadas por este processo, aplicadas logo após o commit;
+- uma verificação periódica a cada REVOGACAO_INTERVALO_VERIFICACAO segundos,
+  que traz as alterações feitas por outros processos.
+
+Enquanto as versões não estão carregadas, get_current_user volta a consultar o banco.
+
+No modo multiloja as versões ficam separadas por loja, carregadas no primeiro
+uso de cada uma e descartadas quando o engine da loja sai do LRU (ver
+app.database.RoteadorEngines).
+"""
+import logging
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from app.config import settings
+from app.database import engine_da_loja, roteador
+from app.models.usuario import Usuario
+from app.utils.contexto import loja_atual
+
+logger = logging.getLogger(__name__)
+
+# Campos cuja alteração invalida os tokens já emitidos
+CAMPOS_REVOGACAO = ("nivel_acesso", "ativo", "senha_hash")
+
+
+@event.listens_for(Usuario, "before_update")
+def _incrementar_versao(mapper, connection, usuario):
+    estado = inspect(usuario)
+    if any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_REVOGACAO):
+        usuario.token_versao = (usuario.token_versao or 0) + 1
+        object_session(usuario).info.setdefault("versoes_token", {})[usuario.id] = usuario.token_versao
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_versoes(session):
+    versoes = session.info.pop("versoes_token", None)
+    if versoes:
+        revogacao.registrar(versoes, session.info.get("loja"))
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_versoes(session):
+    session.info.pop("versoes_token", None)
+
+
+class RegistroRevogacao:
+    def __init__(self):
+        # loja -> {usuario_id: versão}; None é o banco padrão
+        self._versoes: Dict[Optional[str], Dict[int, int]] = {}
+        # Serializa as trocas (commits, carga periódica e descarte do LRU)
+        self._lock = threading.Lock()
+        self._ativo = False
+        self._evento = threading.Event()
+        self._parar = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def disponivel(self) -> bool:
+        """
+        True se as versões da loja atual estão em memória (carrega no primeiro uso)
+        """
+        loja = loja_atual.get()
+        if loja not in self._versoes and self._ativo:
+            try:
+                self.carregar(loja)
+            except Exception:
+                logger.exception("Falha ao carregar as versões de token", extra={"loja": loja})
+        return loja in self._versoes
+
+    def revogado(self, usuario_id: int, versao: int) -> bool:
+        """
+        True se o token foi emitido antes da última alteração do usuário
+        """
+        return versao < self._versoes.get(loja_atual.get(), {}).get(usuario_id, 0)
+
+    # ----------------------------
+    # CARGA E ATUALIZAÇÃO
+    # ----------------------------
+    def carregar(self, loja: Optional[str] = None):
+        with engine_da_loja(loja).connect() as conexao:
+            linhas = conexao.execute(
+                select(Usuario.id, Usuario.token_versao).where(Usuario.token_versao > 0)
+            ).all()
+        self._aplicar(loja, dict(linhas), carga=True)
+
+    def registrar(self, versoes: Dict[int, int], loja: Optional[str] = None):
+        """
+        Aplica versões já gravadas no banco. As versões só crescem: uma carga
+        lida antes de um commit deste processo não desfaz a versão nova.
+        """
+        # Loja ainda não carregada: a carga vai ler as versões do banco
+        self._aplicar(loja, versoes, carga=False)
+
+    def _aplicar(self, loja: Optional[str], versoes: Dict[int, int], carga: bool):
+        with self._lock:
+            if loja not in self._versoes and not carga:
+                return
+            # Troca os dicts inteiros: leituras concorrentes veem o antigo ou o novo
+            atuais = dict(self._versoes.get(loja, {}))
+            for usuario_id, versao in versoes.items():
+                atuais[usuario_id] = max(versao, atuais.get(usuario_id, 0))
+            lojas = dict(self._versoes)
+            lojas[loja] = atuais
+            self._versoes = lojas
+
+    def descartar(self, loja: Optional[str]):
+        """
+        Libera as versões de uma loja (recarregadas no próximo uso)
+        """
+        with self._lock:
+            lojas = dict(self._versoes)
+            lojas.pop(loja, None)
+            self._versoes = lojas
+
+    # ----------------------------
+    # CICLO DE VIDA
+    # ----------------------------
+    def _executar(self):
+        while True:
+            self._evento.wait(settings.REVOGACAO_INTERVALO_VERIFICACAO)
+            self._evento.clear()
+            if self._parar:
+                return
+            for loja in list(self._versoes):
+                try:
+                    self.carregar(loja)
+                except Exception:
+                    # Sem as versões atuais, a autorização volta a consultar o banco
+                    self.descartar(loja)
+                    logger.exception("Falha ao carregar as versões de token", extra={"loja": loja})
+
+    def iniciar(self):
+        """
+        Carrega as versões e inicia a verificação periódica em segundo plano
+        (no modo multiloja, as de cada loja são carregadas no primeiro uso)
+        """
+        if not settings.MULTILOJA_ATIVO:
+            try:
+                self.carregar()
+            except Exception:
+                logger.exception("Falha ao carregar as versões de token")
+        self._ativo = True
+        self._parar = False
+        self._thread = threading.Thread(target=self._executar, name="revogacao-tokens", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar = True
+        self._evento.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._ativo = False
+        self._versoes = {}
+
+
+revogacao = RegistroRevogacao()
+roteador.ao_descartar(revogacao.descartar)
@@ -0,0 +1,155 @@
+"""
+Contagem de comandos SQL por requisição e detecção de N+1.
+
+Os eventos do engine somam, nas estatísticas da requisição atual (ContextVar),
+o número de comandos, o tempo no banco e quantas vezes cada comando foi
+executado. Ao final da requisição, comandos idênticos repetidos pelo menos
+CONSULTAS_LIMITE_REPETICAO vezes geram um aviso "possível N+1" no log; em modo
+DEBUG a resposta também leva o cabeçalho Server-Timing.
+
+Para fixar orçamentos de consultas nos testes:
+
+    with assert_max_queries(3):
+        client.get("/api/compras/")
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo do SQL copiado para logs e mensagens
+TAMANHO_MAXIMO_SQL = 300
+
+
+class EstatisticasConsultas:
+    __slots__ = ("total", "tempo", "por_comando")
+
+    def __init__(self):
+        self.total = 0
+        self.tempo = 0.0
+        self.por_comando: Dict[str, int] = {}
+
+    def registrar(self, comando: str, duracao: float):
+        self.total += 1
+        self.tempo += duracao
+        self.por_comando[comando] = self.por_comando.get(comando, 0) + 1
+
+    def repetidas(self, minimo: int) -> List[Tuple[str, int]]:
+        """
+        Comandos executados pelo menos `minimo` vezes, do mais repetido para o menos
+        """
+        return sorted(
+            ((comando, vezes) for comando, vezes in self.por_comando.items() if vezes >= minimo),
+            key=lambda item: -item[1],
+        )
+
+
+_estatisticas: ContextVar[Optional[EstatisticasConsultas]] = ContextVar("estatisticas_consultas", default=None)
+
+
+def estatisticas_atuais() -> Optional[EstatisticasConsultas]:
+    return _estatisticas.get()
+
+
+@contextmanager
+def contar_consultas(novas: bool = False):
+    """
+    Abre as estatísticas de consultas do contexto atual. Sem `novas`, reaproveita
+    as que já estiverem abertas (ex.: por outro middleware da mesma requisição).
+    """
+    atuais = _estatisticas.get()
+    if atuais is not None and not novas:
+        yield atuais
+        return
+    estatisticas = EstatisticasConsultas()
+    token = _estatisticas.set(estatisticas)
+    try:
+        yield estatisticas
+    finally:
+        _estatisticas.reset(token)
+
+
+def _resumir(comando: str) -> str:
+    comando = " ".join(comando.split())
+    return comando if len(comando) <= TAMANHO_MAXIMO_SQL else comando[:TAMANHO_MAXIMO_SQL] + "..."
+
+
+@contextmanager
+def assert_max_queries(maximo: int):
+    """
+    Falha (AssertionError) se o bloco executar mais de `maximo` comandos SQL.
+    Para uso nos testes; as consultas do bloco não entram nas estatísticas da
+    requisição externa.
+    """
+    with contar_consultas(novas=True) as estatisticas:
+        yield estatisticas
+    if estatisticas.total > maximo:
+        detalhes = "\n".join(
+            f"  {vezes}x {_resumir(comando)}" for comando, vezes in estatisticas.repetidas(1)
+        )
+        raise AssertionError(f"{estatisticas.total} consultas executadas (máximo {maximo}):\n{detalhes}")
+
+
+def instrumentar_engine(engine):
+    """
+    Registra os eventos que alimentam as estatísticas da requisição atual
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info["consulta_inicio"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        estatisticas = _estatisticas.get()
+        if estatisticas is not None:
+            inicio = conn.info.pop("consulta_inicio", None)
+            estatisticas.registrar(statement, time.perf_counter() - inicio if inicio else 0.0)
+
+
+class ConsultasMiddleware:
+    """
+    Middleware ASGI que avisa sobre comandos repetidos (N+1) e, em modo DEBUG,
+    adiciona o cabeçalho Server-Timing com o número de consultas e o tempo no banco
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with contar_consultas() as estatisticas:
+            total_inicial, tempo_inicial = estatisticas.total, estatisticas.tempo
+            inicio = time.perf_counter()
+
+            async def enviar(mensagem):
+                if settings.DEBUG and mensagem["type"] == "http.response.start":
+                    tempo_banco = (estatisticas.tempo - tempo_inicial) * 1000
+                    tempo_app = (time.perf_counter() - inicio) * 1000
+                    consultas = estatisticas.total - total_inicial
+                    valor = f'db;dur={tempo_banco:.2f};desc="{consultas} consultas", app;dur={tempo_app:.2f}'
+                    mensagem["headers"] = [*mensagem.get("headers", ()), (b"server-timing", valor.encode())]
+                await send(mensagem)
+
+            await self.app(scope, receive, enviar)
+
+            repetidas = estatisticas.repetidas(settings.CONSULTAS_LIMITE_REPETICAO)
+            if repetidas:
+                rota = scope.get("route")
+                logger.warning(
+                    "Possível N+1 em %s %s", scope["method"], rota.path if rota is not None else scope["path"],
+                    extra={
+                        "consultas": estatisticas.total - total_inicial,
+                        "repetidas": [{"sql": _resumir(comando), "vezes": vezes} for comando, vezes in repetidas],
+                    },
+                )
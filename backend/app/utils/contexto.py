@@ -0,0 +1,87 @@
+"""
+Contexto da requisição atual, acessível fora das rotas (eventos do SQLAlchemy,
+serviços em segundo plano, logs etc.) por meio de contextvars.
+"""
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+ip_cliente: ContextVar[Optional[str]] = ContextVar("ip_cliente", default=None)
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+escopo_requisicao: ContextVar[Optional[dict]] = ContextVar("escopo_requisicao", default=None)
+# Loja da requisição no modo multiloja (ver app.services.lojas); None = banco padrão
+loja_atual: ContextVar[Optional[str]] = ContextVar("loja_atual", default=None)
+
+logger_acesso = logging.getLogger("app.acesso")
+
+# Tamanho máximo aceito para um X-Request-ID enviado pelo cliente
+TAMANHO_MAXIMO_REQUEST_ID = 64
+
+
+def _request_id_recebido(scope) -> Optional[str]:
+    for nome, valor in scope.get("headers", ()):
+        if nome == b"x-request-id":
+            valor = valor.decode("latin-1").strip()
+            if 0 < len(valor) <= TAMANHO_MAXIMO_REQUEST_ID:
+                return valor
+    return None
+
+
+def rota_atual() -> Optional[str]:
+    """
+    "MÉTODO template" da rota da requisição atual (ou o caminho, antes do roteamento)
+    """
+    escopo = escopo_requisicao.get()
+    if escopo is None:
+        return None
+    rota = escopo.get("route")
+    return f'{escopo["method"]} {rota.path if rota is not None else escopo["path"]}'
+
+
+class ContextoRequisicaoMiddleware:
+    """
+    Middleware ASGI que preenche as variáveis de contexto de cada requisição,
+    devolve o X-Request-ID e registra uma linha de acesso com a duração
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cliente = scope.get("client")
+        identificador = _request_id_recebido(scope) or uuid.uuid4().hex
+        token_ip = ip_cliente.set(cliente[0] if cliente else None)
+        token_id = request_id.set(identificador)
+        token_escopo = escopo_requisicao.set(scope)
+        status_resposta = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            nonlocal status_resposta
+            if mensagem["type"] == "http.response.start":
+                status_resposta = mensagem["status"]
+                mensagem["headers"] = [*mensagem.get("headers", ()), (b"x-request-id", identificador.encode("latin-1"))]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            if logger_acesso.isEnabledFor(logging.INFO):
+                logger_acesso.info(
+                    "%s %s %d", scope["method"], scope["path"], status_resposta,
+                    extra={
+                        "metodo": scope["method"],
+                        "caminho": scope["path"],
+                        "status": status_resposta,
+                        "duracao_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                    },
+                )
+            escopo_requisicao.reset(token_escopo)
+            request_id.reset(token_id)
+            ip_cliente.reset(token_ip)
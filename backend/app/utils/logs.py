@@ -0,0 +1,123 @@
+"""
+Configuração dos logs da aplicação: linhas JSON gravadas por uma thread própria.
+
+As threads das requisições só colocam o registro em uma fila (QueueHandler); a
+formatação e a escrita no stdout ficam com o QueueListener. Cada linha leva o
+request_id da requisição atual (app.utils.contexto) e os campos passados em
+extra={...}. Os níveis vêm de LOG_NIVEL (global) e LOG_NIVEIS (por módulo).
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.config import settings
+from app.utils.contexto import request_id
+
+# Atributos que todo LogRecord possui; o restante veio de extra={...}
+_ATRIBUTOS_PADRAO = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+
+class FormatadorJson(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            "data_hora": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            dados["request_id"] = record.request_id
+        for chave, valor in record.__dict__.items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                dados[chave] = valor
+        if record.exc_text:
+            dados["excecao"] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class _FiltroContexto(logging.Filter):
+    """
+    Copia o request_id para o registro ainda na thread da requisição
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve a mensagem e o traceback antes de enfileirar, mas deixa a
+        # formatação JSON para a thread do listener
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+def _niveis_por_modulo(texto: str) -> dict:
+    """
+    "app.services.auth=DEBUG,sqlalchemy.engine=WARNING" -> {modulo: nivel}
+    """
+    niveis = {}
+    for item in texto.split(","):
+        modulo, _, nivel = item.partition("=")
+        if modulo.strip() and nivel.strip():
+            niveis[modulo.strip()] = nivel.strip().upper()
+    return niveis
+
+
+def configurar_logs():
+    """
+    Configura o logger raiz uma única vez (chamadas repetidas são ignoradas)
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    saida = logging.StreamHandler(sys.stdout)
+    saida.setFormatter(FormatadorJson())
+    fila = queue.SimpleQueue()
+    handler = _QueueHandler(fila)
+    handler.addFilter(_FiltroContexto())
+
+    raiz = logging.getLogger()
+    raiz.handlers = [handler]
+    raiz.setLevel(settings.LOG_NIVEL.upper())
+    for modulo, nivel in _niveis_por_modulo(settings.LOG_NIVEIS).items():
+        logging.getLogger(modulo).setLevel(nivel)
+
+    _listener = QueueListener(fila, saida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(parar_logs)
+
+
+def parar_logs():
+    """
+    Grava o que resta na fila e encerra a thread de escrita
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def debug_amostrado(logger: logging.Logger, mensagem: str, **campos):
+    """
+    Log de depuração para caminhos quentes: só é emitido se o nível DEBUG
+    estiver ativo para o logger e, mesmo assim, para uma fração
+    LOG_AMOSTRAGEM_DEBUG das chamadas
+    """
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < settings.LOG_AMOSTRAGEM_DEBUG:
+        logger.debug(mensagem, extra=campos)
@@ -0,0 +1,209 @@
+"""
+Métricas HTTP por rota no formato texto do Prometheus (GET /metrics).
+
+Para cada template de rota (ex.: /api/produtos/{produto_id}) são registrados
+um histograma de latência, um histograma do tempo gasto no banco e contadores
+por status; há também um gauge de requisições em andamento por método (o
+template da rota só é conhecido depois do roteamento).
+
+O tempo de banco vem das estatísticas de consultas da requisição
+(app.utils.consultas). Cada thread grava em seus próprios acumuladores, sem locks no caminho da
+requisição; a leitura em /metrics soma os acumuladores de todas as threads.
+Os valores são por processo: com vários workers, cada um expõe os seus.
+
+Outros módulos podem expor contadores próprios com registrar_contador() e
+incrementar() (ex.: renovações de token em app.services.refresh_tokens).
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from app.utils.consultas import contar_consultas
+
+# Limites dos buckets em segundos
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rótulo das requisições que não casaram com nenhuma rota (evita um rótulo por URL)
+SEM_ROTA = "<sem_rota>"
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Histograma:
+    __slots__ = ("contagens", "soma")
+
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS) + 1)
+        self.soma = 0.0
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(BUCKETS, valor)] += 1
+        self.soma += valor
+
+
+class _Acumulador:
+    """
+    Métricas gravadas por uma única thread
+    """
+
+    def __init__(self):
+        self.duracao: Dict[Tuple[str, str], _Histograma] = {}
+        self.banco: Dict[Tuple[str, str], _Histograma] = {}
+        self.status: Dict[Tuple[str, str, int], int] = {}
+        self.em_andamento: Dict[str, int] = {}
+        self.contadores: Dict[Tuple[str, Tuple], int] = {}
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._local = threading.local()
+        self._acumuladores: List[_Acumulador] = []
+        self._lock = threading.Lock()
+        self._contadores: Dict[str, str] = {}
+
+    def _acumulador(self) -> _Acumulador:
+        acumulador = getattr(self._local, "acumulador", None)
+        if acumulador is None:
+            acumulador = self._local.acumulador = _Acumulador()
+            # Só na primeira métrica de cada thread
+            with self._lock:
+                self._acumuladores.append(acumulador)
+        return acumulador
+
+    def inicio(self, metodo: str):
+        em_andamento = self._acumulador().em_andamento
+        em_andamento[metodo] = em_andamento.get(metodo, 0) + 1
+
+    def fim(self, metodo: str, rota: str, status: int, duracao: float, tempo_banco: float):
+        acumulador = self._acumulador()
+        acumulador.em_andamento[metodo] -= 1
+        chave = (metodo, rota)
+        histograma = acumulador.duracao.get(chave)
+        if histograma is None:
+            histograma = acumulador.duracao[chave] = _Histograma()
+            acumulador.banco[chave] = _Histograma()
+        histograma.observar(duracao)
+        acumulador.banco[chave].observar(tempo_banco)
+        chave_status = (metodo, rota, status)
+        acumulador.status[chave_status] = acumulador.status.get(chave_status, 0) + 1
+
+    def registrar_contador(self, nome: str, ajuda: str):
+        """
+        Declara um contador exposto em /metrics (mesmo antes do primeiro incremento)
+        """
+        self._contadores[nome] = ajuda
+
+    def incrementar(self, nome: str, valor: int = 1, **rotulos):
+        contadores = self._acumulador().contadores
+        chave = (nome, tuple(sorted(rotulos.items())))
+        contadores[chave] = contadores.get(chave, 0) + valor
+
+    # ----------------------------
+    # EXPOSIÇÃO (formato texto do Prometheus)
+    # ----------------------------
+    @staticmethod
+    def _somar_histogramas(destino: Dict, origem: Dict):
+        for chave, histograma in list(origem.items()):
+            total = destino.setdefault(chave, _Histograma())
+            for i, contagem in enumerate(histograma.contagens):
+                total.contagens[i] += contagem
+            total.soma += histograma.soma
+
+    @staticmethod
+    def _rotulos(**rotulos) -> str:
+        texto = ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in rotulos.items())
+        return "{" + texto + "}"
+
+    def _linhas_histograma(self, nome: str, ajuda: str, histogramas: Dict) -> List[str]:
+        linhas = [f"# HELP {nome} {ajuda}", f"# TYPE {nome} histogram"]
+        for (metodo, rota), histograma in sorted(histogramas.items()):
+            acumulado = 0
+            for limite, contagem in zip((*BUCKETS, "+Inf"), histograma.contagens):
+                acumulado += contagem
+                linhas.append(f"{nome}_bucket{self._rotulos(metodo=metodo, rota=rota, le=limite)} {acumulado}")
+            linhas.append(f"{nome}_sum{self._rotulos(metodo=metodo, rota=rota)} {histograma.soma}")
+            linhas.append(f"{nome}_count{self._rotulos(metodo=metodo, rota=rota)} {acumulado}")
+        return linhas
+
+    def exportar(self) -> str:
+        duracao, banco, status, em_andamento, contadores = {}, {}, {}, {}, {}
+        with self._lock:
+            acumuladores = list(self._acumuladores)
+        for acumulador in acumuladores:
+            self._somar_histogramas(duracao, acumulador.duracao)
+            self._somar_histogramas(banco, acumulador.banco)
+            for chave, total in list(acumulador.status.items()):
+                status[chave] = status.get(chave, 0) + total
+            for metodo, total in list(acumulador.em_andamento.items()):
+                em_andamento[metodo] = em_andamento.get(metodo, 0) + total
+            for chave, total in list(acumulador.contadores.items()):
+                contadores[chave] = contadores.get(chave, 0) + total
+
+        linhas = self._linhas_histograma(
+            "synchrogest_http_duracao_segundos", "Duração das requisições HTTP por rota", duracao
+        )
+        linhas += self._linhas_histograma(
+            "synchrogest_http_banco_segundos", "Tempo gasto no banco de dados por requisição", banco
+        )
+        linhas += [
+            "# HELP synchrogest_http_requisicoes_total Requisições HTTP por rota e status",
+            "# TYPE synchrogest_http_requisicoes_total counter",
+        ]
+        for (metodo, rota, codigo), total in sorted(status.items()):
+            linhas.append(f"synchrogest_http_requisicoes_total{self._rotulos(metodo=metodo, rota=rota, status=codigo)} {total}")
+        linhas += [
+            "# HELP synchrogest_http_requisicoes_em_andamento Requisições HTTP em andamento",
+            "# TYPE synchrogest_http_requisicoes_em_andamento gauge",
+        ]
+        for metodo, total in sorted(em_andamento.items()):
+            linhas.append(f"synchrogest_http_requisicoes_em_andamento{self._rotulos(metodo=metodo)} {total}")
+        for nome, ajuda in sorted(self._contadores.items()):
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} counter"]
+            for (nome_contador, rotulos), total in sorted(contadores.items()):
+                if nome_contador == nome:
+                    linhas.append(f"{nome}{self._rotulos(**dict(rotulos)) if rotulos else ''} {total}")
+        return "\n".join(linhas) + "\n"
+
+
+registro = RegistroMetricas()
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que mede cada requisição HTTP e a agrega pelo template da rota
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        status_resposta = 500
+
+        async def enviar(mensagem):
+            nonlocal status_resposta
+            if mensagem["type"] == "http.response.start":
+                status_resposta = mensagem["status"]
+            await send(mensagem)
+
+        registro.inicio(metodo)
+        with contar_consultas() as estatisticas:
+            tempo_banco_inicial = estatisticas.tempo
+            inicio = time.perf_counter()
+            try:
+                await self.app(scope, receive, enviar)
+            finally:
+                duracao = time.perf_counter() - inicio
+                # O roteador do Starlette grava a rota encontrada no próprio scope
+                rota = scope.get("route")
+                registro.fim(
+                    metodo, rota.path if rota is not None else SEM_ROTA, status_resposta, duracao,
+                    estatisticas.tempo - tempo_banco_inicial,
+                )
+
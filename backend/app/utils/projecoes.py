@@ -0,0 +1,87 @@
+"""
+Projeções (sparse fieldsets) para as rotas de listagem.
+
+Permite que o cliente peça apenas algumas colunas (?fields=id,nome) ou uma
+projeção nomeada (?view=picker). Somente as colunas pedidas são selecionadas
+no SQL e a resposta é serializada com um schema reduzido, derivado do schema
+completo para manter os mesmos tipos e formatos.
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+
+def resolver_campos(
+    schema: Type[BaseModel],
+    model,
+    fields: Optional[str],
+    view: Optional[str],
+    projecoes: Dict[str, Tuple[str, ...]],
+) -> Optional[Tuple[str, ...]]:
+    """
+    Retorna as colunas pedidas (sempre incluindo id), ou None para a resposta completa
+    """
+    if view is not None:
+        if view not in projecoes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Projeção inválida. Opções: {', '.join(projecoes)}"
+            )
+        campos = projecoes[view]
+    elif fields:
+        campos = tuple(c.strip() for c in fields.split(",") if c.strip())
+    else:
+        return None
+
+    invalidos = [c for c in campos if c not in schema.model_fields or not hasattr(model, c)]
+    if invalidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campo(s) inválido(s): {', '.join(invalidos)}"
+        )
+    return tuple(dict.fromkeys(("id",) + campos))
+
+
+def colunas(model, campos: Sequence[str]) -> list:
+    """
+    Colunas do modelo SQLAlchemy correspondentes aos campos
+    """
+    return [getattr(model, campo) for campo in campos]
+
+
+@lru_cache(maxsize=128)
+def _adaptador(schema: Type[BaseModel], campos: Tuple[str, ...]) -> TypeAdapter:
+    definicoes = {
+        campo: (schema.model_fields[campo].annotation, schema.model_fields[campo])
+        for campo in campos
+    }
+    parcial = create_model(
+        f"{schema.__name__}Parcial",
+        __config__=ConfigDict(from_attributes=True),
+        **definicoes,
+    )
+    return TypeAdapter(List[parcial])
+
+
+@lru_cache(maxsize=32)
+def _adaptador_completo(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def serializar(schema: Type[BaseModel], campos: Optional[Tuple[str, ...]], linhas) -> bytes:
+    """
+    JSON das linhas com o schema reduzido aos campos pedidos (ou o schema
+    completo, com campos None), igual ao que a rota devolveria
+    """
+    adaptador = _adaptador(schema, campos) if campos else _adaptador_completo(schema)
+    return adaptador.dump_json(adaptador.validate_python(linhas, from_attributes=True))
+
+
+def resposta_parcial(schema: Type[BaseModel], campos: Tuple[str, ...], linhas) -> Response:
+    """
+    Serializa as linhas com o schema reduzido aos campos pedidos
+    """
+    return Response(content=serializar(schema, campos, linhas), media_type="application/json")
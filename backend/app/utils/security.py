@@ -1,8 +1,11 @@
+import hashlib
+import hmac
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
 from app.config import settings
+from app.utils.contexto import loja_atual
 
 # Configuração do contexto de criptografia para senhas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -19,6 +22,13 @@ def get_password_hash(password):
     """
     return pwd_context.hash(password[:72])
 
+def hash_segredo(valor: str) -> str:
+    """
+    HMAC-SHA256 (chave SECRET_KEY) de um segredo aleatório (refresh tokens,
+    chaves de API): rápido de calcular e inútil para quem ler o banco
+    """
+    return hmac.new(settings.SECRET_KEY.encode(), valor.encode(), hashlib.sha256).hexdigest()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     Cria um token JWT com os dados fornecidos e tempo de expiração
@@ -31,6 +41,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
+    # Multiloja: o token só vale na loja em que foi emitido
+    loja = loja_atual.get()
+    if loja is not None:
+        to_encode["loja"] = loja
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     
     return encoded_jwt
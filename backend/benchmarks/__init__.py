@@ -0,0 +1 @@
+# Benchmarks de ponta a ponta (ver executar.py)
@@ -0,0 +1,55 @@
+"""
+Compara dois resultados de benchmarks/executar.py, cenário a cenário.
+
+Uso: python -m benchmarks.comparar resultados/base.json resultados/atual.json [--tolerancia 10]
+
+Termina com código 1 se algum p95 piorar mais que a tolerância (em %).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICAS = ("vazao_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _variacao(antes: float, depois: float) -> float:
+    if not antes:
+        return 0.0
+    return (depois - antes) * 100 / antes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("atual")
+    parser.add_argument("--tolerancia", type=float, default=10.0, help="Piora máxima aceita no p95, em %%")
+    args = parser.parse_args()
+
+    base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    atual = json.loads(Path(args.atual).read_text(encoding="utf-8"))
+    print(f"base: {base.get('commit')} ({base.get('data_hora')})   atual: {atual.get('commit')} ({atual.get('data_hora')})")
+    if base.get("volumes") != atual.get("volumes") or base.get("parametros") != atual.get("parametros"):
+        print("Aviso: volumes ou parâmetros diferentes entre as execuções")
+
+    print(f"{'cenário':<26}" + "".join(f"{metrica:>25}" for metrica in METRICAS))
+    regressoes = []
+    for nome, depois in atual["cenarios"].items():
+        antes = base["cenarios"].get(nome)
+        if antes is None:
+            print(f"{nome:<26} (novo)")
+            continue
+        colunas = "".join(
+            f"{antes[m]:>9.1f} → {depois[m]:>7.1f} {_variacao(antes[m], depois[m]):>+4.0f}%" for m in METRICAS
+        )
+        print(f"{nome:<26}{colunas}")
+        if _variacao(antes["p95_ms"], depois["p95_ms"]) > args.tolerancia:
+            regressoes.append(nome)
+
+    if regressoes:
+        print(f"\nRegressão de p95 acima de {args.tolerancia:.0f}%: {', '.join(regressoes)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Edições concorrentes do mesmo produto, cliente e pagamento.
+
+Várias threads editam o mesmo registro pela API ao mesmo tempo, cada edição
+um ciclo de leitura e gravação: GET (valor e ETag), soma 1 a um campo
+numérico e PUT com If-Match. Em 412 (outra edição gravou antes) a thread lê
+de novo e tenta outra vez. No fim confere que nenhuma edição se perdeu:
+valor final = valor inicial + edições aceitas, e versão = 1 + edições aceitas.
+
+Com --sem-if-match as edições vão sem If-Match (telas antigas) e as perdas,
+que o controle de versão não tem como evitar sem o ETag da leitura, aparecem
+na coluna "perdidas".
+
+Termina com código 1 se alguma edição com If-Match se perdeu.
+
+Uso:
+    python -m benchmarks.edicao_concorrente
+    python -m benchmarks.edicao_concorrente --threads 16 --edicoes 50 --sem-if-match
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+# Adicionar o diretório raiz ao path para importações
+sys.path.append(str(Path(__file__).parent.parent))
+
+EMAIL_ADMIN = "admin@edicao.com.br"
+SENHA = "edicao123"
+
+
+def preparar() -> Dict[str, int]:
+    from app.database import SessionLocal
+    from app.models.categoria import Categoria
+    from app.models.clientes import Cliente
+    from app.models.compra_clientes import CompraCliente
+    from app.models.pagamentos import Pagamento
+    from app.models.produto import Produto
+    from app.models.usuario import Usuario
+    from app.utils.security import get_password_hash
+
+    db = SessionLocal()
+    db.add(Usuario(nome="Admin", email=EMAIL_ADMIN, senha_hash=get_password_hash(SENHA), nivel_acesso="admin", ativo=True))
+    categoria = Categoria(nome="Edição concorrente")
+    cliente = Cliente(nome="Cliente", email="cliente@edicao.com.br", senha_hash=get_password_hash(SENHA), telefone="0")
+    db.add_all([categoria, cliente])
+    db.flush()
+    produto = Produto(nome="Produto", codigo_sku="EDICAO", categoria_id=categoria.id, unidade_medida="un",
+                      preco_custo=1, preco_venda=0, quantidade=0)
+    compra = CompraCliente(cliente_id=cliente.id, valor_total=0)
+    db.add_all([produto, compra])
+    db.flush()
+    pagamento = Pagamento(compra_id=compra.id, cliente_id=cliente.id, metodo="pix", valor=0)
+    db.add(pagamento)
+    db.commit()
+    ids = {"produto": produto.id, "cliente": cliente.id, "pagamento": pagamento.id}
+    db.close()
+    return ids
+
+
+# Recurso: caminho, campo somado a cada edição e corpo do PUT a partir do JSON lido
+RECURSOS: Dict[str, tuple] = {
+    "produto": ("/api/produtos/{id}", "preco_venda", lambda dados: {"preco_venda": float(dados["preco_venda"]) + 1}),
+    "cliente": ("/api/clientes/{id}", "telefone", lambda dados: {"telefone": str(int(dados["telefone"]) + 1)}),
+    "pagamento": (
+        "/api/pagamentos/{id}", "valor",
+        lambda dados: {**{campo: dados[campo] for campo in ("compra_id", "cliente_id", "metodo")}, "valor": dados["valor"] + 1},
+    ),
+}
+
+
+def editar(client, cabecalhos: Dict[str, str], caminho: str, corpo: Callable[[dict], dict],
+           threads: int, edicoes: int, usar_if_match: bool) -> Dict[str, float]:
+    aceitas = [0] * threads
+    conflitos = [0] * threads
+    falhas = [0] * threads
+
+    def trabalhar(indice: int):
+        for _ in range(edicoes):
+            while True:
+                leitura = client.get(caminho, headers=cabecalhos)
+                extras = {"If-Match": leitura.headers["etag"]} if usar_if_match else {}
+                resposta = client.put(caminho, json=corpo(leitura.json()), headers={**cabecalhos, **extras})
+                if resposta.status_code == 200:
+                    aceitas[indice] += 1
+                    break
+                if resposta.status_code == 412:
+                    conflitos[indice] += 1
+                    continue
+                falhas[indice] += 1
+                break
+
+    trabalhadores = [threading.Thread(target=trabalhar, args=(i,)) for i in range(threads)]
+    inicio = time.perf_counter()
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    decorrido = time.perf_counter() - inicio
+    return {
+        "aceitas": sum(aceitas),
+        "conflitos": sum(conflitos),
+        "falhas": sum(falhas),
+        "edicoes_s": sum(aceitas) / decorrido,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere que edições concorrentes com If-Match não se perdem")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--edicoes", type=int, default=20, help="Edições aceitas por thread e recurso")
+    parser.add_argument("--sem-if-match", action="store_true", help="Edita sem If-Match (mostra as perdas)")
+    args = parser.parse_args()
+
+    banco = f"sqlite:///{Path(tempfile.mkdtemp(prefix='edicao-')) / 'edicao.db'}"
+    # Antes de importar a aplicação: banco temporário e sem limites ou tarefas de fundo no caminho
+    os.environ.update({
+        "DATABASE_URL": banco,
+        "LOG_NIVEL": "WARNING",
+        "AUDITORIA_ATIVA": "false",
+        "LIMITE_TAXA_ATIVO": "false",
+        "CONCORRENCIA_EXIGIR_IF_MATCH": "false",
+    })
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    ids = preparar()
+    usar_if_match = not args.sem_if_match
+    print(f"{args.threads} threads, {args.edicoes} edições por thread, "
+          f"{'com' if usar_if_match else 'sem'} If-Match\n")
+    print("| recurso | aceitas | conflitos (412) | falhas | perdidas | versão | edições/s |")
+    print("|---|---|---|---|---|---|---|")
+    inconsistentes = []
+    with TestClient(app) as client:
+        token = client.post("/api/auth/login", data={"username": EMAIL_ADMIN, "password": SENHA}).json()["access_token"]
+        cabecalhos = {"Authorization": f"Bearer {token}"}
+        for nome, (modelo, campo, corpo) in RECURSOS.items():
+            caminho = modelo.format(id=ids[nome])
+            inicial = float(client.get(caminho, headers=cabecalhos).json()[campo])
+            resultado = editar(client, cabecalhos, caminho, corpo, args.threads, args.edicoes, usar_if_match)
+            final = client.get(caminho, headers=cabecalhos)
+            perdidas = resultado["aceitas"] - int(float(final.json()[campo]) - inicial)
+            versao = final.headers["etag"]
+            if perdidas or versao != f'"{1 + resultado["aceitas"]}"':
+                inconsistentes.append(nome)
+            print(
+                f'| {nome} | {resultado["aceitas"]} | {resultado["conflitos"]} | {resultado["falhas"]} '
+                f'| {perdidas} | {versao} | {resultado["edicoes_s"]:.0f} |',
+                flush=True,
+            )
+
+    if usar_if_match and inconsistentes:
+        print(f"\nEdições perdidas com If-Match: {', '.join(inconsistentes)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Importação de produtos por CSV: carga completa e reimportação parcial.
+
+Importa --produtos produtos pela API (POST /api/produtos/importar) com todas
+as colunas e depois reimporta os mesmos SKUs com um arquivo reduzido (só as
+colunas obrigatórias e um preço novo), medindo linhas/s nas duas etapas. No
+fim confere que a reimportação alterou só as colunas do arquivo: descrição,
+quantidade mínima e máxima e imagem continuam como na carga completa.
+
+Termina com código 1 se algum produto perdeu colunas ausentes do arquivo.
+
+Uso:
+    python -m benchmarks.importacao_produtos
+    python -m benchmarks.importacao_produtos --produtos 50000
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List
+
+# Adicionar o diretório raiz ao path para importações
+sys.path.append(str(Path(__file__).parent.parent))
+
+EMAIL_ADMIN = "admin@importacao.com.br"
+SENHA = "importacao123"
+
+COLUNAS_COMPLETAS = (
+    "codigo_sku", "nome", "descricao", "categoria_id", "unidade_medida", "preco_custo", "preco_venda",
+    "quantidade_minima", "quantidade_maxima", "imagem_url",
+)
+COLUNAS_REDUZIDAS = ("codigo_sku", "nome", "categoria_id", "unidade_medida", "preco_custo", "preco_venda")
+# Colunas fora do arquivo reduzido, que a reimportação não pode alterar
+COLUNAS_PRESERVADAS = ("descricao", "quantidade_minima", "quantidade_maxima", "imagem_url")
+
+
+def preparar() -> int:
+    from app.database import SessionLocal
+    from app.models.categoria import Categoria
+    from app.models.usuario import Usuario
+    from app.utils.security import get_password_hash
+
+    db = SessionLocal()
+    db.add(Usuario(nome="Admin", email=EMAIL_ADMIN, senha_hash=get_password_hash(SENHA), nivel_acesso="admin", ativo=True))
+    categoria = Categoria(nome="Importação")
+    db.add(categoria)
+    db.commit()
+    categoria_id = categoria.id
+    db.close()
+    return categoria_id
+
+
+def gerar_csv(colunas: tuple, linhas: List[Dict]) -> bytes:
+    saida = io.StringIO()
+    escritor = csv.DictWriter(saida, fieldnames=colunas, extrasaction="ignore")
+    escritor.writeheader()
+    escritor.writerows(linhas)
+    return saida.getvalue().encode()
+
+
+def importar(client, cabecalhos: Dict[str, str], conteudo: bytes) -> Dict[str, float]:
+    inicio = time.perf_counter()
+    resposta = client.post(
+        "/api/produtos/importar", files={"arquivo": ("produtos.csv", conteudo, "text/csv")}, headers=cabecalhos
+    )
+    decorrido = time.perf_counter() - inicio
+    resposta.raise_for_status()
+    resultado = resposta.json()
+    linhas = resultado["inseridos"] + resultado["atualizados"]
+    return {**resultado, "linhas_s": linhas / decorrido}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a importação de produtos e confere a reimportação parcial")
+    parser.add_argument("--produtos", type=int, default=5000)
+    args = parser.parse_args()
+
+    banco = f"sqlite:///{Path(tempfile.mkdtemp(prefix='importacao-')) / 'importacao.db'}"
+    # Antes de importar a aplicação: banco temporário e sem limites ou tarefas de fundo no caminho
+    os.environ.update({
+        "DATABASE_URL": banco,
+        "LOG_NIVEL": "WARNING",
+        "AUDITORIA_ATIVA": "false",
+        "LIMITE_TAXA_ATIVO": "false",
+    })
+
+    from fastapi.testclient import TestClient
+
+    from app.database import SessionLocal
+    from app.main import app
+    from app.models.produto import Produto
+
+    categoria_id = preparar()
+    completos = [
+        {
+            "codigo_sku": f"IMP{i:07d}", "nome": f"Produto {i}", "descricao": f"Descrição do produto {i}",
+            "categoria_id": categoria_id, "unidade_medida": "un", "preco_custo": "5.00", "preco_venda": "10.00",
+            "quantidade_minima": i % 7 + 1, "quantidade_maxima": 100 + i % 50, "imagem_url": f"https://img/{i}.png",
+        }
+        for i in range(args.produtos)
+    ]
+    reduzidos = [{**produto, "preco_venda": "12.50"} for produto in completos]
+
+    print(f"{args.produtos} produtos\n")
+    print("| etapa | colunas | inseridos | atualizados | ignorados | linhas/s |")
+    print("|---|---|---|---|---|---|")
+    with TestClient(app) as client:
+        token = client.post("/api/auth/login", data={"username": EMAIL_ADMIN, "password": SENHA}).json()["access_token"]
+        cabecalhos = {"Authorization": f"Bearer {token}"}
+        for etapa, colunas, linhas in (
+            ("carga completa", COLUNAS_COMPLETAS, completos),
+            ("reimportação parcial", COLUNAS_REDUZIDAS, reduzidos),
+        ):
+            resultado = importar(client, cabecalhos, gerar_csv(colunas, linhas))
+            print(
+                f'| {etapa} | {len(colunas)} | {resultado["inseridos"]} | {resultado["atualizados"]} '
+                f'| {resultado["ignorados"]} | {resultado["linhas_s"]:.0f} |',
+                flush=True,
+            )
+
+    db = SessionLocal()
+    gravados = {produto.codigo_sku: produto for produto in db.query(Produto)}
+    alterados = [
+        esperado["codigo_sku"] for esperado in completos
+        if gravados[esperado["codigo_sku"]].preco_venda != Decimal("12.50")
+        or any(str(getattr(gravados[esperado["codigo_sku"]], coluna)) != str(esperado[coluna]) for coluna in COLUNAS_PRESERVADAS)
+    ]
+    db.close()
+
+    if alterados:
+        print(f"\nProdutos com colunas ausentes do arquivo alteradas (ou preço não atualizado): {len(alterados)}, "
+              f"ex.: {', '.join(alterados[:5])}")
+        sys.exit(1)
+    print("\nReimportação parcial preservou as colunas ausentes do arquivo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Orçamentos de desempenho por endpoint, para pegar regressões antes do deploy.
+
+Popula um SQLite temporário (benchmarks/semear.py, escala pequena), sobe a
+aplicação com o TestClient e chama pelo menos um endpoint de cada router de
+app/routers. Para cada cenário mede, depois de uma chamada de aquecimento:
+
+- consultas: comandos SQL executados (o maior valor entre as repetições);
+- linhas: linhas lidas do banco (idem);
+- tempo_ms: tempo de parede da requisição (mediana das repetições).
+
+Os valores são comparados com a linha de base gravada em
+benchmarks/orcamentos_base.json: consultas não podem aumentar, linhas
+toleram TOLERANCIA_LINHAS e o tempo tolera TOLERANCIA_TEMPO mais FOLGA_TEMPO_MS
+(o tempo depende da máquina; gere a linha de base no mesmo ambiente da
+verificação). Cada cenário pode ainda fixar um máximo absoluto de consultas.
+O relatório de comparação vai para benchmarks/resultados/orcamentos.md e o
+processo termina com código 1 se algum orçamento for estourado.
+
+Uso:
+    python -m benchmarks.orcamentos                   # verifica
+    python -m benchmarks.orcamentos --atualizar-base  # grava a linha de base
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# Adicionar o diretório raiz ao path para importações
+sys.path.append(str(Path(__file__).parent.parent))
+
+DIRETORIO = Path(__file__).parent
+ARQUIVO_BASE = DIRETORIO / "orcamentos_base.json"
+DIRETORIO_RESULTADOS = DIRETORIO / "resultados"
+
+TOLERANCIA_LINHAS = 0.10
+TOLERANCIA_TEMPO = 0.50
+FOLGA_TEMPO_MS = 5.0
+ESCALA_PADRAO = 0.01
+REPETICOES_PADRAO = 5
+
+Corpo = Union[None, dict, Callable[[int], dict]]
+
+
+@dataclass
+class Cenario:
+    nome: str
+    metodo: str
+    caminho: str
+    autenticacao: Optional[str] = None  # "admin", "cliente" ou None
+    corpo: Corpo = None                 # JSON; função da repetição quando precisa variar
+    formulario: Optional[dict] = None
+    max_consultas: Optional[int] = None
+    status: int = 200
+
+
+CENARIOS: List[Cenario] = [
+    Cenario("auth_login", "POST", "/api/auth/login", formulario={"username": "admin@bench.com.br", "password": "bench123"}),
+    Cenario("auth_me", "GET", "/api/auth/me", "admin", max_consultas=1),
+    Cenario("auth_cliente_login", "POST", "/api/auth/clientes/login", formulario={"username": "cliente1@bench.com.br", "password": "bench123"}),
+    Cenario("usuarios_listar", "GET", "/api/usuarios/", "admin", max_consultas=1),
+    Cenario("categorias_listar", "GET", "/api/categorias/", "admin", max_consultas=1),
+    Cenario("produtos_listar", "GET", "/api/produtos/?limit=50", max_consultas=1),
+    Cenario("produtos_buscar", "GET", "/api/produtos/?search=Ra%C3%A7%C3%A3o%20Premium&limit=20", max_consultas=1),
+    Cenario("produtos_obter", "GET", "/api/produtos/1", "admin", max_consultas=1),
+    Cenario(
+        "produtos_atualizar", "PUT", "/api/produtos/1", "admin",
+        corpo=lambda n: {"nome": f"Produto editado {n}"}, max_consultas=2,
+    ),
+    Cenario("produtos_sku", "GET", "/api/produtos/sku/SKU00000001", "admin", max_consultas=0),
+    Cenario("produtos_baixo_estoque", "GET", "/api/produtos/baixo-estoque", "admin", max_consultas=1),
+    Cenario("movimentacoes_listar", "GET", "/api/movimentacoes/?limit=50", "admin", max_consultas=1),
+    Cenario(
+        "movimentacoes_criar", "POST", "/api/movimentacoes/", "admin",
+        corpo={"produto_id": 1, "tipo": "entrada", "quantidade": 5}, max_consultas=4, status=201,
+    ),
+    Cenario("clientes_listar", "GET", "/api/clientes/?limit=50", "admin", max_consultas=1),
+    Cenario(
+        "clientes_atualizar", "PUT", "/api/clientes/1", "admin",
+        corpo=lambda n: {"telefone": f"1199999{n:04d}"}, max_consultas=2,
+    ),
+    Cenario(
+        "cliente_publico_cadastrar", "POST", "/api/public/clientes/",
+        corpo=lambda n: {"nome": "Cliente Orçamento", "email": f"orcamento{n}@exemplo.com.br", "senha": "segredo123"},
+        status=201,
+    ),
+    Cenario("compras_listar", "GET", "/api/compras/"),
+    Cenario("compras_obter", "GET", "/api/compras/1", max_consultas=2),
+    # Um UPDATE por produto: a baixa condicional (quantidade >= pedida) de cada item
+    Cenario(
+        "compras_finalizar", "POST", "/api/compras/", "cliente",
+        corpo={"itens": [{"produto_id": p, "nome": "Produto", "quantidade": 1, "preco_unitario": 10.0} for p in (1, 2, 3)], "total": 30.0},
+        max_consultas=14, status=201,
+    ),
+    Cenario("pagamentos_listar", "GET", "/api/pagamentos/"),
+    Cenario("pagamentos_obter", "GET", "/api/pagamentos/1", max_consultas=1),
+    Cenario("autocomplete_produtos", "GET", "/api/autocomplete/produtos?q=ra%C3%A7", max_consultas=0),
+    Cenario("auditoria_listar", "GET", "/api/auditoria/?limit=50", "admin", max_consultas=1),
+    Cenario("monitoramento_consultas_lentas", "GET", "/api/monitoramento/consultas-lentas", "admin", max_consultas=0),
+]
+
+
+# ----------------------------
+# MEDIÇÃO
+# ----------------------------
+class Medidor:
+    """
+    Conta comandos SQL (eventos do engine) e linhas lidas (row_factory do
+    sqlite3) do processo inteiro; o TestClient executa uma requisição por vez.
+    As releituras dos índices em memória (threads próprias, depois do commit)
+    não contam: não fazem parte do custo da requisição
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.consultas = 0
+        self.linhas = 0
+        self._lock = threading.Lock()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _comando(conn, cursor, statement, parameters, context, executemany):
+            if threading.current_thread().name.startswith(THREADS_DE_INDICE):
+                return
+            with self._lock:
+                self.consultas += 1
+
+        @event.listens_for(engine, "connect")
+        def _contar_linhas(conexao_dbapi, registro):
+            def fabrica(cursor, linha):
+                if threading.current_thread().name.startswith(THREADS_DE_INDICE):
+                    return linha
+                self.linhas += 1
+                return linha
+            conexao_dbapi.row_factory = fabrica
+
+        # Conexões abertas antes do evento não teriam o row_factory
+        engine.dispose()
+
+    def zerar(self):
+        with self._lock:
+            self.consultas = 0
+            self.linhas = 0
+
+
+THREADS_DE_INDICE = ("indice-sku", "autocomplete-")
+
+
+def _aguardar_indices(limite_s: float = 5.0):
+    """
+    Espera os índices em memória aplicarem as invalidações da última
+    requisição, para a próxima ler do índice e não do banco
+    """
+    from app.services.autocomplete import indices
+    from app.services.indice_sku import indice_sku
+
+    fim = time.monotonic() + limite_s
+    while time.monotonic() < fim:
+        if indice_sku.ocioso and all(indice.ocioso for indice in indices.values()):
+            return
+        time.sleep(0.005)
+
+
+def _medir(client, medidor: Medidor, cenario: Cenario, cabecalhos: Dict[str, Dict[str, str]], repeticoes: int) -> dict:
+    medidas = []
+    for n in range(repeticoes + 1):
+        corpo = cenario.corpo(n) if callable(cenario.corpo) else cenario.corpo
+        headers = cabecalhos.get(cenario.autenticacao, {})
+        medidor.zerar()
+        inicio = time.perf_counter()
+        resposta = client.request(cenario.metodo, cenario.caminho, json=corpo, data=cenario.formulario, headers=headers)
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+        _aguardar_indices()
+        if resposta.status_code != cenario.status:
+            raise RuntimeError(f"{cenario.nome}: status {resposta.status_code} (esperado {cenario.status}): {resposta.text[:200]}")
+        if n:  # a primeira chamada só aquece caches e conexões
+            medidas.append((medidor.consultas, medidor.linhas, tempo_ms))
+    return {
+        "consultas": max(consultas for consultas, _, _ in medidas),
+        "linhas": max(linhas for _, linhas, _ in medidas),
+        "tempo_ms": round(statistics.median(tempo for _, _, tempo in medidas), 2),
+    }
+
+
+def medir_todos(escala: float, repeticoes: int, filtro: Optional[str] = None) -> Dict[str, dict]:
+    diretorio = tempfile.mkdtemp(prefix="orcamentos-")
+    banco = f"sqlite:///{Path(diretorio) / 'orcamentos.db'}"
+    # Antes de importar a aplicação: banco temporário e sem tarefas de fundo que gerem consultas no meio da medição
+    os.environ.update({
+        "DATABASE_URL": banco,
+        "LOG_NIVEL": "WARNING",
+        "AUDITORIA_ATIVA": "false",
+        "INDICE_SKU_INTERVALO_VERIFICACAO": "3600",
+        "AUTOCOMPLETE_INTERVALO_VERIFICACAO": "3600",
+        "REVOGACAO_INTERVALO_VERIFICACAO": "3600",
+        "CHAVES_API_INTERVALO_VERIFICACAO": "3600",
+        "ESCRITA_ADIADA_INTERVALO": "3600",
+        "ESTOQUE_FRAGMENTOS_INTERVALO": "3600",
+        "LIMITE_TAXA_ATIVO": "false",
+        "CONSULTAS_LENTAS_EXPLAIN": "false",
+    })
+    from benchmarks.semear import EMAIL_ADMIN, SENHA_PADRAO, semear
+
+    semear(banco, escala)
+
+    from fastapi.testclient import TestClient
+
+    from app.database import engine
+    from app.main import app
+
+    medidor = Medidor(engine)
+    resultados = {}
+    with TestClient(app) as client:
+        token_admin = client.post("/api/auth/login", data={"username": EMAIL_ADMIN, "password": SENHA_PADRAO}).json()["access_token"]
+        token_cliente = client.post(
+            "/api/auth/clientes/login", data={"username": "cliente1@bench.com.br", "password": SENHA_PADRAO}
+        ).json()["access_token"]
+        cabecalhos = {
+            "admin": {"Authorization": f"Bearer {token_admin}"},
+            "cliente": {"Authorization": f"Bearer {token_cliente}"},
+        }
+        for cenario in CENARIOS:
+            if filtro and filtro not in cenario.nome:
+                continue
+            resultados[cenario.nome] = _medir(client, medidor, cenario, cabecalhos, repeticoes)
+    return resultados
+
+
+# ----------------------------
+# COMPARAÇÃO
+# ----------------------------
+def verificar(resultados: Dict[str, dict], base: Dict[str, dict]) -> List[dict]:
+    """
+    Uma linha por cenário com os valores, os limites e as violações encontradas
+    """
+    maximos = {cenario.nome: cenario.max_consultas for cenario in CENARIOS}
+    linhas = []
+    for nome, atual in resultados.items():
+        anterior = base.get(nome)
+        violacoes = []
+        maximo = maximos.get(nome)
+        if maximo is not None and atual["consultas"] > maximo:
+            violacoes.append(f"consultas {atual['consultas']} > máximo {maximo}")
+        limites: Dict[str, Any] = {}
+        if anterior is not None:
+            limites = {
+                "consultas": anterior["consultas"],
+                "linhas": int(anterior["linhas"] * (1 + TOLERANCIA_LINHAS)),
+                "tempo_ms": round(anterior["tempo_ms"] * (1 + TOLERANCIA_TEMPO) + FOLGA_TEMPO_MS, 2),
+            }
+            for metrica, limite in limites.items():
+                if atual[metrica] > limite:
+                    violacoes.append(f"{metrica} {atual[metrica]} > {limite}")
+        linhas.append({"cenario": nome, "atual": atual, "base": anterior, "limites": limites, "violacoes": violacoes})
+    return linhas
+
+
+def _celula(atual: float, anterior: Optional[float]) -> str:
+    if anterior is None:
+        return f"{atual}"
+    if not anterior:
+        return f"{atual} (base {anterior})"
+    return f"{atual} ({(atual - anterior) * 100 / anterior:+.0f}%)"
+
+
+def relatorio_markdown(linhas: List[dict]) -> str:
+    saida = [
+        "| cenário | consultas | linhas | tempo (ms) | situação |",
+        "|---|---:|---:|---:|---|",
+    ]
+    for linha in linhas:
+        atual, anterior = linha["atual"], linha["base"] or {}
+        situacao = "; ".join(linha["violacoes"]) or ("ok" if linha["base"] else "sem base")
+        saida.append(
+            f"| {linha['cenario']} | {_celula(atual['consultas'], anterior.get('consultas'))} "
+            f"| {_celula(atual['linhas'], anterior.get('linhas'))} "
+            f"| {_celula(atual['tempo_ms'], anterior.get('tempo_ms'))} | {situacao} |"
+        )
+    return "\n".join(saida) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica os orçamentos de desempenho por endpoint")
+    parser.add_argument("--atualizar-base", action="store_true", help="Grava as medições como nova linha de base")
+    parser.add_argument("--escala", type=float, default=ESCALA_PADRAO, help="Escala dos dados (benchmarks/semear.py)")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_PADRAO)
+    parser.add_argument("--filtro", help="Mede só os cenários cujo nome contém o texto")
+    args = parser.parse_args()
+
+    resultados = medir_todos(args.escala, args.repeticoes, args.filtro)
+
+    if args.atualizar_base:
+        base = json.loads(ARQUIVO_BASE.read_text(encoding="utf-8")) if ARQUIVO_BASE.exists() else {}
+        base["escala"] = args.escala
+        base.setdefault("cenarios", {}).update(resultados)
+        ARQUIVO_BASE.write_text(json.dumps(base, indent=2, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Linha de base gravada em {ARQUIVO_BASE} ({len(resultados)} cenários)")
+        return
+
+    base = json.loads(ARQUIVO_BASE.read_text(encoding="utf-8")) if ARQUIVO_BASE.exists() else {}
+    if base and base.get("escala") != args.escala:
+        print(f"Aviso: linha de base medida na escala {base.get('escala')}, verificação na escala {args.escala}")
+    linhas = verificar(resultados, base.get("cenarios", {}))
+    relatorio = relatorio_markdown(linhas)
+
+    DIRETORIO_RESULTADOS.mkdir(exist_ok=True)
+    (DIRETORIO_RESULTADOS / "orcamentos.md").write_text(relatorio, encoding="utf-8")
+    (DIRETORIO_RESULTADOS / "orcamentos.json").write_text(
+        json.dumps(linhas, indent=2, ensure_ascii=False) + "\n", encoding="utf-8"
+    )
+    print(relatorio)
+
+    estourados = [linha["cenario"] for linha in linhas if linha["violacoes"]]
+    if estourados:
+        print(f"Orçamentos estourados: {', '.join(estourados)}")
+        sys.exit(1)
+    print("Todos os orçamentos respeitados")
+
+
+if __name__ == "__main__":
+    main()
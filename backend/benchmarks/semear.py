@@ -0,0 +1,359 @@
+"""
+Gerador de dados sintéticos em massa para os benchmarks.
+
+Recria o banco do zero e gera categorias, usuários, clientes, produtos,
+movimentações e compras com itens e pagamentos, todos com IDs explícitos (as
+chaves estrangeiras são consistentes sem consultas de volta). As distribuições
+imitam uma loja real:
+
+- popularidade dos produtos segue uma lei de Zipf (poucos produtos concentram
+  a maior parte das vendas e movimentações), assim como a recorrência dos
+  clientes;
+- as datas seguem sazonalidade anual (pico em novembro/dezembro), semanal
+  (fins de semana) e diária (horário comercial).
+
+O resultado é determinístico para a mesma semente, escala e data de
+referência (o "hoje" dos dados, fixo em DATA_REFERENCIA por padrão). A carga usa
+`executemany` direto no driver no SQLite, `COPY` no PostgreSQL e INSERTs em
+lote do Core nos demais bancos, sempre em lotes de TAMANHO_LOTE linhas, sem
+materializar as tabelas grandes na memória. Na escala 1.0 são ~2 milhões de
+linhas; a escala 5 passa de 10 milhões.
+
+Usuários e clientes compartilham a senha SENHA_PADRAO.
+
+Uso: python -m benchmarks.semear [--banco URL] [--escala 1.0] [--semente 42] [--data-referencia 2025-01-01]
+"""
+import argparse
+import csv
+import io
+import itertools
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple
+
+# Adicionar o diretório raiz ao path para importações
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, event, insert, text
+
+from app.database import Base
+from app.models import Categoria, Cliente, CompraCliente, CompraItem, Movimentacao, Pagamento, Produto, Usuario
+from app.utils.security import get_password_hash
+
+BANCO_PADRAO = f"sqlite:///{Path(__file__).parent / 'bench.db'}"
+# Data mais recente dos dados gerados (fixa para que duas cargas sejam iguais)
+DATA_REFERENCIA = datetime(2025, 1, 1)
+
+# Volumes na escala 1.0
+VOLUMES = {
+    "categorias": 50,
+    "usuarios": 20,
+    "clientes": 20_000,
+    "produtos": 100_000,
+    "movimentacoes": 1_000_000,
+    "compras": 200_000,
+}
+
+SENHA_PADRAO = "bench123"
+EMAIL_ADMIN = "admin@bench.com.br"
+TAMANHO_LOTE = 10_000
+
+# Expoentes de Zipf: produtos bem concentrados, clientes mais espalhados
+ZIPF_PRODUTOS = 1.0
+ZIPF_CLIENTES = 0.8
+
+# Peso relativo de cada mês (janeiro..dezembro) e de cada dia da semana (segunda..domingo)
+SAZONALIDADE_MES = [0.8, 0.75, 0.9, 0.9, 1.0, 0.95, 1.0, 1.0, 0.95, 1.05, 1.6, 1.9]
+SAZONALIDADE_SEMANA = [0.9, 0.9, 0.95, 1.0, 1.15, 1.4, 0.8]
+SAZONALIDADE_HORA = [0.1] * 7 + [0.4, 0.8, 1.0, 1.1, 1.2, 1.3, 1.2, 1.1, 1.1, 1.2, 1.3, 1.4, 1.3, 1.1, 0.8, 0.5, 0.3]
+
+TIPOS = ["Ração", "Petisco", "Areia", "Brinquedo", "Coleira", "Shampoo", "Comedouro", "Caminha", "Arranhador", "Antipulgas"]
+MARCAS = ["Premium", "Natural", "Golden", "Vital", "Max", "Special", "Prime", "Classic", "Plus", "Origens"]
+PUBLICOS = ["Cão Adulto", "Cão Filhote", "Gato Adulto", "Gato Filhote", "Pássaro", "Peixe", "Roedor", "Cão Sênior"]
+MEDIDAS = ["1kg", "3kg", "10kg", "15kg", "500g", "P", "M", "G", "250ml", "1un"]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Heitor", "Isabela", "João", "Larissa", "Marcos"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Santos", "Lima", "Pereira", "Costa", "Almeida", "Ferreira", "Gomes"]
+CIDADES = ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Porto Alegre", "Salvador", "Recife", "Campinas"]
+
+Linha = Tuple
+
+
+# ----------------------------
+# DISTRIBUIÇÕES
+# ----------------------------
+class Zipf:
+    """
+    Sorteia IDs de 1..n com probabilidade proporcional a 1/posição^s; a posição
+    de cada ID é embaralhada, para os populares não serem os primeiros IDs
+    """
+
+    def __init__(self, rng: random.Random, n: int, s: float):
+        self.ids = list(range(1, n + 1))
+        rng.shuffle(self.ids)
+        self.acumulado = list(itertools.accumulate(1 / posicao ** s for posicao in range(1, n + 1)))
+
+    def sortear(self, rng: random.Random, k: int) -> List[int]:
+        return rng.choices(self.ids, cum_weights=self.acumulado, k=k)
+
+
+class Calendario:
+    """
+    Sorteia instantes do último ano com sazonalidade anual, semanal e diária
+    """
+
+    def __init__(self, agora: datetime, dias: int = 365):
+        inicio = (agora - timedelta(days=dias)).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.dias = [inicio + timedelta(days=d) for d in range(dias)]
+        self.acumulado_dias = list(itertools.accumulate(
+            SAZONALIDADE_MES[dia.month - 1] * SAZONALIDADE_SEMANA[dia.weekday()] for dia in self.dias
+        ))
+        self.acumulado_horas = list(itertools.accumulate(SAZONALIDADE_HORA))
+
+    def sortear(self, rng: random.Random, k: int) -> List[datetime]:
+        dias = rng.choices(self.dias, cum_weights=self.acumulado_dias, k=k)
+        horas = rng.choices(range(24), cum_weights=self.acumulado_horas, k=k)
+        return [
+            dia + timedelta(hours=hora, seconds=rng.randrange(3600))
+            for dia, hora in zip(dias, horas)
+        ]
+
+
+def _em_lotes(total: int) -> Iterator[Tuple[int, int]]:
+    for inicio in range(0, total, TAMANHO_LOTE):
+        yield inicio + 1, min(inicio + TAMANHO_LOTE, total) + 1
+
+
+# ----------------------------
+# CARGA
+# ----------------------------
+class Carregador:
+    """
+    Grava lotes de tuplas na ordem de `colunas` pelo caminho mais rápido do dialeto
+    """
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.dialeto = conexao.dialect.name
+        self.linhas = 0
+
+    def carregar(self, modelo, colunas: Sequence[str], lotes: Iterable[List[Linha]]):
+        tabela = modelo.__table__
+        for lote in lotes:
+            if not lote:
+                continue
+            if self.dialeto == "postgresql":
+                self._copy(tabela.name, colunas, lote)
+            elif self.dialeto == "sqlite":
+                marcadores = ", ".join("?" * len(colunas))
+                cursor = self.conexao.connection.driver_connection.cursor()
+                cursor.executemany(f"INSERT INTO {tabela.name} ({', '.join(colunas)}) VALUES ({marcadores})", lote)
+                cursor.close()
+            else:
+                self.conexao.execute(insert(tabela), [dict(zip(colunas, linha)) for linha in lote])
+            self.linhas += len(lote)
+
+    def _copy(self, tabela: str, colunas: Sequence[str], lote: List[Linha]):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(lote)
+        buffer.seek(0)
+        cursor = self.conexao.connection.driver_connection.cursor()
+        cursor.copy_expert(f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.close()
+
+    def ajustar_sequencias(self):
+        """
+        Com IDs explícitos as sequências do PostgreSQL ficam para trás; avança cada uma até o maior ID
+        """
+        if self.dialeto != "postgresql":
+            return
+        for tabela in Base.metadata.sorted_tables:
+            if "id" in tabela.columns and tabela.columns["id"].autoincrement:
+                self.conexao.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{tabela.name}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {tabela.name}), false)"
+                ))
+
+
+def _acelerar_sqlite(engine):
+    @event.listens_for(engine, "connect")
+    def _pragmas(conexao_dbapi, registro):
+        cursor = conexao_dbapi.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA cache_size=-200000")
+        cursor.close()
+
+
+# ----------------------------
+# GERAÇÃO
+# ----------------------------
+def semear(url: str = BANCO_PADRAO, escala: float = 1.0, semente: int = 42,
+           progresso: Callable[[str, int], None] = None, data_referencia: datetime = DATA_REFERENCIA) -> dict:
+    """
+    Recria o banco em `url` e o popula; retorna o número de linhas por tabela.
+    `progresso(tabela, linhas)` é chamado ao fim de cada tabela
+    """
+    rng = random.Random(semente)
+    volumes = {tabela: max(1, int(total * escala)) for tabela, total in VOLUMES.items()}
+    agora = data_referencia.replace(microsecond=0)
+    senha_hash = get_password_hash(SENHA_PADRAO)
+    calendario = Calendario(agora)
+    popularidade = Zipf(rng, volumes["produtos"], ZIPF_PRODUTOS)
+    recorrencia = Zipf(rng, volumes["clientes"], ZIPF_CLIENTES)
+
+    engine = create_engine(url)
+    if engine.dialect.name == "sqlite":
+        _acelerar_sqlite(engine)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    def avisar(tabela: str, antes: int):
+        if progresso is not None:
+            progresso(tabela, carregador.linhas - antes)
+
+    with engine.begin() as conexao:
+        carregador = Carregador(conexao)
+
+        carregador.carregar(Categoria, ("id", "nome", "descricao"), [[
+            (i, f"{TIPOS[i % len(TIPOS)]} {i:03d}", None)
+            for i in range(1, volumes["categorias"] + 1)
+        ]])
+        carregador.carregar(Usuario, ("id", "nome", "email", "senha_hash", "nivel_acesso", "ativo", "data_criacao"), [[
+            (
+                i,
+                "Administrador" if i == 1 else f"Usuário {i}",
+                EMAIL_ADMIN if i == 1 else f"usuario{i}@bench.com.br",
+                senha_hash,
+                "admin" if i == 1 else "usuario",
+                True,
+                agora,
+            )
+            for i in range(1, volumes["usuarios"] + 1)
+        ]])
+
+        antes = carregador.linhas
+        carregador.carregar(
+            Cliente,
+            ("id", "nome", "email", "senha_hash", "cidade", "pais", "data_criacao", "data_atualizacao"),
+            (
+                [
+                    (i, f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}", f"cliente{i}@bench.com.br", senha_hash,
+                     rng.choice(CIDADES), "Brasil", agora, agora)
+                    for i in range(inicio, fim)
+                ]
+                for inicio, fim in _em_lotes(volumes["clientes"])
+            ),
+        )
+        avisar("clientes", antes)
+
+        # Nome e preço de venda ficam em memória para os itens das compras
+        nomes: List[str] = [""]
+        precos: List[float] = [0.0]
+
+        def lotes_produtos():
+            for inicio, fim in _em_lotes(volumes["produtos"]):
+                lote = []
+                for i in range(inicio, fim):
+                    nome = f"{rng.choice(TIPOS)} {rng.choice(MARCAS)} {rng.choice(PUBLICOS)} {rng.choice(MEDIDAS)}"
+                    custo = round(rng.uniform(5, 300), 2)
+                    venda = round(custo * rng.uniform(1.2, 2.0), 2)
+                    nomes.append(nome)
+                    precos.append(venda)
+                    # ~2% dos produtos abaixo do estoque mínimo
+                    quantidade = rng.randint(0, 10) if rng.random() < 0.02 else rng.randint(1_000, 100_000)
+                    lote.append((i, nome, f"SKU{i:08d}", rng.randint(1, volumes["categorias"]), "un",
+                                 custo, venda, quantidade, 20, agora, agora))
+                yield lote
+
+        antes = carregador.linhas
+        carregador.carregar(
+            Produto,
+            ("id", "nome", "codigo_sku", "categoria_id", "unidade_medida", "preco_custo", "preco_venda",
+             "quantidade", "quantidade_minima", "data_criacao", "data_atualizacao"),
+            lotes_produtos(),
+        )
+        avisar("produtos", antes)
+
+        def lotes_movimentacoes():
+            for inicio, fim in _em_lotes(volumes["movimentacoes"]):
+                total = fim - inicio
+                produtos = popularidade.sortear(rng, total)
+                datas = calendario.sortear(rng, total)
+                yield [
+                    (i, produto_id, rng.randint(1, volumes["usuarios"]),
+                     "entrada" if rng.random() < 0.4 else "saida", rng.randint(1, 50), data)
+                    for i, produto_id, data in zip(range(inicio, fim), produtos, datas)
+                ]
+
+        antes = carregador.linhas
+        carregador.carregar(
+            Movimentacao, ("id", "produto_id", "usuario_id", "tipo", "quantidade", "data"), lotes_movimentacoes()
+        )
+        avisar("movimentacoes", antes)
+
+        item_id = 0
+        antes = carregador.linhas
+        for inicio, fim in _em_lotes(volumes["compras"]):
+            total = fim - inicio
+            clientes = recorrencia.sortear(rng, total)
+            datas = calendario.sortear(rng, total)
+            compras, itens, pagamentos = [], [], []
+            for compra_id, cliente_id, data in zip(range(inicio, fim), clientes, datas):
+                valor = 0.0
+                for produto_id in popularidade.sortear(rng, rng.randint(1, 4)):
+                    item_id += 1
+                    quantidade = rng.randint(1, 3)
+                    valor += quantidade * precos[produto_id]
+                    itens.append((item_id, compra_id, produto_id, nomes[produto_id], quantidade, precos[produto_id]))
+                valor = round(valor, 2)
+                compras.append((compra_id, cliente_id, data, valor))
+                pagamentos.append((
+                    compra_id, compra_id, cliente_id, rng.choice(("cartao", "pix", "boleto")),
+                    "aprovado" if rng.random() < 0.95 else "recusado", valor, data,
+                ))
+            carregador.carregar(CompraCliente, ("id", "cliente_id", "data_compra", "valor_total"), [compras])
+            carregador.carregar(
+                CompraItem, ("id", "compra_id", "produto_id", "nome", "quantidade", "preco_unitario"), [itens]
+            )
+            carregador.carregar(
+                Pagamento, ("id", "compra_id", "cliente_id", "metodo", "status", "valor", "data_criacao"), [pagamentos]
+            )
+        volumes["compra_itens"] = item_id
+        volumes["pagamentos"] = volumes["compras"]
+        avisar("compras + itens + pagamentos", antes)
+
+        carregador.ajustar_sequencias()
+
+    engine.dispose()
+    return volumes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula um banco com dados sintéticos para os benchmarks")
+    parser.add_argument("--banco", default=BANCO_PADRAO, help="URL do banco (SQLite ou PostgreSQL)")
+    parser.add_argument("--escala", type=float, default=1.0, help="Multiplicador dos volumes padrão (5 ≈ 10 milhões de linhas)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument(
+        "--data-referencia", type=datetime.fromisoformat, default=DATA_REFERENCIA,
+        help="Data mais recente dos dados gerados (AAAA-MM-DD)"
+    )
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+
+    def progresso(tabela: str, linhas: int):
+        print(f"  {tabela:<32} {linhas:>12,} linhas  ({time.perf_counter() - inicio:.1f} s)")
+
+    volumes = semear(args.banco, args.escala, args.semente, progresso, args.data_referencia)
+    decorrido = time.perf_counter() - inicio
+    total = sum(volumes.values())
+    for tabela, linhas in volumes.items():
+        print(f"{tabela:<15} {linhas:>12,}")
+    print(f"{total:,} linhas em {decorrido:.1f} s ({total / decorrido:,.0f} linhas/s)")
+
+
+if __name__ == "__main__":
+    main()
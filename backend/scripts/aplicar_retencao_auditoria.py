@@ -0,0 +1,19 @@
+"""
+Script para aplicar a política de retenção da auditoria (arquivamento mensal e
+exclusão dos logs fora do prazo). Pensado para execução periódica (cron).
+
+Uso: python scripts/aplicar_retencao_auditoria.py
+"""
+import sys
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path para importações
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.auditoria import aplicar_retencao
+
+
+if __name__ == "__main__":
+    resultado = aplicar_retencao()
+    print(f"Logs arquivados: {resultado['arquivados']}")
+    print(f"Logs excluídos:  {resultado['excluidos']}")
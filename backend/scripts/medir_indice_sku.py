@@ -0,0 +1,39 @@
+"""
+Script para medir a memória e o tempo de busca do índice de SKUs em memória.
+
+Uso: python scripts/medir_indice_sku.py [quantidade_de_skus]
+"""
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path para importações
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.indice_sku import _Tabela
+
+
+def medir(total: int):
+    tabela = _Tabela()
+    inicio = time.perf_counter()
+    for i in range(1, total + 1):
+        tabela.gravar(i, f"SKU-{i:08d}", f"Produto de teste número {i}", Decimal("19.90"), i % 500)
+    carga = time.perf_counter() - inicio
+
+    amostra = [f"SKU-{random.randint(1, total):08d}" for _ in range(100_000)]
+    inicio = time.perf_counter()
+    for sku in amostra:
+        tabela.obter(sku)
+    busca = (time.perf_counter() - inicio) / len(amostra)
+
+    memoria = tabela.memoria()
+    print(f"SKUs indexados:     {len(tabela):,}")
+    print(f"Tempo de carga:     {carga:.2f} s")
+    print(f"Memória estimada:   {memoria / 1024 / 1024:.1f} MiB ({memoria / len(tabela):.0f} bytes por SKU)")
+    print(f"Tempo médio busca:  {busca * 1_000_000:.2f} µs")
+
+
+if __name__ == "__main__":
+    medir(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
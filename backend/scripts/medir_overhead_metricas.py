@@ -0,0 +1,68 @@
+"""
+Script para medir o custo do MetricasMiddleware por requisição.
+
+Chama a mesma rota trivial diretamente pela interface ASGI (sem rede), com e
+sem o middleware, e mostra a diferença do tempo médio por requisição.
+
+Uso: python scripts/medir_overhead_metricas.py [requisicoes]
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path para importações
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI
+
+from app.utils.metricas import MetricasMiddleware
+
+
+def criar_app(com_metricas: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/itens/{item_id}")
+    async def obter_item(item_id: int):
+        return {"id": item_id}
+
+    if com_metricas:
+        app.add_middleware(MetricasMiddleware)
+    return app
+
+
+async def executar(app, total: int) -> float:
+    async def receber():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def enviar(mensagem):
+        pass
+
+    def scope(i):
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/api/itens/{i}", "raw_path": f"/api/itens/{i}".encode(),
+            "root_path": "", "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("teste", 80),
+        }
+
+    # Aquecimento (montagem da pilha de middlewares, caches)
+    for i in range(1000):
+        await app(scope(i), receber, enviar)
+
+    inicio = time.perf_counter()
+    for i in range(total):
+        await app(scope(i), receber, enviar)
+    return (time.perf_counter() - inicio) / total
+
+
+def medir(total: int):
+    sem = min(asyncio.run(executar(criar_app(False), total)) for _ in range(3))
+    com = min(asyncio.run(executar(criar_app(True), total)) for _ in range(3))
+    print(f"Requisições por rodada: {total:,}")
+    print(f"Sem métricas:           {sem * 1_000_000:.1f} µs/requisição")
+    print(f"Com métricas:           {com * 1_000_000:.1f} µs/requisição")
+    print(f"Custo do middleware:    {(com - sem) * 1_000_000:.1f} µs/requisição")
+
+
+if __name__ == "__main__":
+    medir(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
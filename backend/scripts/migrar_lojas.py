@@ -0,0 +1,40 @@
+"""
+Script para aplicar as migrações do Alembic ao banco (ou esquema) de cada loja
+do modo multiloja, listadas em LOJAS. Equivale a rodar
+"alembic -x loja=<nome> upgrade head" para cada uma; lojas cujo banco ainda
+não existe são criadas já na última migração.
+
+Uso: python scripts/migrar_lojas.py [loja ...]
+"""
+import sys
+from argparse import Namespace
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path para importações
+sys.path.append(str(Path(__file__).parent.parent))
+
+from alembic import command
+from alembic.config import Config
+
+from app.database import roteador
+from app.services.lojas import lojas_configuradas
+
+ARQUIVO_ALEMBIC = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+def migrar(loja: str):
+    # Banco novo: o roteador cria as tabelas e marca a última migração
+    roteador.engine(loja)
+    config = Config(str(ARQUIVO_ALEMBIC), cmd_opts=Namespace(x=[f"loja={loja}"]))
+    config.set_main_option("script_location", str(ARQUIVO_ALEMBIC.parent / "alembic"))
+    command.upgrade(config, "head")
+
+
+if __name__ == "__main__":
+    lojas = sys.argv[1:] or sorted(lojas_configuradas())
+    if not lojas:
+        print("Nenhuma loja em LOJAS")
+    for loja in lojas:
+        print(f"Migrando a loja {loja}...")
+        migrar(loja)
+    print("Migrações aplicadas")